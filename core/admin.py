@@ -1,16 +1,26 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.http import HttpResponseRedirect
 
+from . import corrections, replication, start_list
+from .admin_changelist import EventShardAdminMixin, ScalableAdminMixin, autocomplete_filter
+from .search_index import DRIVER, VEHICLE, search_index
 from .models import (
     Capture,
+    CaptureUpload,
     Driver,
+    DriverBest,
     Event,
     Gate,
     Leaderboard,
     OCRResult,
     Passage,
     RaceClass,
+    ReplicationCursor,
     Run,
+    RunConflict,
+    RunCorrection,
     Session,
     Stage,
     User,
@@ -29,6 +39,21 @@ class UserAdmin(BaseUserAdmin):
     search_fields = ("username", "email", "first_name", "last_name")
 
 
+class IndexedSearchMixin:
+    """Answers the changelist search from the typeahead index instead of LIKE scans."""
+
+    search_kind: str = DRIVER
+    search_limit = 500
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        entries = search_index.search(
+            search_term, kinds=(self.search_kind,), limit=self.search_limit
+        )
+        return queryset.filter(pk__in=[entry.pk for entry in entries]), False
+
+
 @admin.register(RaceClass)
 class RaceClassAdmin(admin.ModelAdmin):
     list_display = ("name", "description", "is_active", "created_at")
@@ -37,7 +62,7 @@ class RaceClassAdmin(admin.ModelAdmin):
 
 
 @admin.register(Driver)
-class DriverAdmin(admin.ModelAdmin):
+class DriverAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         "display_name",
         "first_name",
@@ -48,7 +73,13 @@ class DriverAdmin(admin.ModelAdmin):
         "is_active",
     )
     list_filter = ("race_class", "is_active")
-    search_fields = ("first_name", "last_name", "display_name", "team")
+    search_fields = (
+        "first_name",
+        "last_name",
+        "display_name",
+        "team",
+        "transponder_id",
+    )
 
 
 @admin.register(Event)
@@ -71,17 +102,39 @@ class SessionAdmin(admin.ModelAdmin):
     list_display = ("name", "stage", "session_type", "status", "start_time", "end_time")
     list_filter = ("session_type", "status", "stage")
     search_fields = ("name",)
+    actions = ("build_start_list", "predict_start_times")
+
+    @admin.action(description="Startliste für alle aktiven Fahrer erzeugen")
+    def build_start_list(self, request, queryset):
+        created = sum(len(start_list.create_start_list(session)) for session in queryset)
+        self.message_user(request, f"{created} Läufe in Startlisten eingeplant.", messages.SUCCESS)
+
+    @admin.action(description="Startzeiten berechnen")
+    def predict_start_times(self, request, queryset):
+        for session in queryset:
+            start_list.predict_start_times(session)
+        self.message_user(request, "Startzeiten berechnet.", messages.SUCCESS)
 
 
 @admin.register(Gate)
 class GateAdmin(admin.ModelAdmin):
-    list_display = ("name", "gate_uid", "gate_type", "stage", "is_enabled", "last_seen_at")
+    list_display = (
+        "name",
+        "gate_uid",
+        "gate_type",
+        "stage",
+        "is_enabled",
+        "debounce_ms",
+        "last_seen_at",
+    )
     list_filter = ("gate_type", "is_enabled", "stage")
     search_fields = ("name", "gate_uid", "ip_address")
 
 
 @admin.register(Vehicle)
-class VehicleAdmin(admin.ModelAdmin):
+class VehicleAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_kind = VEHICLE
+
     list_display = (
         "name",
         "driver",
@@ -93,46 +146,207 @@ class VehicleAdmin(admin.ModelAdmin):
     search_fields = ("name", "driver__first_name", "driver__last_name")
 
 
+STALE_RUN_MESSAGE = (
+    "Der Lauf wurde inzwischen geändert (z. B. durch ein Gate). "
+    "Bitte die Seite neu laden und die Änderung erneut eintragen."
+)
+
+
+class RunAdminForm(forms.ModelForm):
+    """Carries the version the operator opened, so stale edits are refused.
+
+    ``Run.version`` is not editable, so the form keeps it in its own hidden
+    field and hands it back to the instance: ``Run.save()`` then refuses to
+    overwrite a run changed between ``clean()`` and saving.
+    """
+
+    loaded_version = forms.IntegerField(widget=forms.HiddenInput, required=False)
+
+    class Meta:
+        model = Run
+        fields = "__all__"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["loaded_version"].initial = self.instance.version
+
+    def clean(self):
+        cleaned_data = super().clean()
+        version = cleaned_data.get("loaded_version")
+        if self.instance.pk is not None and version is not None:
+            if version != self.instance.version:
+                raise forms.ValidationError(STALE_RUN_MESSAGE)
+            self.instance.version = version
+        return cleaned_data
+
+
 @admin.register(Run)
-class RunAdmin(admin.ModelAdmin):
+class RunAdmin(EventShardAdminMixin, ScalableAdminMixin, admin.ModelAdmin):
+    form = RunAdminForm
     list_display = (
         "driver",
         "session",
         "vehicle",
         "status",
+        "start_position",
         "start_number_used",
         "final_time_ms",
     )
-    list_filter = ("status", "session")
+    list_filter = ("status", autocomplete_filter("session", "session"))
+    list_select_related = ("driver", "session__stage__event", "vehicle__driver")
     search_fields = ("driver__first_name", "driver__last_name", "comment")
     autocomplete_fields = ("driver", "session", "vehicle")
+    date_hierarchy = "started_at"
+    readonly_fields = ("final_time_ms",)
+    actions = ("add_five_second_penalty", "mark_dnf", "mark_dsq", "mark_void")
+
+    def save_model(self, request, obj, form, change):
+        with replication.manual_changes():
+            super().save_model(request, obj, form, change)
+
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except RunConflict:
+            # Changed between validation and saving (e.g. by a gate).
+            self.message_user(request, STALE_RUN_MESSAGE, level=messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+
+    def _correct(self, request, queryset, func, *args):
+        try:
+            correction = func(queryset.order_by(), *args, user=request.user)
+        except corrections.CorrectionError as exc:
+            self.message_user(request, str(exc), level=messages.ERROR)
+            return
+        self.message_user(request, f"{correction} angewendet.", level=messages.SUCCESS)
+
+    @admin.action(description="+5 s Strafzeit")
+    def add_five_second_penalty(self, request, queryset):
+        self._correct(request, queryset, corrections.add_penalty, 5000)
+
+    @admin.action(description="Als DNF markieren")
+    def mark_dnf(self, request, queryset):
+        self._correct(request, queryset, corrections.set_status, Run.Status.DNF)
+
+    @admin.action(description="Als DSQ markieren")
+    def mark_dsq(self, request, queryset):
+        self._correct(request, queryset, corrections.set_status, Run.Status.DSQ)
+
+    @admin.action(description="Als ungültig (VOID) markieren")
+    def mark_void(self, request, queryset):
+        self._correct(request, queryset, corrections.set_status, Run.Status.VOID)
 
 
 @admin.register(Passage)
-class PassageAdmin(admin.ModelAdmin):
-    list_display = ("session", "gate", "timestamp_ms", "run", "is_valid", "received_at")
-    list_filter = ("gate", "session", "is_valid")
-    search_fields = ("timestamp_ms",)
+class PassageAdmin(EventShardAdminMixin, ScalableAdminMixin, admin.ModelAdmin):
+    list_display = (
+        "session",
+        "gate",
+        "timestamp_ms",
+        "run",
+        "is_valid",
+        "clock_sync",
+        "received_at",
+    )
+    list_filter = (
+        autocomplete_filter("gate", "gate"),
+        autocomplete_filter("session", "session"),
+        "is_valid",
+        "clock_sync",
+    )
+    list_select_related = (
+        "session__stage__event",
+        "gate",
+        "run__driver",
+        "run__session__stage__event",
+    )
+    search_fields = ("=timestamp_ms",)
     autocomplete_fields = ("run", "session", "gate")
+    date_hierarchy = "received_at"
 
 
 @admin.register(Capture)
-class CaptureAdmin(admin.ModelAdmin):
+class CaptureAdmin(EventShardAdminMixin, ScalableAdminMixin, admin.ModelAdmin):
     list_display = ("id", "passage", "image_path", "created_at", "sha256")
-    search_fields = ("image_path", "sha256")
+    list_select_related = ("passage__gate",)
+    search_fields = ("image_path", "=sha256")
     autocomplete_fields = ("passage",)
+    date_hierarchy = "created_at"
+
+
+@admin.register(CaptureUpload)
+class CaptureUploadAdmin(EventShardAdminMixin, admin.ModelAdmin):
+    list_display = (
+        "upload_id",
+        "gate",
+        "passage",
+        "status",
+        "received_bytes",
+        "size",
+        "updated_at",
+    )
+    list_filter = ("status", "gate")
+    list_select_related = ("gate", "passage__gate")
+    search_fields = ("=upload_id", "=sha256")
+    raw_id_fields = ("passage", "capture")
+    readonly_fields = ("upload_id", "received_bytes", "created_at", "updated_at")
 
 
 @admin.register(OCRResult)
-class OCRResultAdmin(admin.ModelAdmin):
+class OCRResultAdmin(EventShardAdminMixin, ScalableAdminMixin, admin.ModelAdmin):
     list_display = ("capture", "detected_number", "confidence", "engine", "status", "created_at")
     list_filter = ("status", "engine")
-    search_fields = ("detected_number", "engine")
+    list_select_related = ("capture__passage__gate",)
+    search_fields = ("=detected_number", "engine")
     autocomplete_fields = ("capture",)
+    date_hierarchy = "created_at"
 
 
 @admin.register(Leaderboard)
-class LeaderboardAdmin(admin.ModelAdmin):
-    list_display = ("session", "race_class", "generated_at", "checksum")
-    list_filter = ("session", "race_class")
+class LeaderboardAdmin(EventShardAdminMixin, admin.ModelAdmin):
+    list_display = ("session", "race_class", "generated_at", "is_checkpoint", "checksum")
+    list_filter = ("is_checkpoint", "session", "race_class")
     search_fields = ("session__name",)
+
+
+@admin.register(DriverBest)
+class DriverBestAdmin(admin.ModelAdmin):
+    list_display = (
+        "driver",
+        "scope",
+        "label",
+        "race_class",
+        "best_final_ms",
+        "previous_best_ms",
+        "finished_runs",
+        "best_at",
+    )
+    list_filter = ("scope", "race_class")
+    list_select_related = ("driver", "race_class")
+    search_fields = ("driver__last_name", "driver__first_name", "label")
+    readonly_fields = [field.name for field in DriverBest._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ReplicationCursor)
+class ReplicationCursorAdmin(admin.ModelAdmin):
+    list_display = ("node_id", "last_seq", "updated_at")
+    readonly_fields = ("node_id", "last_seq", "updated_at")
+
+
+@admin.register(RunCorrection)
+class RunCorrectionAdmin(EventShardAdminMixin, admin.ModelAdmin):
+    list_display = ("action", "penalty_ms", "status", "created_by", "created_at", "reason")
+    list_filter = ("action",)
+    readonly_fields = (
+        "action",
+        "run_ids",
+        "session_ids",
+        "penalty_ms",
+        "status",
+        "reason",
+        "created_by",
+        "created_at",
+    )
@@ -0,0 +1,259 @@
+"""
+Changelist building blocks for admin pages over very large tables.
+
+The default admin changelist counts every row (twice), renders list
+filters with every related object and pages with growing OFFSETs. On the
+passage, run, capture and OCR tables that quickly takes seconds. The
+``ScalableAdminMixin`` replaces these with:
+
+* estimated counts (``EstimatedCountPaginator``),
+* autocomplete filters that only load the selected object
+  (``autocomplete_filter``),
+* keyset ("cursor") paging on the primary key when no column sort is
+  active (``CursorChangeList``): ``?cursor=<pk>`` shows the rows older
+  than ``pk``, ``?before=<pk>`` the page of rows just newer than it.
+
+Timing data of sharded events lives in one database per event, and primary
+keys are only unique within it. ``EventShardAdminMixin`` adds an event
+filter that selects the database the changelist, the change form and the
+actions work on; without it they show the live event.
+"""
+
+from __future__ import annotations
+
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db.models import Max
+from django.http import QueryDict
+from django.utils.functional import cached_property
+
+from . import shards
+from .models import Event
+
+CURSOR_VAR = "cursor"
+BEFORE_VAR = "before"
+EVENT_VAR = "event"
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that never runs an unbounded ``COUNT(*)``.
+
+    Unfiltered querysets are estimated from the highest primary key (an
+    index lookup); filtered querysets are counted up to ``count_cap`` rows.
+    """
+
+    count_cap = 10000
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        if not queryset.query.where:
+            return queryset.order_by().aggregate(estimate=Max("pk"))["estimate"] or 0
+        return queryset.order_by().values("pk")[: self.count_cap].count()
+
+
+class CursorChangeList(ChangeList):
+    """ChangeList with keyset paging on ``-pk`` when no column sort is set."""
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        lookup_params.pop(BEFORE_VAR, None)
+        return lookup_params
+
+    @property
+    def uses_cursor(self) -> bool:
+        return ORDER_VAR not in self.params and not self.show_all
+
+    def get_ordering(self, request, queryset):
+        if self.uses_cursor:
+            return ["-pk"]
+        return super().get_ordering(request, queryset)
+
+    def get_results(self, request):
+        if not self.uses_cursor:
+            super().get_results(request)
+            self.next_cursor = self.previous_cursor = None
+            return
+        queryset = self.queryset
+        try:
+            cursor = int(self.params[CURSOR_VAR]) if self.params.get(CURSOR_VAR) else None
+            before = int(self.params[BEFORE_VAR]) if self.params.get(BEFORE_VAR) else None
+        except ValueError:
+            raise admin.options.IncorrectLookupParameters
+        self.cursor = cursor
+        per_page = self.list_per_page
+        if before is not None:
+            # Walk towards newer rows, then show them newest first again.
+            rows = list(queryset.filter(pk__gt=before).order_by("pk")[: per_page + 1])
+            has_newer = len(rows) > per_page
+            rows = rows[:per_page][::-1]
+            self.next_cursor = rows[-1].pk if rows else before + 1
+            self.previous_cursor = rows[0].pk if has_newer else None
+        else:
+            if cursor is not None:
+                queryset = queryset.filter(pk__lt=cursor)
+            rows = list(queryset[: per_page + 1])
+            has_older = len(rows) > per_page
+            rows = rows[:per_page]
+            self.next_cursor = rows[-1].pk if has_older else None
+            self.previous_cursor = rows[0].pk if cursor is not None and rows else None
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, per_page)
+        self.result_count = self.paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = False
+
+    def get_next_page_url(self) -> str | None:
+        if self.next_cursor is None:
+            return None
+        return self.get_query_string({CURSOR_VAR: self.next_cursor}, remove=[BEFORE_VAR])
+
+    def get_previous_page_url(self) -> str | None:
+        if self.previous_cursor is None:
+            return None
+        return self.get_query_string({BEFORE_VAR: self.previous_cursor}, remove=[CURSOR_VAR])
+
+    def get_first_page_url(self) -> str | None:
+        if not self.params.get(CURSOR_VAR) and not self.params.get(BEFORE_VAR):
+            return None
+        return self.get_query_string(remove=[CURSOR_VAR, BEFORE_VAR])
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """List filter rendering the admin's select2 autocomplete widget."""
+
+    template = "admin/core/autocomplete_filter.html"
+    field_name: str = ""
+
+    def __init__(self, request, params, model, model_admin):
+        self.parameter_name = f"{self.field_name}__id__exact"
+        super().__init__(request, params, model, model_admin)
+        field = model._meta.get_field(self.field_name)
+        form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False,
+        )
+        self.widget_html = form_field.widget.render(
+            self.parameter_name,
+            self.value(),
+            attrs={"id": f"filter_{self.parameter_name}", "data-filter-param": self.parameter_name},
+        )
+
+    def has_output(self) -> bool:
+        return True
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def choices(self, changelist):
+        yield {
+            "selected": self.value() is None,
+            "query_string": changelist.get_query_string(remove=[self.parameter_name]),
+            "display": "Alle",
+        }
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value in (None, ""):
+            return queryset
+        return queryset.filter(**{f"{self.field_name}_id": value})
+
+
+def autocomplete_filter(field_name: str, title: str) -> type[AutocompleteFilter]:
+    return type(
+        f"{field_name.title()}AutocompleteFilter",
+        (AutocompleteFilter,),
+        {"field_name": field_name, "title": title},
+    )
+
+
+class ScalableAdminMixin:
+    """ModelAdmin mixin for tables with millions of rows."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = "admin/core/scalable_change_list.html"
+    list_per_page = 50
+
+    def get_changelist(self, request, **kwargs):
+        return CursorChangeList
+
+    @property
+    def media(self):
+        field = self.model._meta.get_field(self.autocomplete_fields[0])
+        autocomplete_media = AutocompleteSelect(field, self.admin_site).media
+        return (
+            super().media
+            + autocomplete_media
+            + forms.Media(js=["core/js/admin_filters.js"])
+        )
+
+
+class EventShardFilter(admin.SimpleListFilter):
+    """Selects the event whose database the changelist reads.
+
+    The queryset is already routed by ``EventShardAdminMixin.get_queryset``;
+    this filter only renders the choice.
+    """
+
+    title = "Veranstaltung"
+    parameter_name = EVENT_VAR
+
+    def lookups(self, request, model_admin):
+        events = Event.objects.order_by("-start_date", "-pk")
+        return [(str(event.pk), str(event)) for event in events]
+
+    def choices(self, changelist):
+        yield {
+            "selected": self.value() is None,
+            "query_string": changelist.get_query_string(remove=[self.parameter_name]),
+            "display": "Aktuelle Veranstaltung",
+        }
+        for lookup, title in self.lookup_choices:
+            yield {
+                "selected": self.value() == lookup,
+                "query_string": changelist.get_query_string({self.parameter_name: lookup}),
+                "display": title,
+            }
+
+    def queryset(self, request, queryset):
+        return queryset
+
+
+class EventShardAdminMixin:
+    """ModelAdmin mixin for sharded models: works on the selected event's database.
+
+    The event comes from the changelist filter or, on change forms, from
+    the changelist filters the admin preserves in ``_changelist_filters``.
+    """
+
+    def get_list_filter(self, request):
+        return (EventShardFilter, *super().get_list_filter(request))
+
+    def event_alias(self, request) -> str:
+        value = request.GET.get(EVENT_VAR)
+        if value is None:
+            value = QueryDict(request.GET.get("_changelist_filters", "")).get(EVENT_VAR)
+        try:
+            event_id = int(value) if value else None
+        except ValueError:
+            raise admin.options.IncorrectLookupParameters
+        if event_id is None:
+            return shards.current_alias()
+        return shards.alias_for_event(event_id)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).using(self.event_alias(request))
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if shards.is_sharded_model(db_field.remote_field.model):
+            kwargs.setdefault("using", self.event_alias(request))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
@@ -5,3 +5,6 @@ class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
     verbose_name = "RallyControl"
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
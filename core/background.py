@@ -0,0 +1,82 @@
+"""
+Minimal in-process background worker.
+
+Housekeeping that must not run on the request thread (pruning, publishing,
+finalising uploads) is handed to a single daemon thread. Tasks submitted
+with a ``key`` are coalesced: while a task with the same key is still
+waiting, further submissions are dropped, so a burst of updates results in
+one run of the task.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from typing import Any, Callable, Hashable
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import shards
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWorker:
+    def __init__(self, name: str = "rallycontrol-background") -> None:
+        self.name = name
+        self._queue: queue.Queue = queue.Queue()
+        self._pending: set[Hashable] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def eager(self) -> bool:
+        return getattr(settings, "RALLYCONTROL_BACKGROUND_EAGER", False)
+
+    def submit(
+        self, func: Callable[..., Any], *args: Any, key: Hashable | None = None, **kwargs: Any
+    ) -> bool:
+        """Queue ``func(*args, **kwargs)``; return ``False`` if coalesced."""
+        if self.eager:
+            func(*args, **kwargs)
+            return True
+        # Tasks run against the same event database as the submitting code.
+        alias = shards.explicit_alias()
+        with self._lock:
+            if key is not None:
+                if key in self._pending:
+                    return False
+                self._pending.add(key)
+            self._ensure_started()
+        self._queue.put((key, alias, func, args, kwargs))
+        return True
+
+    def join(self) -> None:
+        """Block until all queued tasks are done (management commands, replay)."""
+        self._queue.join()
+
+    def _ensure_started(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            key, alias, func, args, kwargs = self._queue.get()
+            if key is not None:
+                with self._lock:
+                    self._pending.discard(key)
+            close_old_connections()
+            try:
+                with shards.using_db(alias):
+                    func(*args, **kwargs)
+            except Exception:
+                logger.exception("Background task %r failed", func)
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+
+worker = BackgroundWorker()
@@ -0,0 +1,424 @@
+"""
+Driver career index: personal bests and run statistics across events.
+
+``DriverBest`` holds one row per driver, scope and class with the best
+final time, the best before it, the number and sum of finished runs and
+the last run. Three scopes are kept:
+
+* ``stage``: one stage of one event,
+* ``course``: the same course across events (event location plus stage
+  name, so a hill climb held every year is one course),
+* ``season``: the course within one calendar year ("season best").
+
+Rows are updated incrementally when a run finishes: ``record_finish``
+runs on the background worker and adds the run to its rows with a single
+conditional ``UPDATE`` per row, so a finish never reads the driver's
+history. ``DriverBestRun`` records the time each run was counted with:
+a repeated task counts a run once, and a run finished again with another
+time replaces its old value. Corrections, admin edits and replicated
+changes rebuild the affected drivers from their finished runs
+(``rebuild``), which is also what ``manage.py rebuild_career_index`` does
+for everyone.
+
+Leaderboards read the rows of all drivers of a session with one query per
+regeneration (``annotate_entries``), so "new personal best" indicators on
+boards, the kiosk and the overlay cost nothing extra per finish.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import NamedTuple
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import BigIntegerField, Case, DateTimeField, F, Q, Value, When
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from . import shards
+from .background import worker
+from .models import DriverBest, DriverBestRun, Run, Session, Stage
+
+
+# Board entry field prefix -> scope compared against.
+BOARD_SCOPES = (("personal", DriverBest.Scope.COURSE), ("season", DriverBest.Scope.SEASON))
+
+
+class FinishedRun(NamedTuple):
+    run_id: int
+    session_id: int
+    driver_id: int
+    race_class_id: int | None
+    final_time_ms: int
+    finished_at: datetime | None
+
+
+def finished_runs(runs) -> list[FinishedRun]:
+    """Finished runs of the queryset ``runs`` with their effective class.
+
+    The class follows ``leaderboards.effective_class_id``: the vehicle's
+    class, else the driver's.
+    """
+    rows = runs.filter(status=Run.Status.FINISHED, final_time_ms__isnull=False).values_list(
+        "pk",
+        "session_id",
+        "driver_id",
+        Coalesce("vehicle__race_class_id", "driver__race_class_id"),
+        "final_time_ms",
+        "finished_at",
+    )
+    return [FinishedRun(*row) for row in rows]
+
+
+def course_ref(location: str | None, stage_name: str) -> str:
+    """Stable reference of a course across events (``"wolfsberg/bergpruefung"``)."""
+    return f"{slugify(location or '')[:100]}/{slugify(stage_name)[:100]}"
+
+
+def scope_key(scope: str, ref, race_class_id: int | None) -> str:
+    return f"{scope}:{ref}#{race_class_id or 0}"
+
+
+def stage_keys(stage: Stage, race_class_id: int | None) -> list[tuple[str, str, str]]:
+    """``(scope, key, label)`` of every row a run on ``stage`` counts towards.
+
+    ``stage.event`` must be loaded.
+    """
+    event = stage.event
+    course = course_ref(event.location, stage.name)
+    place = f"{stage.name} ({event.location})" if event.location else stage.name
+    year = event.start_date.year
+    return [
+        (
+            DriverBest.Scope.STAGE,
+            scope_key("stage", stage.pk, race_class_id),
+            f"{stage.name} · {event.name}",
+        ),
+        (DriverBest.Scope.COURSE, scope_key("course", course, race_class_id), place),
+        (
+            DriverBest.Scope.SEASON,
+            scope_key("season", f"{year}:{course}", race_class_id),
+            f"{place} {year}",
+        ),
+    ]
+
+
+def _if_improved(improved: Q, value, field: str, output_field) -> Case:
+    return Case(When(improved, then=value), default=F(field), output_field=output_field)
+
+
+def _add_run(run: FinishedRun, scope: str, key: str, label: str) -> None:
+    """Count a finished run towards one row.
+
+    A run new to the row is added with a single conditional update; a run
+    counted before with another time has that value replaced.
+    """
+    contribution = DriverBestRun.objects.filter(
+        driver_id=run.driver_id, key=key, session_id=run.session_id, run_id=run.run_id
+    )
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                DriverBestRun.objects.create(
+                    driver_id=run.driver_id,
+                    key=key,
+                    session_id=run.session_id,
+                    run_id=run.run_id,
+                    final_time_ms=run.final_time_ms,
+                    finished_at=run.finished_at,
+                )
+        except IntegrityError:
+            previous = (
+                contribution.select_for_update().values_list("final_time_ms", flat=True).first()
+            )
+            if previous is not None and previous != run.final_time_ms:
+                contribution.update(final_time_ms=run.final_time_ms, finished_at=run.finished_at)
+                _replace_run(run, key, previous)
+            return
+        _count_new_run(run, scope, key, label)
+
+
+def _count_new_run(run: FinishedRun, scope: str, key: str, label: str) -> None:
+    final = run.final_time_ms
+    improved = Q(best_final_ms__isnull=True) | Q(best_final_ms__gt=final)
+    big = BigIntegerField()
+    increments = {
+        "previous_best_ms": _if_improved(improved, F("best_final_ms"), "previous_best_ms", big),
+        "best_final_ms": _if_improved(improved, Value(final), "best_final_ms", big),
+        "best_run_id": _if_improved(improved, Value(run.run_id), "best_run_id", big),
+        "best_session_id": _if_improved(improved, Value(run.session_id), "best_session_id", big),
+        "best_at": _if_improved(
+            improved, Value(run.finished_at, DateTimeField()), "best_at", DateTimeField()
+        ),
+        "finished_runs": F("finished_runs") + 1,
+        "total_final_ms": F("total_final_ms") + final,
+        "last_final_ms": Value(final),
+        "last_run_id": Value(run.run_id),
+        "last_session_id": Value(run.session_id),
+        "label": Value(label),
+    }
+    rows = DriverBest.objects.filter(driver_id=run.driver_id, key=key)
+    if rows.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            DriverBest.objects.create(
+                driver_id=run.driver_id,
+                race_class_id=run.race_class_id,
+                scope=scope,
+                key=key,
+                label=label,
+                best_final_ms=final,
+                best_run_id=run.run_id,
+                best_session_id=run.session_id,
+                best_at=run.finished_at,
+                finished_runs=1,
+                total_final_ms=final,
+                last_final_ms=final,
+                last_run_id=run.run_id,
+                last_session_id=run.session_id,
+            )
+    except IntegrityError:
+        # The row exists already: counted before, or created by another process.
+        rows.update(**increments)
+
+
+def _replace_run(run: FinishedRun, key: str, previous_ms: int) -> None:
+    """Swap the time a run was counted with (``previous_ms``) for its new one."""
+    row = DriverBest.objects.select_for_update().filter(driver_id=run.driver_id, key=key).first()
+    if row is None:
+        return
+    final = run.final_time_ms
+    row.total_final_ms += final - previous_ms
+    if row.last_run_id == run.run_id and row.last_session_id == run.session_id:
+        row.last_final_ms = final
+    is_best = row.best_run_id == run.run_id and row.best_session_id == run.session_id
+    if is_best and final > previous_ms:
+        # Another run may be the best now; only the history can tell.
+        schedule_rebuild([run.driver_id], DEFAULT_DB_ALIAS)
+        return
+    if is_best:
+        row.best_final_ms = final
+    elif row.best_final_ms is None or final < row.best_final_ms:
+        row.previous_best_ms = row.best_final_ms
+        row.best_final_ms = final
+        row.best_run_id = run.run_id
+        row.best_session_id = run.session_id
+        row.best_at = run.finished_at
+    row.save()
+
+
+def record_finish(session_id: int, run_id: int) -> bool:
+    """Add a finished run to the career index of its driver."""
+    with shards.using_session(session_id):
+        runs = finished_runs(Run.objects.filter(pk=run_id))
+    if not runs:
+        return False
+    session = Session.objects.select_related("stage__event").get(pk=session_id)
+    for scope, key, label in stage_keys(session.stage, runs[0].race_class_id):
+        _add_run(runs[0], scope, key, label)
+    return True
+
+
+def schedule_record_finish(session_id: int, run_id: int) -> None:
+    shards.on_commit(
+        lambda: worker.submit(
+            record_finish, session_id, run_id, key=("career", session_id, run_id)
+        )
+    )
+
+
+def _all_finished_runs(driver_ids) -> list[FinishedRun]:
+    runs = []
+    for alias in shards.all_aliases():
+        queryset = Run.objects.using(alias).all()
+        if driver_ids is not None:
+            queryset = queryset.filter(driver_id__in=driver_ids)
+        runs += finished_runs(queryset)
+    return runs
+
+
+def rebuild(driver_ids=None) -> int:
+    """Recompute the rows of ``driver_ids`` (all drivers if ``None``) from their runs."""
+    if driver_ids is not None:
+        driver_ids = sorted(set(driver_ids))
+        if not driver_ids:
+            return 0
+    runs = _all_finished_runs(driver_ids)
+    stages = {
+        session.pk: session.stage
+        for session in Session.objects.filter(
+            pk__in={run.session_id for run in runs}
+        ).select_related("stage__event")
+    }
+    rows: dict[tuple[int, str], DriverBest] = {}
+    contributions = []
+    # In finish order, like the incremental updates.
+    runs.sort(key=lambda run: (run.finished_at is None, run.finished_at or 0, run.run_id))
+    for run in runs:
+        stage = stages.get(run.session_id)
+        if stage is None:
+            continue
+        for scope, key, label in stage_keys(stage, run.race_class_id):
+            contributions.append(
+                DriverBestRun(
+                    driver_id=run.driver_id,
+                    key=key,
+                    session_id=run.session_id,
+                    run_id=run.run_id,
+                    final_time_ms=run.final_time_ms,
+                    finished_at=run.finished_at,
+                )
+            )
+            row = rows.get((run.driver_id, key))
+            if row is None:
+                row = rows[run.driver_id, key] = DriverBest(
+                    driver_id=run.driver_id,
+                    race_class_id=run.race_class_id,
+                    scope=scope,
+                    key=key,
+                    label=label,
+                )
+            if row.best_final_ms is None or run.final_time_ms < row.best_final_ms:
+                row.previous_best_ms = row.best_final_ms
+                row.best_final_ms = run.final_time_ms
+                row.best_run_id = run.run_id
+                row.best_session_id = run.session_id
+                row.best_at = run.finished_at
+            row.finished_runs += 1
+            row.total_final_ms += run.final_time_ms
+            row.last_final_ms = run.final_time_ms
+            row.last_run_id = run.run_id
+            row.last_session_id = run.session_id
+    with transaction.atomic():
+        for model in (DriverBestRun, DriverBest):
+            stale = model.objects.all()
+            if driver_ids is not None:
+                stale = stale.filter(driver_id__in=driver_ids)
+            stale.delete()
+        DriverBest.objects.bulk_create(rows.values(), batch_size=500)
+        DriverBestRun.objects.bulk_create(contributions, batch_size=500)
+    return len(rows)
+
+
+def schedule_rebuild(driver_ids, using: str | None = None) -> None:
+    """Rebuild the rows of ``driver_ids`` once the transaction of ``using`` commits."""
+    for driver_id in set(driver_ids):
+        shards.on_commit(
+            lambda driver_id=driver_id: worker.submit(
+                rebuild, [driver_id], key=("career_rebuild", driver_id)
+            ),
+            using=using,
+        )
+
+
+def _compare(
+    row: DriverBest | None, session_id: int, run_id: int, final: int
+) -> tuple[int | None, int | None]:
+    """Best before the run and the best including it.
+
+    Works whether or not the run has been added to ``row`` yet, so boards
+    regenerated before ``record_finish`` ran show the same result.
+    """
+    if row is None:
+        return None, final
+    is_best = row.best_run_id == run_id and row.best_session_id == session_id
+    reference = row.previous_best_ms if is_best else row.best_final_ms
+    best = final if reference is None else min(reference, final)
+    return reference, best
+
+
+def annotate_entries(
+    session: Session, entries: list[dict], class_ids: dict[int, int | None]
+) -> None:
+    """Add personal and season best fields to the finished board entries.
+
+    ``class_ids`` maps run ids to the effective class of the run. Reads the
+    rows of all drivers on the board with one query.
+    """
+    finished = [entry for entry in entries if entry["final_time"] is not None]
+    if not finished:
+        return
+    keys = {}
+    for entry in finished:
+        class_id = class_ids.get(entry["run_id"])
+        if class_id not in keys:
+            keys[class_id] = {
+                scope: key for scope, key, _label in stage_keys(session.stage, class_id)
+            }
+    rows = {
+        (row.driver_id, row.key): row
+        for row in DriverBest.objects.filter(
+            driver_id__in={entry["driver_id"] for entry in finished},
+            key__in=[scoped[scope] for scoped in keys.values() for _prefix, scope in BOARD_SCOPES],
+        )
+    }
+    for entry in finished:
+        scoped = keys[class_ids.get(entry["run_id"])]
+        final = entry["final_time_ms"]
+        for prefix, scope in BOARD_SCOPES:
+            row = rows.get((entry["driver_id"], scoped[scope]))
+            reference, best = _compare(row, session.pk, entry["run_id"], final)
+            entry[f"{prefix}_best_ms"] = best
+            entry[f"{prefix}_best_delta_ms"] = final - reference if reference is not None else None
+            # A driver's first finish is a personal best as well.
+            entry[f"is_{prefix}_best"] = reference is None or final < reference
+
+
+def driver_bests(driver_id: int, scope: str | None = None) -> list[dict]:
+    """All rows of a driver as JSON-ready dicts (race control API)."""
+    rows = DriverBest.objects.filter(driver_id=driver_id).select_related("race_class")
+    if scope is not None:
+        rows = rows.filter(scope=scope)
+    return [
+        {
+            "scope": row.scope,
+            "key": row.key,
+            "label": row.label,
+            "race_class": row.race_class.name if row.race_class else None,
+            "best_final_ms": row.best_final_ms,
+            "best_run_id": row.best_run_id,
+            "best_session_id": row.best_session_id,
+            "best_at": row.best_at,
+            "previous_best_ms": row.previous_best_ms,
+            "finished_runs": row.finished_runs,
+            "average_final_ms": row.average_final_ms,
+            "last_final_ms": row.last_final_ms,
+            "last_run_id": row.last_run_id,
+            "last_session_id": row.last_session_id,
+        }
+        for row in rows
+    ]
+
+
+def run_bests(run: Run, stage: Stage, race_class_id: int | None) -> dict:
+    """Stage, course and season best of the run's driver with the run's delta to each.
+
+    ``reference_ms`` is the best the run is compared against: the best
+    before it if the run set the current best, else the current best.
+    """
+    scoped = stage_keys(stage, race_class_id)
+    rows = {
+        row.key: row
+        for row in DriverBest.objects.filter(
+            driver_id=run.driver_id, key__in=[key for _scope, key, _label in scoped]
+        )
+    }
+    finished = run.status == Run.Status.FINISHED and run.final_time_ms is not None
+    result = {"run_id": run.pk, "driver_id": run.driver_id, "race_class_id": race_class_id}
+    for scope, key, label in scoped:
+        row = rows.get(key)
+        if finished:
+            reference, best = _compare(row, run.session_id, run.pk, run.final_time_ms)
+        else:
+            reference = best = row.best_final_ms if row is not None else None
+        compared = finished and reference is not None
+        result[scope] = {
+            "label": label,
+            "best_ms": best,
+            "reference_ms": reference,
+            "delta_ms": run.final_time_ms - reference if compared else None,
+            "is_best": finished and (reference is None or run.final_time_ms < reference),
+            "finished_runs": row.finished_runs if row is not None else 0,
+        }
+    return result
@@ -0,0 +1,275 @@
+"""
+Gate clock synchronisation and timestamp normalisation.
+
+Passages carry the gate's own clock; start and finish are different
+devices, so run times are only right if their clocks agree. Gates send a
+heartbeat (``POST /api/gates/<uid>/heartbeat/``) every few seconds. Like
+NTP, each heartbeat reports the previous exchange: gate send ``t1``,
+server receive ``t2``, server send ``t3``, gate receive ``t4``. That gives
+
+* offset ``((t2 - t1) + (t3 - t4)) / 2`` (server clock minus gate clock),
+* round-trip delay ``(t4 - t1) - (t3 - t2)``.
+
+Per gate, ``GateClockEstimator`` keeps the sample with the smallest delay
+out of every few (the least disturbed by the network), fits offset and
+drift by least squares over the recent filtered samples and tracks the
+residual jitter. A jump of the gate clock resets the fit.
+
+Ingest normalises every passage with the current fit in constant time
+(``clocks.normalize``): ``server_ms = gate_ms + offset + drift * (gate_ms -
+reference)``. Passages taken while the estimate is missing, stale, young
+or jittery are flagged ``Passage.ClockSync.UNSTABLE`` (or ``NONE`` for
+gates that never sent a heartbeat) so race control can review them.
+
+Estimates are process-local, like the other ingest state; heartbeats and
+passages of a gate go to the same ingest process. The background worker
+writes them to ``GateClock`` for the gate health page and to seed the
+estimate after a restart.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .background import worker
+from .gate_registry import GateEntry
+from .models import Gate, GateClock, Passage
+
+# Raw samples per filter round; the one with the smallest delay is kept.
+FILTER_SAMPLES = 4
+# Filtered samples used for the offset/drift fit.
+FIT_POINTS = 16
+MIN_STABLE_POINTS = 4
+# Drift beyond this is treated as a broken clock rather than drift.
+MAX_DRIFT_PPM = 500.0
+
+
+def now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+class ClockSample(NamedTuple):
+    gate_ms: float
+    offset_ms: float
+    delay_ms: float
+
+
+class ClockEstimate(NamedTuple):
+    """Immutable fit; replaced as a whole so ``normalize`` needs no lock."""
+
+    offset_ms: float
+    drift: float
+    reference_ms: float
+    jitter_ms: float | None
+    delay_ms: float | None
+    points: int
+    updated_ms: int
+
+    def to_server(self, gate_ms: int) -> int:
+        return round(gate_ms + self.offset_ms + self.drift * (gate_ms - self.reference_ms))
+
+
+def exchange_sample(t1: int, t2: int, t3: int, t4: int) -> ClockSample:
+    """Offset and delay of one request/response exchange (NTP formulas)."""
+    return ClockSample(
+        gate_ms=(t1 + t4) / 2,
+        offset_ms=((t2 - t1) + (t3 - t4)) / 2,
+        delay_ms=(t4 - t1) - (t3 - t2),
+    )
+
+
+def fit(points: list[ClockSample]) -> tuple[float, float, float | None]:
+    """Least-squares offset at the newest point, drift and RMS residual."""
+    reference = points[-1].gate_ms
+    if len(points) < 3:
+        return points[-1].offset_ms, 0.0, None
+    xs = [point.gate_ms - reference for point in points]
+    ys = [point.offset_ms for point in points]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    drift = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread if spread else 0.0
+    offset = mean_y - drift * mean_x
+    residuals = [y - (offset + drift * x) for x, y in zip(xs, ys)]
+    jitter = math.sqrt(sum(r * r for r in residuals) / len(residuals))
+    return offset, drift, jitter
+
+
+class GateClockEstimator:
+    """Offset and drift of one gate's clock from heartbeat samples."""
+
+    def __init__(self, seed: ClockEstimate | None = None) -> None:
+        self._raw: list[ClockSample] = []
+        self.points: deque[ClockSample] = deque(maxlen=FIT_POINTS)
+        self.estimate = seed
+        self.rejected = 0
+
+    def add(self, sample: ClockSample, received_ms: int) -> None:
+        if sample.delay_ms < 0 or sample.delay_ms > max_delay_ms():
+            self.rejected += 1
+            return
+        if self.estimate is not None and self._jumped(sample, sample.delay_ms / 2):
+            # Off by more than the network delay can explain: the gate clock
+            # jumped (reboot, NTP step), so start over right away.
+            self._raw = []
+            self.points.clear()
+        self._raw.append(sample)
+        if len(self._raw) < FILTER_SAMPLES and self.points:
+            return
+        best = min(self._raw, key=lambda raw: raw.delay_ms)
+        self._raw = []
+        if self.points and self._jumped(best, 0):
+            self.points.clear()
+        self.points.append(best)
+        offset, drift, jitter = fit(list(self.points))
+        if abs(drift) * 1_000_000 > MAX_DRIFT_PPM:
+            drift = 0.0
+        self.estimate = ClockEstimate(
+            offset_ms=offset,
+            drift=drift,
+            reference_ms=self.points[-1].gate_ms,
+            jitter_ms=jitter,
+            delay_ms=best.delay_ms,
+            points=len(self.points),
+            updated_ms=received_ms,
+        )
+
+    def _jumped(self, sample: ClockSample, tolerance_ms: float) -> bool:
+        predicted = self.estimate.to_server(round(sample.gate_ms)) - sample.gate_ms
+        return abs(sample.offset_ms - predicted) - tolerance_ms > step_ms()
+
+
+def max_delay_ms() -> float:
+    return getattr(settings, "RALLYCONTROL_CLOCK_MAX_DELAY_MS", 1000)
+
+
+def step_ms() -> float:
+    return getattr(settings, "RALLYCONTROL_CLOCK_STEP_MS", 50)
+
+
+def is_stable(estimate: ClockEstimate | None, now: int) -> bool:
+    if estimate is None or estimate.jitter_ms is None:
+        return False
+    max_age_ms = getattr(settings, "RALLYCONTROL_CLOCK_MAX_AGE_SECONDS", 120) * 1000
+    return (
+        estimate.points >= MIN_STABLE_POINTS
+        and estimate.jitter_ms <= getattr(settings, "RALLYCONTROL_CLOCK_MAX_JITTER_MS", 5)
+        and now - estimate.updated_ms <= max_age_ms
+    )
+
+
+class GateClocks:
+    """Clock estimates of all gates of this process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._gates: dict[int, GateClockEstimator] = {}
+        self._dirty: set[int] = set()
+        self._loaded = False
+
+    def _load(self) -> None:
+        # Seed from the stored estimates once per process; they count as
+        # unstable until fresh heartbeats arrive.
+        for row in GateClock.objects.all():
+            self._gates.setdefault(
+                row.gate_id,
+                GateClockEstimator(
+                    ClockEstimate(
+                        offset_ms=row.offset_ms,
+                        drift=row.drift_ppm / 1_000_000,
+                        reference_ms=row.reference_ms,
+                        jitter_ms=None,
+                        delay_ms=row.delay_ms,
+                        points=0,
+                        updated_ms=0,
+                    )
+                ),
+            )
+        self._loaded = True
+
+    def _estimator(self, gate_id: int) -> GateClockEstimator:
+        if not self._loaded:
+            self._load()
+        estimator = self._gates.get(gate_id)
+        if estimator is None:
+            estimator = self._gates[gate_id] = GateClockEstimator()
+        return estimator
+
+    def add_exchange(self, entry: GateEntry, t1: int, t2: int, t3: int, t4: int) -> None:
+        """Feed one completed heartbeat exchange of a gate."""
+        with self._lock:
+            self._estimator(entry.gate_id).add(exchange_sample(t1, t2, t3, t4), now_ms())
+            self._dirty.add(entry.gate_id)
+        worker.submit(self.flush, key=("gate_clock_flush",))
+
+    def estimate(self, gate_id: int) -> ClockEstimate | None:
+        estimator = self._gates.get(gate_id)
+        if estimator is None and not self._loaded:
+            with self._lock:
+                estimator = self._estimator(gate_id)
+        return estimator.estimate if estimator is not None else None
+
+    def normalize(self, entry: GateEntry, gate_ms: int) -> tuple[int, str]:
+        """Server clock timestamp of ``gate_ms`` and the ``Passage.ClockSync`` state."""
+        estimate = self.estimate(entry.gate_id)
+        if estimate is None:
+            return gate_ms, Passage.ClockSync.NONE
+        if is_stable(estimate, now_ms()):
+            return estimate.to_server(gate_ms), Passage.ClockSync.STABLE
+        return estimate.to_server(gate_ms), Passage.ClockSync.UNSTABLE
+
+    def status(self, gate_id: int) -> dict | None:
+        estimate = self.estimate(gate_id)
+        if estimate is None:
+            return None
+        return {
+            "offset_ms": round(estimate.offset_ms, 1),
+            "drift_ppm": round(estimate.drift * 1_000_000, 2),
+            "jitter_ms": round(estimate.jitter_ms, 2) if estimate.jitter_ms is not None else None,
+            "delay_ms": estimate.delay_ms,
+            "points": estimate.points,
+            "stable": is_stable(estimate, now_ms()),
+        }
+
+    def flush(self) -> int:
+        """Store the estimates of gates with new heartbeats."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            estimates = {gate_id: self._gates[gate_id].estimate for gate_id in dirty}
+        synced_at = timezone.now()
+        for gate_id, estimate in estimates.items():
+            Gate.objects.filter(pk=gate_id).update(last_seen_at=synced_at)
+            if estimate is None:
+                continue
+            GateClock.objects.update_or_create(
+                gate_id=gate_id,
+                defaults={
+                    "offset_ms": estimate.offset_ms,
+                    "drift_ppm": estimate.drift * 1_000_000,
+                    "reference_ms": round(estimate.reference_ms),
+                    "jitter_ms": estimate.jitter_ms,
+                    "delay_ms": estimate.delay_ms,
+                    "samples": estimate.points,
+                    "is_stable": is_stable(estimate, now_ms()),
+                    "synced_at": synced_at,
+                },
+            )
+        return len(estimates)
+
+    def reset(self, gate_id: int | None = None) -> None:
+        with self._lock:
+            if gate_id is None:
+                self._gates.clear()
+                self._loaded = False
+            else:
+                self._gates.pop(gate_id, None)
+
+
+clocks = GateClocks()
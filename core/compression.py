@@ -0,0 +1,122 @@
+"""
+Precompressed public payloads.
+
+Kiosk boards and overlay feeds are the same bytes sent to every spectator
+until the snapshot is republished, and the venue WLAN is the bottleneck.
+``PayloadCache`` keeps each payload per snapshot version in memory,
+compressed once with gzip (and brotli when the ``brotli`` package is
+installed). Requests pick the best variant from ``Accept-Encoding`` and
+revalidate with ``If-None-Match``, so an unchanged board costs a 304 and
+no rendering, serialising or compressing at all.
+"""
+
+from __future__ import annotations
+
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Hashable
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only
+    brotli = None
+
+MIN_COMPRESS_BYTES = 256
+
+
+def accepted_encodings(request) -> set[str]:
+    encodings = set()
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        coding, _, params = part.partition(";")
+        name, _, value = params.partition("=")
+        quality = 1.0
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if coding.strip() and quality > 0:
+            encodings.add(coding.strip().lower())
+    return encodings
+
+
+def etag_matches(request, etag: str) -> bool:
+    header = request.headers.get("If-None-Match", "")
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+class CompressedPayload:
+    """One payload with its precomputed encodings."""
+
+    __slots__ = ("content_type", "etag", "variants")
+
+    def __init__(self, body: bytes, content_type: str, etag: str) -> None:
+        self.content_type = content_type
+        self.etag = etag
+        self.variants: dict[str | None, bytes] = {None: body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body, quality=11)
+            self.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+
+    def response(self, request) -> HttpResponse:
+        if etag_matches(request, self.etag):
+            response = HttpResponseNotModified()
+        else:
+            accepted = accepted_encodings(request)
+            encoding = None
+            for coding in ("br", "gzip"):
+                if coding in accepted and coding in self.variants:
+                    encoding = coding
+                    break
+            response = HttpResponse(self.variants[encoding], content_type=self.content_type)
+            if encoding is not None:
+                response["Content-Encoding"] = encoding
+            response["Content-Length"] = str(len(self.variants[encoding]))
+        response["ETag"] = self.etag
+        response["Vary"] = "Accept-Encoding"
+        # Clients keep the payload but revalidate it on every poll.
+        response["Cache-Control"] = "public, no-cache"
+        return response
+
+
+class PayloadCache:
+    """Process-local LRU of compressed payloads keyed by (key, version)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple] = OrderedDict()
+
+    @property
+    def max_entries(self) -> int:
+        return getattr(settings, "RALLYCONTROL_PUBLIC_CACHE_ENTRIES", 256)
+
+    def get(self, key: Hashable, version: Hashable) -> CompressedPayload | None:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or cached[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return cached[1]
+
+    def put(self, key: Hashable, version: Hashable, payload: CompressedPayload) -> None:
+        # Only the newest version of a key is kept.
+        with self._lock:
+            self._entries[key] = (version, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+payload_cache = PayloadCache()
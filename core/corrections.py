@@ -0,0 +1,162 @@
+"""
+Penalty and status corrections applied by race control.
+
+Every correction runs in one transaction with set-based ``UPDATE``
+statements, writes a ``RunCorrection`` audit entry and schedules exactly
+one leaderboard regeneration per affected session, no matter how many
+runs were touched.
+
+Run ids are only unique within an event shard, so corrections by id name
+their session: the ids are looked up in the session's database and must
+all belong to it.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.db.models import Case, F, QuerySet, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import career, replication, shards
+from .leaderboards import schedule_regeneration
+from .live_state import live_state_changed
+from .models import Run, RunCorrection, Session, User
+
+CORRECTION_STATUSES = (Run.Status.DNF, Run.Status.DSQ, Run.Status.VOID)
+
+
+class CorrectionError(Exception):
+    """Raised for invalid correction requests."""
+
+
+def _final_time(penalty) -> Case:
+    return Case(
+        When(total_time_ms__isnull=True, then=F("final_time_ms")),
+        default=F("total_time_ms") + penalty,
+    )
+
+
+def _run_ids(runs: Iterable[int] | QuerySet) -> list[int]:
+    if isinstance(runs, QuerySet):
+        return list(runs.values_list("pk", flat=True))
+    return sorted({int(pk) for pk in runs})
+
+
+def _session_runs(session: Session | int) -> QuerySet:
+    session_id = getattr(session, "pk", session)
+    return Run.objects.using(shards.alias_for_session(session_id)).filter(session_id=session_id)
+
+
+def _apply(
+    action: str,
+    runs: Iterable[int] | QuerySet,
+    updates: dict,
+    *,
+    session: Session | int | None = None,
+    user: User | None = None,
+    reason: str | None = None,
+    penalty_ms: int | None = None,
+    status: str | None = None,
+) -> RunCorrection:
+    """Apply ``updates`` to a queryset of runs or to run ids of ``session``."""
+    session_id = getattr(session, "pk", session)
+    if isinstance(runs, QuerySet):
+        using = runs.db
+    elif session_id is None:
+        raise CorrectionError("Läufe können nur mit ihrer Session korrigiert werden.")
+    else:
+        using = shards.alias_for_session(session_id)
+    with shards.using_db(using), shards.atomic(), replication.manual_changes():
+        run_ids = _run_ids(runs)
+        if not run_ids:
+            raise CorrectionError("Keine Läufe ausgewählt.")
+        targets = Run.objects.filter(pk__in=run_ids)
+        if session_id is not None:
+            targets = targets.filter(session_id=session_id)
+            found = set(targets.values_list("pk", flat=True))
+            if found != set(run_ids):
+                missing = ", ".join(str(pk) for pk in run_ids if pk not in found)
+                raise CorrectionError(f"Läufe {missing} gehören nicht zu Session {session_id}.")
+        affected = set(targets.values_list("session_id", "driver_id"))
+        session_ids = sorted({session_id for session_id, _driver_id in affected})
+        if not session_ids:
+            raise CorrectionError("Die ausgewählten Läufe existieren nicht.")
+        targets.update(version=F("version") + 1, updated_at=timezone.now(), **updates)
+        replication.record_bulk_changes(Run, run_ids, updates.keys())
+        replication.note_local_manual_change(run_ids, updates.keys())
+        correction = RunCorrection.objects.create(
+            action=action,
+            run_ids=run_ids,
+            session_ids=session_ids,
+            penalty_ms=penalty_ms,
+            status=status,
+            reason=reason,
+            created_by=user if user is not None and user.is_authenticated else None,
+        )
+        for session_id in session_ids:
+            schedule_regeneration(session_id)
+            live_state_changed(session_id, using)
+        career.schedule_rebuild({driver_id for _session_id, driver_id in affected}, using)
+    return correction
+
+
+def add_penalty(runs, penalty_ms: int, **kwargs) -> RunCorrection:
+    """Add ``penalty_ms`` (may be negative) to the penalty of every run."""
+    new_penalty = Greatest(F("penalty_ms") + Value(int(penalty_ms)), Value(0))
+    return _apply(
+        RunCorrection.Action.ADD_PENALTY,
+        runs,
+        {"penalty_ms": new_penalty, "final_time_ms": _final_time(new_penalty)},
+        penalty_ms=penalty_ms,
+        **kwargs,
+    )
+
+
+def set_penalty(runs, penalty_ms: int, **kwargs) -> RunCorrection:
+    """Replace the penalty of every run with ``penalty_ms``."""
+    if penalty_ms < 0:
+        raise CorrectionError("Strafzeit darf nicht negativ sein.")
+    return _apply(
+        RunCorrection.Action.SET_PENALTY,
+        runs,
+        {"penalty_ms": penalty_ms, "final_time_ms": _final_time(Value(penalty_ms))},
+        penalty_ms=penalty_ms,
+        **kwargs,
+    )
+
+
+def set_status(runs, status: str, **kwargs) -> RunCorrection:
+    """Mark runs as DNF, DSQ or VOID."""
+    if status not in CORRECTION_STATUSES:
+        raise CorrectionError(f"Status {status!r} kann nicht manuell gesetzt werden.")
+    return _apply(
+        RunCorrection.Action.SET_STATUS,
+        runs,
+        {"status": status},
+        status=status,
+        **kwargs,
+    )
+
+
+def dnf_running_runs(session: Session | int, **kwargs) -> RunCorrection:
+    """Set all still running runs of a session to DNF."""
+    runs = _session_runs(session).filter(status=Run.Status.RUNNING)
+    return set_status(runs, Run.Status.DNF, session=session, **kwargs)
+
+
+def recompute_final_times(session: Session | int, **kwargs) -> RunCorrection | None:
+    """Repair ``final_time_ms = total_time_ms + penalty_ms`` for a session."""
+    runs = _session_runs(session).filter(total_time_ms__isnull=False).exclude(
+        final_time_ms=F("total_time_ms") + F("penalty_ms")
+    )
+    if not runs.exists():
+        return None
+    return _apply(
+        RunCorrection.Action.RECOMPUTE,
+        runs,
+        {"final_time_ms": F("total_time_ms") + F("penalty_ms")},
+        session=session,
+        **kwargs,
+    )
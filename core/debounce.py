@@ -0,0 +1,93 @@
+"""
+Per-gate bounce filter for light barrier triggers.
+
+A single car often triggers a light barrier several times (bumper, wing,
+dust). Only the first trigger within the gate's debounce window is
+accepted; later triggers inside the window are suppressed. State is kept
+in process memory per gate (last accepted timestamp plus counters), so
+filtering costs no queries.
+"""
+
+from __future__ import annotations
+
+import threading
+
+from django.conf import settings
+
+from .gate_registry import GateEntry
+
+MODE_DROP = "drop"
+MODE_MARK = "mark"
+
+
+class GateDebounceState:
+    __slots__ = ("last_accepted_ms", "previous_ms", "accepted", "suppressed")
+
+    def __init__(self) -> None:
+        self.last_accepted_ms: int | None = None
+        self.previous_ms: int | None = None
+        self.accepted = 0
+        self.suppressed = 0
+
+
+class DebounceFilter:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._gates: dict[int, GateDebounceState] = {}
+
+    @property
+    def mode(self) -> str:
+        return getattr(settings, "RALLYCONTROL_DEBOUNCE_MODE", MODE_DROP)
+
+    def accept(self, entry: GateEntry, timestamp_ms: int) -> bool:
+        """Return ``True`` if the trigger is the first within the window."""
+        with self._lock:
+            state = self._gates.get(entry.gate_id)
+            if state is None:
+                state = self._gates[entry.gate_id] = GateDebounceState()
+            last = state.last_accepted_ms
+            if last is not None and abs(timestamp_ms - last) < entry.debounce_ms:
+                state.suppressed += 1
+                return False
+            state.previous_ms = last
+            state.last_accepted_ms = timestamp_ms
+            state.accepted += 1
+            return True
+
+    def rollback(self, entry: GateEntry, timestamp_ms: int) -> None:
+        """Undo ``accept`` of a trigger that could not be stored.
+
+        The gate retries the same timestamp, which must not count as a bounce.
+        """
+        with self._lock:
+            state = self._gates.get(entry.gate_id)
+            if state is None or state.last_accepted_ms != timestamp_ms:
+                return
+            state.last_accepted_ms = state.previous_ms
+            state.previous_ms = None
+            state.accepted -= 1
+
+    def stats(self) -> dict[int, dict]:
+        with self._lock:
+            return {
+                gate_id: {
+                    "accepted": state.accepted,
+                    "suppressed": state.suppressed,
+                    "suppression_rate": (
+                        state.suppressed / (state.accepted + state.suppressed)
+                        if state.accepted + state.suppressed
+                        else 0.0
+                    ),
+                }
+                for gate_id, state in self._gates.items()
+            }
+
+    def reset(self, gate_id: int | None = None) -> None:
+        with self._lock:
+            if gate_id is None:
+                self._gates.clear()
+            else:
+                self._gates.pop(gate_id, None)
+
+
+debounce = DebounceFilter()
@@ -0,0 +1,207 @@
+"""
+On-demand image derivatives of captures for the review screens.
+
+Full camera frames are far too large for operator tablets on the venue
+WLAN. ``derivative_for`` renders a small JPEG (thumbnail, preview or a crop
+around the number detected by OCR) the first time it is requested and
+keeps it in ``RALLYCONTROL_DERIVATIVE_DIR``. Files are named after the
+capture's SHA-256, the variant and the size, so a cached derivative never
+changes and can be served with long-lived cache headers. Crops are also
+named after their box; as the box of a result may change, their URL is
+revalidated against that name.
+
+``DerivativeCache`` tracks the files in least-recently-used order and
+evicts the oldest once the cache exceeds
+``RALLYCONTROL_DERIVATIVE_BUDGET_MB``. Hits refresh the file's mtime so the
+order survives restarts.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+from django.conf import settings
+
+from .models import Capture, OCRResult
+from .uploads import capture_dir
+
+# Variant name -> longest edge in pixels.
+VARIANTS = {
+    "thumb": 320,
+    "preview": 960,
+    "crop": 320,
+}
+JPEG_QUALITY = 80
+# Margin around the OCR bounding box, relative to its size.
+CROP_MARGIN = 0.25
+
+
+class DerivativeError(Exception):
+    """Raised when a derivative cannot be rendered (missing source, bad variant)."""
+
+
+class DerivativeCache:
+    """Size-bounded on-disk cache with LRU eviction."""
+
+    def __init__(self, directory: Path | None = None, budget_bytes: int | None = None) -> None:
+        self._directory = directory
+        self._budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._index: OrderedDict[Path, int] = OrderedDict()
+        self._total = 0
+        self._loaded = False
+
+    @property
+    def directory(self) -> Path:
+        if self._directory is not None:
+            return self._directory
+        return Path(
+            getattr(settings, "RALLYCONTROL_DERIVATIVE_DIR", settings.BASE_DIR / "derivatives")
+        )
+
+    @property
+    def budget_bytes(self) -> int:
+        if self._budget_bytes is not None:
+            return self._budget_bytes
+        return getattr(settings, "RALLYCONTROL_DERIVATIVE_BUDGET_MB", 512) * 1024 * 1024
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def get_or_create(self, name: str, render: Callable[[], bytes]) -> Path:
+        """Return the cached file ``name``, rendering it on a miss."""
+        path = self.directory / name[:2] / name
+        with self._lock:
+            self._load()
+            if path in self._index and path.exists():
+                self._index.move_to_end(path)
+                os.utime(path)
+                return path
+        data = render()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._total += len(data) - self._index.pop(path, 0)
+            self._index[path] = len(data)
+            self._evict()
+        return path
+
+    def clear(self) -> None:
+        with self._lock:
+            self._load()
+            for path in self._index:
+                path.unlink(missing_ok=True)
+            self._index.clear()
+            self._total = 0
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        files = []
+        if self.directory.exists():
+            for path in self.directory.glob("*/*.jpg"):
+                stat = path.stat()
+                files.append((stat.st_mtime, path, stat.st_size))
+        for _mtime, path, size in sorted(files):
+            self._index[path] = size
+            self._total += size
+        self._loaded = True
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._total > self.budget_bytes and len(self._index) > 1:
+            path, size = self._index.popitem(last=False)
+            path.unlink(missing_ok=True)
+            self._total -= size
+
+
+derivative_cache = DerivativeCache()
+
+
+def _render(source: Path, size: int, box: tuple[int, int, int, int] | None = None) -> bytes:
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(source)
+    except OSError as exc:
+        raise DerivativeError(f"Cannot read {source}: {exc}") from exc
+    with image:
+        image = ImageOps.exif_transpose(image)
+        if box is not None:
+            image = image.crop(box)
+        image.thumbnail((size, size))
+        output = io.BytesIO()
+        image.convert("RGB").save(output, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return output.getvalue()
+
+
+def _crop_box(bbox, width: int | None, height: int | None) -> tuple[int, int, int, int]:
+    x, y, w, h = (int(value) for value in bbox)
+    margin_x, margin_y = int(w * CROP_MARGIN), int(h * CROP_MARGIN)
+    left, top = max(x - margin_x, 0), max(y - margin_y, 0)
+    right, bottom = x + w + margin_x, y + h + margin_y
+    if width:
+        right = min(right, width)
+    if height:
+        bottom = min(bottom, height)
+    return left, top, right, bottom
+
+
+def source_path(capture: Capture) -> Path:
+    return capture_dir() / capture.image_path
+
+
+def cache_key(capture: Capture) -> str:
+    # Capture pks repeat across event shards; the database tells them apart.
+    return capture.sha256 or f"{capture._state.db}-capture{capture.pk:08d}"
+
+
+def derivative_for(capture: Capture, variant: str) -> Path:
+    """Path of a thumbnail or preview of ``capture`` (rendered on demand)."""
+    if variant not in VARIANTS or variant == "crop":
+        raise DerivativeError(f"Unknown variant {variant!r}.")
+    size = VARIANTS[variant]
+    source = source_path(capture)
+    if not source.exists():
+        raise DerivativeError(f"Capture image {source} is missing.")
+    name = f"{cache_key(capture)}-{variant}-{size}.jpg"
+    return derivative_cache.get_or_create(name, lambda: _render(source, size))
+
+
+def _result_box(result: OCRResult) -> tuple[int, int, int, int] | None:
+    if not result.bbox or len(result.bbox) != 4:
+        return None
+    return _crop_box(result.bbox, result.capture.width, result.capture.height)
+
+
+def crop_name(result: OCRResult) -> str:
+    """Cache file name of the crop of ``result`` (the thumbnail's without a box)."""
+    capture = result.capture
+    box = _result_box(result)
+    if box is None:
+        return f"{cache_key(capture)}-thumb-{VARIANTS['thumb']}.jpg"
+    return f"{cache_key(capture)}-crop-{'_'.join(map(str, box))}-{VARIANTS['crop']}.jpg"
+
+
+def crop_for(result: OCRResult) -> Path:
+    """Path of a crop around the number detected in ``result``.
+
+    Falls back to the thumbnail when the OCR engine reported no bounding box.
+    """
+    capture = result.capture
+    box = _result_box(result)
+    if box is None:
+        return derivative_for(capture, "thumb")
+    size = VARIANTS["crop"]
+    source = source_path(capture)
+    if not source.exists():
+        raise DerivativeError(f"Capture image {source} is missing.")
+    return derivative_cache.get_or_create(crop_name(result), lambda: _render(source, size, box))
@@ -65,6 +65,7 @@ class SessionForm(forms.ModelForm):
             "status",
             "start_time",
             "end_time",
+            "start_interval_s",
         ]
         widgets = {
             "start_time": forms.DateTimeInput(attrs={"type": "datetime-local"}),
@@ -85,6 +86,7 @@ class GateForm(forms.ModelForm):
             "is_enabled",
             "last_seen_at",
             "fw_version",
+            "debounce_ms",
             "notes",
         ]
         widgets = {
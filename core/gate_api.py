@@ -0,0 +1,198 @@
+"""Gate-facing HTTP endpoints (JSON, no session or CSRF)."""
+
+import hashlib
+import json
+import math
+import time
+
+from django.conf import settings
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from . import clock_sync, ingest, shards, uploads
+from .gate_registry import GateEntry, registry
+from .recorder import recorder
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class GateEndpointView(View):
+    """Base view that authenticates the gate from the URL via the registry."""
+
+    http_method_names = ["post"]
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            self.gate = ingest.authenticate_gate(kwargs["gate_uid"])
+            with shards.using_session(self.gate.session_id):
+                return super().dispatch(request, *args, **kwargs)
+        except ingest.IngestError as exc:
+            return JsonResponse({"error": str(exc)}, status=exc.status_code)
+
+    def get_payload(self) -> dict:
+        try:
+            payload = json.loads(self.request.body or b"{}")
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise ingest.IngestError("Body must be valid JSON.") from exc
+        if not isinstance(payload, dict):
+            raise ingest.IngestError("Body must be a JSON object.")
+        return payload
+
+
+class GatePassageView(GateEndpointView):
+    def post(self, request, gate_uid):
+        payload = self.get_payload()
+        recorder.record(self.gate, "passage", payload)
+        passage = ingest.record_passage(
+            self.gate,
+            payload,
+            raw_payload=request.body.decode("utf-8", "replace"),
+        )
+        if passage is None:
+            return JsonResponse({"passage_id": None, "suppressed": True}, status=202)
+        return JsonResponse(
+            {
+                "passage_id": passage.pk,
+                "session_id": passage.session_id,
+                "suppressed": not passage.is_valid,
+            },
+            status=201,
+        )
+
+
+class GateHeartbeatView(GateEndpointView):
+    """Clock sync ping: ``{"t1": ..., "previous": {"t1", "t2", "t3", "t4"}}``.
+
+    Answers ``t1`` (echoed), ``t2`` (server receive) and ``t3`` (server
+    send) on the server clock, plus the gate's current clock estimate.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        self.received_ms = clock_sync.now_ms()
+        return super().dispatch(request, *args, **kwargs)
+
+    def post(self, request, gate_uid):
+        payload = self.get_payload()
+        # Replay needs the clock exchanges to normalise passages like ingest did.
+        recorder.record(self.gate, "heartbeat", payload)
+        body = ingest.record_heartbeat(self.gate, payload, self.received_ms)
+        body["t3"] = clock_sync.now_ms()
+        return JsonResponse(body)
+
+
+def _upload_state(upload) -> dict:
+    return {
+        "upload_id": str(upload.upload_id),
+        "offset": upload.received_bytes,
+        "size": upload.size,
+        "status": upload.status,
+        "capture_id": upload.capture_id,
+    }
+
+
+class CaptureUploadStartView(GateEndpointView):
+    """Register a capture image; returns the upload id and offset to resume at."""
+
+    def post(self, request, gate_uid):
+        upload = uploads.start_upload(self.gate, self.get_payload())
+        return JsonResponse(_upload_state(upload), status=201)
+
+
+class CaptureUploadChunkView(GateEndpointView):
+    """``GET`` returns the current offset, ``POST`` appends a raw chunk.
+
+    The chunk offset is sent in the ``Upload-Offset`` header; the body is
+    streamed to disk without being buffered in memory.
+    """
+
+    http_method_names = ["get", "post"]
+
+    def get(self, request, gate_uid, upload_id):
+        return JsonResponse(_upload_state(uploads.get_upload(self.gate, upload_id)))
+
+    def post(self, request, gate_uid, upload_id):
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            raise ingest.IngestError("Upload-Offset header must be an integer.")
+        try:
+            upload = uploads.append_chunk(self.gate, upload_id, offset, request, length)
+        except uploads.UploadOffsetMismatch as exc:
+            return JsonResponse({"error": str(exc), "offset": exc.offset}, status=409)
+        return JsonResponse(_upload_state(upload))
+
+
+def gate_config(entry: GateEntry) -> dict:
+    return {
+        "gate_uid": entry.gate_uid,
+        "name": entry.name,
+        "gate_type": entry.gate_type,
+        "is_enabled": entry.is_enabled,
+        "stage_id": entry.stage_id,
+        "stage_name": entry.stage_name,
+        "session_id": entry.session_id,
+        "session_name": entry.session_name,
+        "debounce_ms": entry.debounce_ms,
+    }
+
+
+def config_etag(config: dict) -> str:
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class GateConfigView(View):
+    """Long-polled configuration of a gate.
+
+    The gate sends the ETag of the configuration it has in
+    ``If-None-Match``. While nothing relevant to this gate changes, the
+    request waits up to ``?wait=`` seconds (at most
+    ``RALLYCONTROL_GATE_CONFIG_WAIT_SECONDS``) and then answers ``304``; a
+    change of the gate, its stage or the running session answers at once
+    with the new configuration. Disabled gates receive their configuration
+    too, so they learn that they are disabled.
+
+    Every waiting request holds a server thread for up to the full wait.
+    ``ingest_server`` starts a thread per connection; behind a WSGI server
+    allow at least one thread per gate on top of the threads for passages
+    (e.g. gunicorn ``--worker-class gthread --threads``), or the waiting
+    gates starve ingest.
+    """
+
+    http_method_names = ["get"]
+
+    def get(self, request, gate_uid):
+        max_wait = getattr(settings, "RALLYCONTROL_GATE_CONFIG_WAIT_SECONDS", 25)
+        try:
+            wait = float(request.GET.get("wait", max_wait))
+        except ValueError:
+            wait = max_wait
+        if not math.isfinite(wait):
+            # ``nan`` would never reach the deadline and pin the thread.
+            wait = max_wait
+        wait = min(max(wait, 0.0), max_wait)
+        known = request.headers.get("If-None-Match", "")
+        interval = registry.check_interval
+        deadline = time.monotonic() + wait
+        while True:
+            entry = registry.get(gate_uid)
+            if entry is None:
+                return JsonResponse({"error": f"Gate {gate_uid!r} is unknown."}, status=403)
+            config = gate_config(entry)
+            etag = config_etag(config)
+            if etag != known:
+                response = JsonResponse(config)
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                response = HttpResponseNotModified()
+                break
+            # Wakes on local changes at once; other processes' changes are
+            # noticed by the registry's version check after ``interval``.
+            registry.wait_for_change(min(remaining, interval))
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        return response
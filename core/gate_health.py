@@ -0,0 +1,205 @@
+"""
+Per-minute gate health rollups.
+
+Ingest notes the outcome of every gate message (valid, invalid, debounced,
+rejected), its signal quality bucket and how long the server took to
+process it. The counts are accumulated in memory and added to
+``GateHealthMinute`` rows by the background worker with ``F()``
+increments, so several processes can feed the same rows and the hot path
+never waits for the write. The gate health page then reads a handful of
+rollup rows instead of scanning ``Passage``.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .background import worker
+from .gate_registry import GateEntry, registry
+from .models import GateClock, GateHealthMinute
+
+VALID = "valid"
+INVALID = "invalid"
+DEBOUNCED = "debounced"
+REJECTED = "rejected"
+
+SIGNAL_BUCKETS = ("good", "fair", "poor")
+SIGNAL_LABELS = {"good": "good", "ok": "fair", "fair": "fair", "weak": "poor", "poor": "poor", "bad": "poor"}
+# Numeric signal quality (0-100) at or above these values counts as good/fair.
+SIGNAL_GOOD_MIN = 70
+SIGNAL_FAIR_MIN = 40
+
+# Upper bound in ms -> histogram field; slower messages go to latency_slow.
+LATENCY_BUCKETS = (
+    (1, "latency_le_1ms"),
+    (5, "latency_le_5ms"),
+    (20, "latency_le_20ms"),
+    (100, "latency_le_100ms"),
+    (500, "latency_le_500ms"),
+)
+LATENCY_FIELDS = [field for _bound, field in LATENCY_BUCKETS] + ["latency_slow"]
+COUNT_FIELDS = [
+    VALID,
+    INVALID,
+    DEBOUNCED,
+    REJECTED,
+    *(f"signal_{bucket}" for bucket in (*SIGNAL_BUCKETS, "unknown")),
+    *LATENCY_FIELDS,
+]
+
+
+def signal_bucket(signal_quality) -> str:
+    """``good``/``fair``/``poor`` from a 0-100 value or label, else ``unknown``."""
+    if signal_quality in (None, ""):
+        return "unknown"
+    try:
+        value = float(signal_quality)
+    except (TypeError, ValueError):
+        return SIGNAL_LABELS.get(str(signal_quality).strip().lower(), "unknown")
+    if value >= SIGNAL_GOOD_MIN:
+        return "good"
+    if value >= SIGNAL_FAIR_MIN:
+        return "fair"
+    return "poor"
+
+
+def latency_field(elapsed_ms: float) -> str:
+    for bound, field in LATENCY_BUCKETS:
+        if elapsed_ms <= bound:
+            return field
+    return "latency_slow"
+
+
+def minute_of(moment: datetime) -> datetime:
+    return moment.replace(second=0, microsecond=0)
+
+
+class GateHealthRollup:
+    """In-memory deltas per (gate, minute), flushed by the background worker."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[int, datetime], Counter] = {}
+        self._max_latency: dict[tuple[int, datetime], int] = {}
+        self._pruned_at: datetime | None = None
+
+    def note(
+        self,
+        entry: GateEntry,
+        outcome: str,
+        signal_quality=None,
+        elapsed_ms: float = 0.0,
+        now: datetime | None = None,
+    ) -> None:
+        key = (entry.gate_id, minute_of(now or timezone.now()))
+        with self._lock:
+            counts = self._pending.setdefault(key, Counter())
+            counts[outcome] += 1
+            counts[f"signal_{signal_bucket(signal_quality)}"] += 1
+            counts[latency_field(elapsed_ms)] += 1
+            self._max_latency[key] = max(self._max_latency.get(key, 0), int(elapsed_ms))
+        worker.submit(self.flush, key=("gate_health_flush",))
+
+    def flush(self) -> int:
+        """Add the pending deltas to the rollup rows; return the rows touched."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            max_latency, self._max_latency = self._max_latency, {}
+        for (gate_id, minute), counts in pending.items():
+            self._apply(gate_id, minute, counts, max_latency.get((gate_id, minute), 0))
+        self._prune_if_due()
+        return len(pending)
+
+    def _apply(self, gate_id: int, minute: datetime, counts: Counter, max_ms: int) -> None:
+        increments = {field: F(field) + count for field, count in counts.items()}
+        increments["latency_max_ms"] = Greatest(F("latency_max_ms"), Value(max_ms))
+        rows = GateHealthMinute.objects.filter(gate_id=gate_id, minute=minute)
+        if rows.update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                GateHealthMinute.objects.create(
+                    gate_id=gate_id, minute=minute, latency_max_ms=max_ms, **counts
+                )
+        except IntegrityError:
+            # Another process created the row first.
+            rows.update(**increments)
+
+    def _prune_if_due(self) -> None:
+        now = timezone.now()
+        if self._pruned_at is not None and now - self._pruned_at < timedelta(hours=1):
+            return
+        self._pruned_at = now
+        hours = getattr(settings, "RALLYCONTROL_GATE_HEALTH_RETENTION_HOURS", 48)
+        GateHealthMinute.objects.filter(minute__lt=now - timedelta(hours=hours)).delete()
+
+
+gate_health = GateHealthRollup()
+
+
+def latency_percentile(totals: dict, quantile: float) -> int | None:
+    """Upper bound (ms) of the histogram bucket holding ``quantile``."""
+    count = sum(totals[field] or 0 for field in LATENCY_FIELDS)
+    if not count:
+        return None
+    threshold = quantile * count
+    seen = 0
+    for bound, field in LATENCY_BUCKETS:
+        seen += totals[field] or 0
+        if seen >= threshold:
+            return bound
+    return totals["latency_max_ms"]
+
+
+def gate_health_summary(minutes: int = 10, now: datetime | None = None) -> list[dict]:
+    """Totals of the last ``minutes`` minutes for every known gate."""
+    since = minute_of(now or timezone.now()) - timedelta(minutes=minutes - 1)
+    rows = {
+        row["gate_id"]: row
+        for row in GateHealthMinute.objects.filter(minute__gte=since)
+        .values("gate_id")
+        .annotate(
+            **{field: Sum(field) for field in COUNT_FIELDS},
+            latency_max_ms=Max("latency_max_ms"),
+            last_minute=Max("minute"),
+        )
+        .order_by()
+    }
+    # Stored by the ingest process (``core.clock_sync``), which may not be this one.
+    clocks = {clock.gate_id: clock for clock in GateClock.objects.all()}
+    min_share = getattr(settings, "RALLYCONTROL_GATE_HEALTH_WARN_SHARE", 0.2)
+    summary = []
+    for entry in sorted(registry.entries(), key=lambda entry: entry.name):
+        totals = rows.get(entry.gate_id) or dict.fromkeys([*COUNT_FIELDS, "latency_max_ms"], 0)
+        triggers = totals[VALID] + totals[INVALID] + totals[DEBOUNCED]
+        signals = sum(totals[f"signal_{bucket}"] for bucket in SIGNAL_BUCKETS)
+        problem_share = (totals[INVALID] + totals[DEBOUNCED]) / triggers if triggers else 0.0
+        poor_share = totals["signal_poor"] / signals if signals else 0.0
+        summary.append(
+            {
+                "gate": entry,
+                "triggers": triggers,
+                "valid": totals[VALID],
+                "invalid": totals[INVALID],
+                "debounced": totals[DEBOUNCED],
+                "rejected": totals[REJECTED],
+                "problem_share": problem_share,
+                "signal": {bucket: totals[f"signal_{bucket}"] for bucket in SIGNAL_BUCKETS},
+                "poor_share": poor_share,
+                "latency_p50_ms": latency_percentile(totals, 0.5),
+                "latency_p95_ms": latency_percentile(totals, 0.95),
+                "latency_max_ms": totals["latency_max_ms"],
+                "last_minute": totals.get("last_minute"),
+                "clock": clocks.get(entry.gate_id),
+                "warning": problem_share >= min_share or poor_share >= min_share,
+            }
+        )
+    return summary
@@ -0,0 +1,171 @@
+"""
+Process-local gate registry for the ingest hot path.
+
+Every gate message is authenticated and routed by its ``gate_uid``. The
+registry keeps a snapshot of all gates together with the running session
+of their stage so that this lookup costs no queries. Saves of ``Gate`` and
+``Session`` invalidate the local snapshot immediately (see ``core.signals``)
+and bump a ``ConfigVersion`` counter so other worker processes notice the
+change on their next version check. Threads waiting in
+``wait_for_change`` (gate configuration long-polls) are woken on every
+invalidation and reload.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from .models import ConfigVersion, Gate, Session
+
+
+class GateEntry(NamedTuple):
+    """Immutable view of a gate as needed by ingest."""
+
+    gate_id: int
+    gate_uid: str
+    name: str
+    gate_type: str
+    is_enabled: bool
+    stage_id: int | None
+    session_id: int | None
+    debounce_ms: int
+    stage_name: str | None = None
+    session_name: str | None = None
+
+
+def default_debounce_ms(gate_type: str) -> int:
+    defaults = getattr(settings, "RALLYCONTROL_DEBOUNCE_MS", {})
+    return int(defaults.get(gate_type, defaults.get("default", 0)))
+
+
+class GateRegistry:
+    """Snapshot of gates keyed by ``gate_uid`` with cross-process versioning."""
+
+    def __init__(self, check_interval: float | None = None) -> None:
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._gates: dict[str, GateEntry] = {}
+        self._running_sessions: dict[int, int] = {}
+        self._changed = threading.Condition()
+        self._version = -1
+        self._checked_at = 0.0
+        self._stale = True
+
+    @property
+    def check_interval(self) -> float:
+        if self._check_interval is not None:
+            return self._check_interval
+        return getattr(settings, "RALLYCONTROL_GATE_REGISTRY_CHECK_SECONDS", 1.0)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, gate_uid: str) -> GateEntry | None:
+        """Return the entry for ``gate_uid`` or ``None`` for unknown gates."""
+        self._refresh_if_needed()
+        return self._gates.get(gate_uid)
+
+    def running_session_for_stage(self, stage_id: int | None) -> int | None:
+        if stage_id is None:
+            return None
+        self._refresh_if_needed()
+        return self._running_sessions.get(stage_id)
+
+    def entries(self) -> list[GateEntry]:
+        self._refresh_if_needed()
+        return list(self._gates.values())
+
+    def invalidate(self) -> None:
+        """Force a reload on the next lookup in this process."""
+        self._stale = True
+        self._notify()
+
+    def wait_for_change(self, timeout: float) -> None:
+        """Block until the registry is invalidated or reloaded, at most ``timeout``."""
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    def warm(self) -> bool:
+        """Load the registry eagerly at process startup.
+
+        Returns ``False`` if the tables do not exist yet (e.g. before the
+        first ``migrate``); the registry then loads lazily on first use.
+        """
+        try:
+            self.load()
+        except DatabaseError:
+            self._stale = True
+            return False
+        return True
+
+    def load(self) -> None:
+        with self._lock:
+            version = ConfigVersion.current(ConfigVersion.GATE_REGISTRY)
+            running: dict[int, int] = {}
+            session_names: dict[int, str] = {}
+            sessions = (
+                Session.objects.filter(status=Session.Status.RUNNING)
+                .order_by("stage_id", "-start_time", "-pk")
+                .values_list("stage_id", "pk", "name")
+            )
+            for stage_id, session_id, session_name in sessions:
+                if stage_id not in running:
+                    running[stage_id] = session_id
+                    session_names[session_id] = session_name
+            gates: dict[str, GateEntry] = {}
+            rows = Gate.objects.values_list(
+                "pk",
+                "gate_uid",
+                "name",
+                "gate_type",
+                "is_enabled",
+                "stage_id",
+                "debounce_ms",
+                "stage__name",
+            )
+            for pk, gate_uid, name, gate_type, is_enabled, stage_id, debounce_ms, stage in rows:
+                session_id = running.get(stage_id)
+                gates[gate_uid] = GateEntry(
+                    gate_id=pk,
+                    gate_uid=gate_uid,
+                    name=name,
+                    gate_type=gate_type,
+                    is_enabled=is_enabled,
+                    stage_id=stage_id,
+                    session_id=session_id,
+                    debounce_ms=(
+                        debounce_ms if debounce_ms is not None else default_debounce_ms(gate_type)
+                    ),
+                    stage_name=stage,
+                    session_name=session_names.get(session_id),
+                )
+            self._gates = gates
+            self._running_sessions = running
+            self._version = version
+            self._checked_at = time.monotonic()
+            self._stale = False
+        self._notify()
+
+    def _refresh_if_needed(self) -> None:
+        if self._stale:
+            self.load()
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        if ConfigVersion.current(ConfigVersion.GATE_REGISTRY) != self._version:
+            self.load()
+
+
+registry = GateRegistry()
@@ -0,0 +1,167 @@
+"""
+Gate ingest services.
+
+Gate-facing views parse the request and hand over to these functions. All
+lookups go through the process-local gate registry, so authenticating and
+routing a passage costs no queries; matching it to a run is done by
+``core.timing``. Passage timestamps are converted from the gate clock to
+the server clock with the gate's current estimate (``core.clock_sync``)
+before anything else looks at them.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from . import shards, timing
+from .clock_sync import clocks
+from .debounce import MODE_DROP, debounce
+from .gate_health import DEBOUNCED, INVALID, REJECTED, VALID, gate_health
+from .gate_registry import GateEntry, registry
+from .live_state import live_sessions
+from .models import Passage
+from .start_list import start_queues
+
+
+class IngestError(Exception):
+    """Raised when a gate message cannot be accepted."""
+
+    status_code = 400
+
+
+class GateRejected(IngestError):
+    """Unknown or disabled gate."""
+
+    status_code = 403
+
+
+class NoRunningSession(IngestError):
+    """The gate's stage has no running session to attach passages to."""
+
+    status_code = 409
+
+
+def authenticate_gate(gate_uid: str) -> GateEntry:
+    entry = registry.get(gate_uid)
+    if entry is None or not entry.is_enabled:
+        raise GateRejected(f"Gate {gate_uid!r} is unknown or disabled.")
+    return entry
+
+
+def parse_passage_payload(payload: dict[str, Any]) -> dict[str, Any]:
+    try:
+        timestamp_ms = int(payload["timestamp_ms"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise IngestError("timestamp_ms is required and must be an integer.") from exc
+    return {
+        "timestamp_ms": timestamp_ms,
+        "direction": payload.get("direction") or None,
+        "signal_quality": payload.get("signal_quality") or None,
+    }
+
+
+def parse_exchange(payload: dict[str, Any]) -> tuple[int, int, int, int] | None:
+    """The completed previous heartbeat exchange ``(t1, t2, t3, t4)``, if reported."""
+    previous = payload.get("previous")
+    if previous is None:
+        return None
+    try:
+        return tuple(int(previous[key]) for key in ("t1", "t2", "t3", "t4"))
+    except (KeyError, TypeError, ValueError) as exc:
+        raise IngestError("previous must contain integer t1, t2, t3 and t4.") from exc
+
+
+def record_heartbeat(entry: GateEntry, payload: dict[str, Any], received_ms: int) -> dict:
+    """Feed the reported clock exchange and answer the new one.
+
+    The gate echoes ``t1``/``t2``/``t3`` of the response together with its
+    receive time ``t4`` as ``previous`` in its next heartbeat.
+    """
+    try:
+        t1 = int(payload["t1"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise IngestError("t1 is required and must be an integer.") from exc
+    exchange = parse_exchange(payload)
+    if exchange is not None:
+        clocks.add_exchange(entry, *exchange)
+    return {"t1": t1, "t2": received_ms, "clock": clocks.status(entry.gate_id)}
+
+
+def record_passage(
+    entry: GateEntry, payload: dict[str, Any], raw_payload: str | None = None
+) -> Passage | None:
+    """Store a passage for an authenticated gate and match it to a run.
+
+    Bounces within the gate's debounce window are dropped (``None`` is
+    returned) or stored with ``is_valid=False`` and never matched,
+    depending on ``RALLYCONTROL_DEBOUNCE_MODE``. Every message is counted in
+    the gate health rollups (``core.gate_health``).
+    """
+    started = time.perf_counter()
+    outcome = REJECTED
+    try:
+        passage = _store_passage(entry, payload, raw_payload)
+        if passage is None:
+            outcome = DEBOUNCED
+        else:
+            outcome = VALID if passage.is_valid else INVALID
+        return passage
+    finally:
+        gate_health.note(
+            entry,
+            outcome,
+            payload.get("signal_quality") if isinstance(payload, dict) else None,
+            (time.perf_counter() - started) * 1000,
+        )
+
+
+def _store_passage(
+    entry: GateEntry, payload: dict[str, Any], raw_payload: str | None
+) -> Passage | None:
+    if entry.session_id is None:
+        raise NoRunningSession(f"Gate {entry.gate_uid!r} has no running session.")
+    fields = parse_passage_payload(payload)
+    gate_ms = fields["timestamp_ms"]
+    fields["timestamp_ms"], fields["clock_sync"] = clocks.normalize(entry, gate_ms)
+    fields["gate_timestamp_ms"] = gate_ms
+    with shards.using_session(entry.session_id):
+        if not debounce.accept(entry, fields["timestamp_ms"]):
+            if debounce.mode == MODE_DROP:
+                return None
+            return Passage.objects.create(
+                session_id=entry.session_id,
+                gate_id=entry.gate_id,
+                raw_payload=raw_payload,
+                is_valid=False,
+                **fields,
+            )
+        try:
+            passage = timing.transitions.run(
+                entry.session_id, _match_and_store, entry, fields, raw_payload
+            )
+        except Exception:
+            # A run taken from the armed queue may have been rolled back, and
+            # the gate's retry of this trigger must not be taken for a bounce.
+            start_queues.invalidate(entry.session_id)
+            debounce.rollback(entry, fields["timestamp_ms"])
+            raise
+    return passage
+
+
+def _match_and_store(
+    entry: GateEntry, fields: dict[str, Any], raw_payload: str | None
+) -> Passage:
+    # Runs on the session's serializer: one short transaction per passage.
+    with shards.atomic():
+        run_id = timing.match_passage(entry, fields["timestamp_ms"])
+        passage = Passage.objects.create(
+            session_id=entry.session_id,
+            gate_id=entry.gate_id,
+            run_id=run_id,
+            raw_payload=raw_payload,
+            **fields,
+        )
+        timing.after_match(entry, run_id)
+    live_sessions.on_passage(entry, passage.pk, fields["timestamp_ms"], run_id)
+    return passage
@@ -0,0 +1,289 @@
+"""
+Publisher for the read-only kiosk snapshot database.
+
+Copies the public-facing data of a session (status, current boards, start
+list, live run states) from the primary database into the ``kiosk``
+database. Publishing is triggered on relevant changes via the background
+worker and can also run periodically (``manage.py publish_kiosk_snapshot
+--interval 5``).
+
+Run states are only rewritten when they changed and carry the version of
+the publication that changed them, so overlays poll for the few runs that
+started, passed a split or finished since their last request.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Count
+from django.utils import timezone
+
+from . import shards
+from .background import worker
+from .leaderboards import latest_board_ids
+from .live_state import live_sessions
+from .models import (
+    Gate,
+    KioskBoard,
+    KioskRunState,
+    KioskSession,
+    KioskStartListEntry,
+    Leaderboard,
+    Passage,
+    Run,
+    Session,
+)
+from .routers import KIOSK_DB
+from .start_list import start_list
+
+PUBLISHED_STATUSES = (
+    Session.Status.PLANNED,
+    Session.Status.RUNNING,
+    Session.Status.FINISHED,
+)
+
+SNAPSHOT_MODELS = (KioskSession, KioskBoard, KioskStartListEntry, KioskRunState)
+START_LIST_FIELDS = (
+    "position",
+    "run_id",
+    "driver_name",
+    "start_number",
+    "status",
+    "planned_start_at",
+)
+# Status of a published run that went back to the start list or was deleted.
+REMOVED = "removed"
+
+_schema_ready = False
+
+
+def ensure_schema() -> None:
+    """Create (or upgrade) the snapshot tables on first use."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    executor = MigrationExecutor(connections[KIOSK_DB])
+    targets = [node for node in executor.loader.graph.leaf_nodes() if node[0] == "core"]
+    if executor.migration_plan(targets):
+        call_command("migrate", "core", database=KIOSK_DB, verbosity=0)
+    _schema_ready = True
+
+
+def publish_session(session_id: int) -> None:
+    """Publish (or retract) the public data of one session."""
+    with shards.using_session(session_id):
+        _publish_session(session_id)
+
+
+def _publish_session(session_id: int) -> None:
+    ensure_schema()
+    session = (
+        Session.objects.select_related("stage__event")
+        .filter(pk=session_id, status__in=PUBLISHED_STATUSES)
+        .first()
+    )
+    if session is None:
+        retract_session(session_id)
+        return
+
+    counts = {status: 0 for status in Run.Status.values}
+    for row in (
+        Run.objects.filter(session_id=session_id)
+        .values("status")
+        .annotate(count=Count("pk"))
+        .order_by()
+    ):
+        counts[row["status"]] = row["count"]
+
+    boards = list(
+        Leaderboard.objects.filter(pk__in=latest_board_ids(session_id)).select_related(
+            "race_class"
+        )
+    )
+    entries = [
+        KioskStartListEntry(
+            session_id=session_id,
+            position=position,
+            run_id=run.pk,
+            driver_name=str(run.driver),
+            start_number=run.start_number_used,
+            status=run.status,
+            planned_start_at=run.planned_start_at,
+        )
+        for position, run in enumerate(start_list(session_id).select_related("driver"), start=1)
+    ]
+
+    header = {
+        "name": session.name,
+        "stage_name": session.stage.name,
+        "event_name": session.stage.event.name,
+        "status": session.status,
+    }
+    published_at = timezone.now()
+    version = int(published_at.timestamp() * 1_000_000)
+    with transaction.atomic(using=KIOSK_DB):
+        previous = (
+            KioskSession.objects.using(KIOSK_DB)
+            .filter(session_id=session_id)
+            .values(*header, "board_version")
+            .first()
+        )
+        published = KioskBoard.objects.using(KIOSK_DB).filter(session_id=session_id)
+        boards_changed = sorted(published.values_list("checksum", flat=True)) != sorted(
+            board.checksum for board in boards
+        )
+        published_entries = KioskStartListEntry.objects.using(KIOSK_DB).filter(
+            session_id=session_id
+        )
+        start_list_changed = list(published_entries.values_list(*START_LIST_FIELDS)) != [
+            tuple(getattr(entry, field) for field in START_LIST_FIELDS) for entry in entries
+        ]
+        # Cached kiosk pages stay valid until what they show changes.
+        board_version = version
+        if previous is not None and not boards_changed and not start_list_changed:
+            if all(previous[field] == value for field, value in header.items()):
+                board_version = previous["board_version"]
+        KioskSession.objects.using(KIOSK_DB).update_or_create(
+            session_id=session_id,
+            defaults={
+                **header,
+                "session_type": session.session_type,
+                "start_time": session.start_time,
+                "end_time": session.end_time,
+                "run_counts": counts,
+                "published_at": published_at,
+                "board_version": board_version,
+            },
+        )
+        if boards_changed:
+            published.delete()
+            KioskBoard.objects.using(KIOSK_DB).bulk_create(
+                KioskBoard(
+                    session_id=session_id,
+                    race_class_id=board.race_class_id,
+                    race_class_name=board.race_class.name if board.race_class else None,
+                    generated_at=board.generated_at,
+                    checksum=board.checksum,
+                    data_json=board.data_json,
+                )
+                for board in boards
+            )
+        if start_list_changed:
+            published_entries.delete()
+            KioskStartListEntry.objects.using(KIOSK_DB).bulk_create(entries)
+        _publish_run_states(session_id, version, live=session.status == Session.Status.RUNNING)
+
+
+def _ms(value) -> int | None:
+    return int(value.timestamp() * 1000) if value is not None else None
+
+
+def _run_splits(session_id: int, run_ids: list[int], live: bool) -> dict[int, list[dict]]:
+    """Checkpoint passages of runs; from the live state while the session is running."""
+    splits = defaultdict(list)
+    if not run_ids:
+        return splits
+    if not live:
+        for run_id, gate_name, timestamp_ms in (
+            Passage.objects.filter(
+                run_id__in=run_ids, is_valid=True, gate__gate_type=Gate.GateType.CHECKPOINT
+            )
+            .order_by("timestamp_ms", "pk")
+            .values_list("run_id", "gate__name", "timestamp_ms")
+        ):
+            splits[run_id].append({"gate": gate_name, "timestamp_ms": timestamp_ms})
+        return splits
+    checkpoints = dict(
+        Gate.objects.filter(gate_type=Gate.GateType.CHECKPOINT).values_list("pk", "name")
+    )
+    for run_id, passages in live_sessions.splits(session_id, run_ids).items():
+        splits[run_id] = [
+            {"gate": checkpoints[passage["gate_id"]], "timestamp_ms": passage["timestamp_ms"]}
+            for passage in passages
+            if passage["gate_id"] in checkpoints
+        ]
+    return splits
+
+
+def _publish_run_states(session_id: int, version: int, live: bool = False) -> None:
+    """Write the runs whose live state changed, stamped with ``version``."""
+    published = {
+        state.run_id: state
+        for state in KioskRunState.objects.using(KIOSK_DB).filter(session_id=session_id)
+    }
+    runs = list(
+        Run.objects.filter(session_id=session_id)
+        .exclude(status=Run.Status.QUEUED)
+        .select_related("driver")
+        .order_by("pk")
+    )
+    # Splits of runs that are done and already published cannot change.
+    pending = [
+        run.pk
+        for run in runs
+        if run.status == Run.Status.RUNNING
+        or run.pk not in published
+        or published[run.pk].status != run.status
+    ]
+    splits = _run_splits(session_id, pending, live)
+    changed = []
+    for run in runs:
+        state = published.pop(run.pk, None)
+        values = {
+            "driver_name": str(run.driver),
+            "start_number": run.start_number_used,
+            "status": run.status,
+            "started_ms": _ms(run.started_at),
+            "finished_ms": _ms(run.finished_at),
+            "final_time_ms": run.final_time_ms,
+            "splits": splits[run.pk] if run.pk in pending else state.splits,
+        }
+        if state is None:
+            state = KioskRunState(session_id=session_id, run_id=run.pk)
+        elif all(getattr(state, field) == value for field, value in values.items()):
+            continue
+        for field, value in values.items():
+            setattr(state, field, value)
+        state.version = version
+        changed.append(state)
+    for state in published.values():
+        if state.status != REMOVED:
+            state.status = REMOVED
+            state.version = version
+            changed.append(state)
+    for state in changed:
+        state.save(using=KIOSK_DB)
+
+
+def retract_session(session_id: int) -> None:
+    with transaction.atomic(using=KIOSK_DB):
+        for model in SNAPSHOT_MODELS:
+            model.objects.using(KIOSK_DB).filter(session_id=session_id).delete()
+
+
+def publish_all() -> int:
+    """Publish all public sessions and drop the ones no longer public."""
+    ensure_schema()
+    session_ids = set(
+        Session.objects.filter(status__in=PUBLISHED_STATUSES).values_list("pk", flat=True)
+    )
+    stale = set(
+        KioskSession.objects.using(KIOSK_DB).values_list("session_id", flat=True)
+    ) - session_ids
+    for session_id in stale:
+        retract_session(session_id)
+    for session_id in session_ids:
+        publish_session(session_id)
+    return len(session_ids)
+
+
+def schedule_publish(session_id: int, using: str | None = None) -> None:
+    """Republish a session after the current transaction (on ``using``) commits."""
+    shards.on_commit(
+        lambda: worker.submit(publish_session, session_id, key=("kiosk_publish", session_id)),
+        using=using,
+    )
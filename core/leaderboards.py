@@ -0,0 +1,262 @@
+"""
+Leaderboard generation, snapshot storage and retention.
+
+Every regeneration that changes a board stores a new ``Leaderboard`` row.
+To keep the table small, only the latest snapshot per (session, class) and
+periodic checkpoints are retained: at most one checkpoint per
+``RALLYCONTROL_LEADERBOARD_CHECKPOINT_SECONDS`` while a session is running,
+plus the final board once it is finished. Superseded rows are deleted in
+bulk by the background worker. ``leaderboard_at`` answers "what did the
+board look like at time T" from the retained rows.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from . import career, shards
+from .background import worker
+from .models import Leaderboard, RaceClass, Run, Session
+
+FINAL_SESSION_STATUSES = (Session.Status.FINISHED, Session.Status.ARCHIVED)
+
+
+def checkpoint_interval() -> timedelta:
+    seconds = getattr(settings, "RALLYCONTROL_LEADERBOARD_CHECKPOINT_SECONDS", 60)
+    return timedelta(seconds=seconds)
+
+
+def format_time_ms(value: int | None) -> str | None:
+    if value is None:
+        return None
+    seconds, millis = divmod(int(value), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    if minutes:
+        return f"{minutes}:{seconds:02d}.{millis:03d}"
+    return f"{seconds}.{millis:03d}"
+
+
+def board_checksum(data: dict) -> str:
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _run_sort_key(run: Run):
+    finished = run.status == Run.Status.FINISHED and run.final_time_ms is not None
+    return (not finished, run.final_time_ms or 0, run.pk)
+
+
+def rank_runs(runs) -> list[dict]:
+    """Rank runs by best final time, one entry per driver."""
+    best: dict[int, Run] = {}
+    for run in sorted(runs, key=_run_sort_key):
+        best.setdefault(run.driver_id, run)
+    entries = []
+    position = 0
+    for run in sorted(best.values(), key=_run_sort_key):
+        finished = run.status == Run.Status.FINISHED and run.final_time_ms is not None
+        if finished:
+            position += 1
+        entries.append(
+            {
+                "position": position if finished else None,
+                "run_id": run.pk,
+                "driver_id": run.driver_id,
+                "driver": str(run.driver),
+                "vehicle": run.vehicle.name if run.vehicle else None,
+                "start_number": run.start_number_used,
+                "status": run.status,
+                "total_time_ms": run.total_time_ms,
+                "penalty_ms": run.penalty_ms,
+                "final_time_ms": run.final_time_ms,
+                "final_time": format_time_ms(run.final_time_ms) if finished else None,
+            }
+        )
+    return entries
+
+
+def effective_class_id(run: Run) -> int | None:
+    """Class a run is ranked in: the vehicle's class, else the driver's."""
+    if run.vehicle is not None and run.vehicle.race_class_id is not None:
+        return run.vehicle.race_class_id
+    return run.driver.race_class_id
+
+
+def build_boards(session: Session, race_classes) -> dict[int | None, dict]:
+    """Build the overall board and the boards of ``race_classes`` in one scan.
+
+    The runs of the session are read once and fanned out by their effective
+    class; the result maps the class id (``None`` = overall) to the payload.
+    Finished entries carry the personal and season best of their driver
+    (``core.career``), read with one query for all boards.
+    """
+    runs = list(Run.objects.filter(session=session).select_related("driver", "vehicle"))
+    class_ids = {run.pk: effective_class_id(run) for run in runs}
+    by_class: dict[int | None, list[Run]] = {None: runs}
+    by_class.update({race_class.pk: [] for race_class in race_classes})
+    for run in runs:
+        class_runs = by_class.get(class_ids[run.pk])
+        if class_runs is not None and class_runs is not runs:
+            class_runs.append(run)
+    boards = {
+        class_id: {
+            "session_id": session.pk,
+            "race_class_id": class_id,
+            "entries": rank_runs(class_runs),
+        }
+        for class_id, class_runs in by_class.items()
+    }
+    career.annotate_entries(
+        session, [entry for board in boards.values() for entry in board["entries"]], class_ids
+    )
+    return boards
+
+
+def build_board(session: Session, race_class: RaceClass | None = None) -> dict:
+    """Build the board payload of one class (``None`` = overall)."""
+    boards = build_boards(session, [race_class] if race_class is not None else [])
+    return boards[race_class.pk if race_class is not None else None]
+
+
+def regenerate_session_boards(session: Session) -> list[Leaderboard]:
+    """Rebuild the overall board and all class boards of a session."""
+    boards = build_boards(session, RaceClass.objects.filter(is_active=True))
+    return store_snapshots(session, boards)
+
+
+def regenerate_session(session_id: int) -> list[Leaderboard]:
+    session = Session.objects.filter(pk=session_id).select_related("stage__event").first()
+    if session is None:
+        return []
+    with shards.using_session(session_id):
+        return regenerate_session_boards(session)
+
+
+def schedule_regeneration(session_id: int) -> None:
+    """Regenerate the boards of a session once after the transaction commits.
+
+    Requests for the same session are coalesced while one is still queued.
+    """
+    shards.on_commit(
+        lambda: worker.submit(regenerate_session, session_id, key=("regenerate", session_id))
+    )
+
+
+def store_snapshots(
+    session: Session, boards: dict[int | None, dict], now: datetime | None = None
+) -> list[Leaderboard]:
+    """Store every board of ``boards`` that changed, in one transaction.
+
+    The latest checksum and checkpoint of all classes are read with two
+    queries; unchanged boards are skipped.
+    """
+    now = now or timezone.now()
+    history = Leaderboard.objects.filter(session=session)
+    checksums = dict(
+        history.filter(pk__in=latest_board_ids(session.pk)).values_list("race_class_id", "checksum")
+    )
+    changed = {
+        class_id: (data, checksum)
+        for class_id, data in boards.items()
+        if (checksum := board_checksum(data)) != checksums.get(class_id)
+    }
+    if not changed:
+        return []
+    final = session.status in FINAL_SESSION_STATUSES
+    last_checkpoints = {}
+    if not final:
+        last_checkpoints = dict(
+            history.filter(is_checkpoint=True)
+            .values("race_class_id")
+            .annotate(at=Max("generated_at"))
+            .order_by()
+            .values_list("race_class_id", "at")
+        )
+    stored = []
+    with shards.atomic():
+        for class_id, (data, checksum) in changed.items():
+            last_checkpoint = last_checkpoints.get(class_id)
+            stored.append(
+                Leaderboard.objects.create(
+                    session=session,
+                    race_class_id=class_id,
+                    data_json=data,
+                    checksum=checksum,
+                    is_checkpoint=(
+                        final
+                        or last_checkpoint is None
+                        or now - last_checkpoint >= checkpoint_interval()
+                    ),
+                )
+            )
+        schedule_prune(session.pk)
+    return stored
+
+
+def latest_board_ids(session_id: int | None = None) -> list[int]:
+    """Primary keys of the newest board per (session, class)."""
+    rows = Leaderboard.objects.all()
+    if session_id is not None:
+        rows = rows.filter(session_id=session_id)
+    latest = rows.values("session_id", "race_class_id").annotate(at=Max("generated_at")).order_by()
+    condition = Q(pk__in=[])
+    for row in latest:
+        if row["race_class_id"] is None:
+            class_filter = Q(race_class__isnull=True)
+        else:
+            class_filter = Q(race_class_id=row["race_class_id"])
+        condition |= class_filter & Q(session_id=row["session_id"], generated_at=row["at"])
+    return list(Leaderboard.objects.filter(condition).values_list("pk", flat=True))
+
+
+def prune_superseded(session_id: int | None = None) -> int:
+    """Delete boards that are neither the latest nor a checkpoint."""
+    if session_id is not None:
+        with shards.using_session(session_id):
+            return _prune(session_id)
+    return _prune(None)
+
+
+def _prune(session_id: int | None) -> int:
+    superseded = Leaderboard.objects.filter(is_checkpoint=False).exclude(
+        pk__in=latest_board_ids(session_id)
+    )
+    if session_id is not None:
+        superseded = superseded.filter(session_id=session_id)
+    deleted, _ = superseded.delete()
+    return deleted
+
+
+def schedule_prune(session_id: int) -> None:
+    shards.on_commit(
+        lambda: worker.submit(prune_superseded, session_id, key=("prune_leaderboards", session_id))
+    )
+
+
+def finalize_session_boards(session_id: int) -> int:
+    """Keep the latest boards of a finished session as final checkpoints."""
+    with shards.using_session(session_id):
+        updated = Leaderboard.objects.filter(pk__in=latest_board_ids(session_id)).update(
+            is_checkpoint=True
+        )
+        schedule_prune(session_id)
+    return updated
+
+
+def leaderboard_at(
+    session: Session | int, race_class: RaceClass | int | None, when: datetime
+) -> Leaderboard | None:
+    """Return the board that was current at ``when`` (nearest checkpoint)."""
+    alias = shards.alias_for_session(getattr(session, "pk", session))
+    boards = Leaderboard.objects.using(alias).filter(session=session, generated_at__lte=when)
+    if race_class is None:
+        boards = boards.filter(race_class__isnull=True)
+    else:
+        boards = boards.filter(race_class=race_class)
+    return boards.order_by("-generated_at").first()
@@ -0,0 +1,443 @@
+"""
+Compact in-memory state of running sessions.
+
+A busy multi-lap session has tens of thousands of passages; holding them as
+ORM instances would not fit the small trackside machines. ``LiveSession``
+keeps passages column-wise in typed arrays (``array('q')`` timestamps,
+``array('i')`` gate and run indexes) and runs as slotted ``LiveRun``
+records. Gate and driver ids are interned to dense integers shared by all
+sessions of the process.
+
+The state is loaded from the database on first use (``values_list``, no
+model instances) and then kept current by ingest (``on_passage``). Finish
+and checkpoint matching (``core.timing``) and the overlay splits of the
+kiosk publisher read from it instead of querying passages.
+
+Passages stored by other processes are caught up incrementally: a session
+remembers the highest passage id it has read and, at most every
+``RALLYCONTROL_GATE_REGISTRY_CHECK_SECONDS``, reads only the passages
+after it. Changes to runs outside ingest (corrections, OCR review, admin)
+bump a version per session (``live_state:<session_id>``); only that
+session is reloaded, in every process. Sessions are dropped when they
+finish.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models import Max
+
+from . import shards
+from .gate_registry import GateEntry
+from .models import ConfigVersion, Gate, Passage, Run
+
+RUN_STATUSES = tuple(Run.Status.values)
+STATUS_CODES = {status: code for code, status in enumerate(RUN_STATUSES)}
+QUEUED = STATUS_CODES[Run.Status.QUEUED]
+RUNNING = STATUS_CODES[Run.Status.RUNNING]
+FINISHED = STATUS_CODES[Run.Status.FINISHED]
+NO_RUN = -1
+# Headers of the three empty passage columns, paid once per session.
+EMPTY_COLUMN_BYTES = sys.getsizeof(array("q")) + 2 * sys.getsizeof(array("i"))
+
+
+def _ms(value) -> int | None:
+    return int(value.timestamp() * 1000) if value is not None else None
+
+
+def live_state_key(session_id: int) -> str:
+    """``ConfigVersion`` key of the live state of one session."""
+    return f"{ConfigVersion.LIVE_STATE}:{session_id}"
+
+
+class Interner:
+    """Maps (large) database ids to dense indexes and back."""
+
+    __slots__ = ("_lock", "_indexes", "_values")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._indexes: dict[int, int] = {}
+        self._values = array("q")
+
+    def index(self, value: int) -> int:
+        index = self._indexes.get(value)
+        if index is None:
+            # Shared by all sessions, which are updated in parallel.
+            with self._lock:
+                index = self._indexes.get(value)
+                if index is None:
+                    index = self._indexes[value] = len(self._values)
+                    self._values.append(value)
+        return index
+
+    def value(self, index: int) -> int:
+        return self._values[index]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self._indexes) + sys.getsizeof(self._values)
+
+
+class LiveRun:
+    """One run of a live session; passages are indexes into the session arrays."""
+
+    __slots__ = (
+        "run_id",
+        "driver",
+        "start_number",
+        "status",
+        "started_ms",
+        "finished_ms",
+        "penalty_ms",
+        "passages",
+    )
+
+    def __init__(
+        self,
+        run_id: int,
+        driver: int,
+        start_number: int | None,
+        status: int,
+        started_ms: int | None,
+        finished_ms: int | None,
+        penalty_ms: int,
+    ) -> None:
+        self.run_id = run_id
+        self.driver = driver
+        self.start_number = start_number
+        self.status = status
+        self.started_ms = started_ms
+        self.finished_ms = finished_ms
+        self.penalty_ms = penalty_ms
+        self.passages: array | None = None
+
+    @property
+    def status_name(self) -> str:
+        return RUN_STATUSES[self.status]
+
+    def add_passage(self, index: int) -> None:
+        if self.passages is None:
+            self.passages = array("i")
+        self.passages.append(index)
+
+    def nbytes(self) -> int:
+        size = sys.getsizeof(self)
+        if self.passages is not None:
+            size += sys.getsizeof(self.passages)
+        return size
+
+
+class LiveSession:
+    """Runs and passages of one session in compact form.
+
+    ``synced_id`` is the highest passage id read from the database;
+    ``own_ids`` are the passages after it that this process applied itself.
+    """
+
+    __slots__ = (
+        "session_id",
+        "lock",
+        "loaded",
+        "version",
+        "checked_at",
+        "synced_id",
+        "own_ids",
+        "timestamps",
+        "gates",
+        "run_indexes",
+        "runs",
+        "_run_index",
+    )
+
+    def __init__(self, session_id: int) -> None:
+        self.session_id = session_id
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        self.loaded = False
+        self.version = -1
+        self.checked_at = 0.0
+        self.synced_id = 0
+        self.own_ids: set[int] = set()
+        self.timestamps = array("q")
+        self.gates = array("i")
+        self.run_indexes = array("i")
+        self.runs: list[LiveRun] = []
+        self._run_index: dict[int, int] = {}
+
+    def add_run(self, run: LiveRun) -> None:
+        self._run_index[run.run_id] = len(self.runs)
+        self.runs.append(run)
+
+    def run(self, run_id: int) -> LiveRun | None:
+        index = self._run_index.get(run_id)
+        return self.runs[index] if index is not None else None
+
+    def add_passage(self, gate: int, timestamp_ms: int, run: LiveRun | None) -> int:
+        index = len(self.timestamps)
+        self.timestamps.append(timestamp_ms)
+        self.gates.append(gate)
+        self.run_indexes.append(self._run_index[run.run_id] if run is not None else NO_RUN)
+        if run is not None:
+            run.add_passage(index)
+        return index
+
+    def apply(self, gate: int, gate_type: str, timestamp_ms: int, run_id: int | None) -> bool:
+        """Add a stored passage and its run transition; ``False`` if the run is unknown.
+
+        Transitions only move forward, so a passage whose effect is already
+        part of the loaded run rows does no harm.
+        """
+        run = self.run(run_id) if run_id is not None else None
+        if run_id is not None and run is None:
+            return False
+        self.add_passage(gate, timestamp_ms, run)
+        if run is None:
+            return True
+        if gate_type == Gate.GateType.START and run.status == QUEUED:
+            run.status = RUNNING
+            run.started_ms = timestamp_ms
+        elif gate_type == Gate.GateType.FINISH and run.status in (QUEUED, RUNNING):
+            run.status = FINISHED
+            run.finished_ms = timestamp_ms
+        return True
+
+    def on_course(self) -> list[LiveRun]:
+        """Running runs with a start time, on course the longest first."""
+        running = [
+            run for run in self.runs if run.status == RUNNING and run.started_ms is not None
+        ]
+        running.sort(key=lambda run: (run.started_ms, run.run_id))
+        return running
+
+    def has_passed(self, run: LiveRun, gate: int) -> bool:
+        return run.passages is not None and any(
+            self.gates[index] == gate for index in run.passages
+        )
+
+    def splits(self, run_id: int, gate_ids: Interner) -> list[dict]:
+        """Passages of a run with the time since the start and since the previous one."""
+        run = self.run(run_id)
+        if run is None or run.passages is None:
+            return []
+        splits = []
+        previous = start = run.started_ms
+        for index in sorted(run.passages, key=self.timestamps.__getitem__):
+            timestamp_ms = self.timestamps[index]
+            splits.append(
+                {
+                    "gate_id": gate_ids.value(self.gates[index]),
+                    "timestamp_ms": timestamp_ms,
+                    "elapsed_ms": timestamp_ms - start if start is not None else None,
+                    "split_ms": timestamp_ms - previous if previous is not None else None,
+                }
+            )
+            previous = timestamp_ms
+        return splits
+
+    def memory_usage(self) -> dict:
+        arrays = sum(
+            sys.getsizeof(column) for column in (self.timestamps, self.gates, self.run_indexes)
+        )
+        runs = sum(run.nbytes() for run in self.runs)
+        runs += sys.getsizeof(self.runs) + sys.getsizeof(self._run_index)
+        total = sys.getsizeof(self) + arrays + runs
+        passages = len(self.timestamps)
+        per_passage = (arrays - EMPTY_COLUMN_BYTES) / passages if passages else 0.0
+        return {
+            "session_id": self.session_id,
+            "runs": len(self.runs),
+            "passages": passages,
+            "passage_bytes": arrays,
+            "passage_fixed_bytes": EMPTY_COLUMN_BYTES,
+            "run_bytes": runs,
+            "total_bytes": total,
+            # Without the fixed column headers, which dominate small sessions.
+            "bytes_per_passage": round(per_passage, 1),
+        }
+
+
+class LiveSessions:
+    """Process-local live state of all sessions that have been accessed."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sessions: dict[int, LiveSession] = {}
+        self.gate_ids = Interner()
+        self.driver_ids = Interner()
+
+    @contextmanager
+    def _locked(self, session_id: int, fresh: bool = False):
+        """The session's state, loaded or brought up to date, under its lock.
+
+        Sessions are locked one by one, so matching in one session never
+        waits for another session being loaded.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = LiveSession(session_id)
+        with session.lock:
+            self._sync(session, fresh)
+            yield session
+
+    def get(self, session_id: int) -> LiveSession:
+        """Live state of a session, loaded from the database on first use."""
+        with self._locked(session_id) as session:
+            return session
+
+    def loaded(self) -> list[LiveSession]:
+        with self._lock:
+            return [session for session in self._sessions.values() if session.loaded]
+
+    def on_course(
+        self, session_id: int, limit: int, fresh: bool = False
+    ) -> list[tuple[int, int]]:
+        """``(run_id, started_ms)`` of the runs on course the longest."""
+        with self._locked(session_id, fresh) as session:
+            return [(run.run_id, run.started_ms) for run in session.on_course()[:limit]]
+
+    def checkpoint_run(self, session_id: int, gate_id: int, timestamp_ms: int) -> int | None:
+        """Run on course the longest that started before and has not passed the gate."""
+        gate = self.gate_ids.index(gate_id)
+        with self._locked(session_id) as session:
+            for run in session.on_course():
+                if run.started_ms > timestamp_ms:
+                    break
+                if not session.has_passed(run, gate):
+                    return run.run_id
+        return None
+
+    def splits(self, session_id: int, run_ids) -> dict[int, list[dict]]:
+        """Passages of the given runs, read from an up-to-date state."""
+        with self._locked(session_id, fresh=True) as session:
+            return {run_id: session.splits(run_id, self.gate_ids) for run_id in run_ids}
+
+    def on_passage(
+        self, entry: GateEntry, passage_id: int, timestamp_ms: int, run_id: int | None
+    ) -> None:
+        """Apply a passage stored by this process (only if the session is loaded)."""
+        session = self._sessions.get(entry.session_id)
+        if session is None:
+            return
+        gate = self.gate_ids.index(entry.gate_id)
+        with session.lock:
+            if not session.loaded or passage_id <= session.synced_id:
+                return
+            if session.apply(gate, entry.gate_type, timestamp_ms, run_id):
+                session.own_ids.add(passage_id)
+            else:
+                # Run created after loading (start list change): reload later.
+                session.clear()
+
+    def invalidate(self, session_id: int | None = None) -> None:
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def memory_usage(self) -> dict:
+        sessions = [session.memory_usage() for session in self.loaded()]
+        interned = self.gate_ids.nbytes() + self.driver_ids.nbytes()
+        return {
+            "sessions": sessions,
+            "interned_ids": len(self.gate_ids) + len(self.driver_ids),
+            "interned_bytes": interned,
+            "total_bytes": interned + sum(session["total_bytes"] for session in sessions),
+        }
+
+    def _sync(self, session: LiveSession, fresh: bool) -> None:
+        """Load the session, reload it after a version bump or catch up on passages."""
+        interval = getattr(settings, "RALLYCONTROL_GATE_REGISTRY_CHECK_SECONDS", 1.0)
+        now = time.monotonic()
+        if session.loaded and not fresh and now - session.checked_at < interval:
+            return
+        session.checked_at = now
+        version = ConfigVersion.current(live_state_key(session.session_id))
+        if session.loaded and version == session.version and self._catch_up(session):
+            return
+        session.clear()
+        session.checked_at = now
+        self._load(session, version)
+
+    def _catch_up(self, session: LiveSession) -> bool:
+        """Apply the passages other processes stored; ``False`` if a reload is needed."""
+        with shards.using_session(session.session_id):
+            rows = list(
+                Passage.objects.filter(
+                    session_id=session.session_id, is_valid=True, pk__gt=session.synced_id
+                )
+                .order_by("pk")
+                .values_list("pk", "gate_id", "gate__gate_type", "timestamp_ms", "run_id")
+            )
+        for passage_id, gate_id, gate_type, timestamp_ms, run_id in rows:
+            if passage_id in session.own_ids:
+                continue
+            if not session.apply(self.gate_ids.index(gate_id), gate_type, timestamp_ms, run_id):
+                return False
+        if rows:
+            session.synced_id = rows[-1][0]
+            session.own_ids = {pk for pk in session.own_ids if pk > session.synced_id}
+        return True
+
+    def _load(self, session: LiveSession, version: int) -> None:
+        session_id = session.session_id
+        with shards.using_session(session_id):
+            passages = Passage.objects.filter(session_id=session_id)
+            # Passages up to here are committed together with their run
+            # transitions, so the runs read next already reflect them.
+            synced_id = passages.aggregate(last=Max("pk"))["last"] or 0
+            runs = Run.objects.filter(session_id=session_id).order_by("pk")
+            for row in runs.values_list(
+                "pk",
+                "driver_id",
+                "start_number_used",
+                "status",
+                "started_at",
+                "finished_at",
+                "penalty_ms",
+            ):
+                run_id, driver_id, start_number, status, started_at, finished_at, penalty = row
+                session.add_run(
+                    LiveRun(
+                        run_id,
+                        self.driver_ids.index(driver_id),
+                        start_number,
+                        STATUS_CODES[status],
+                        _ms(started_at),
+                        _ms(finished_at),
+                        penalty,
+                    )
+                )
+            rows = (
+                passages.filter(is_valid=True, pk__lte=synced_id)
+                .order_by("timestamp_ms", "pk")
+                .values_list("gate_id", "timestamp_ms", "run_id")
+            )
+            for gate_id, timestamp_ms, run_id in rows.iterator(chunk_size=2000):
+                run = session.run(run_id) if run_id is not None else None
+                session.add_passage(self.gate_ids.index(gate_id), timestamp_ms, run)
+        session.version = version
+        session.synced_id = synced_id
+        session.loaded = True
+
+
+live_sessions = LiveSessions()
+
+
+def live_state_changed(session_id: int, using: str | None = None) -> None:
+    """Runs or passages changed outside ingest: reload the session in every process."""
+    live_sessions.invalidate(session_id)
+    key = live_state_key(session_id)
+    shards.on_commit(lambda: ConfigVersion.bump(key), using=using)
@@ -0,0 +1,27 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import shards
+from core.models import Event
+
+
+class Command(BaseCommand):
+    help = "Write a consistent copy of an event's shard database to a file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("event_id", type=int)
+        parser.add_argument("target", help="Path of the backup file.")
+
+    def handle(self, *args, **options):
+        event = Event.objects.filter(pk=options["event_id"]).first()
+        if event is None:
+            raise CommandError(f"Event {options['event_id']} existiert nicht.")
+        if not (shards.enabled() and event.is_sharded):
+            raise CommandError(f"Event {event} hat keine eigene Datenbank.")
+        connection = connections[shards.alias_for_event(event.pk)]
+        connection.ensure_connection()
+        with sqlite3.connect(options["target"]) as target:
+            connection.connection.backup(target)
+        self.stdout.write(self.style.SUCCESS(f"{event} gesichert nach {options['target']}."))
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core import uploads
+
+
+class Command(BaseCommand):
+    help = "Finalise complete capture uploads and delete stale unfinished ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age-hours",
+            type=float,
+            default=24,
+            help="Delete unfinished or failed uploads untouched for this long.",
+        )
+
+    def handle(self, *args, **options):
+        finalized = uploads.finalize_pending()
+        pruned = uploads.prune_stale_uploads(timedelta(hours=options["max_age_hours"]))
+        self.stdout.write(
+            self.style.SUCCESS(f"{finalized} Uploads abgeschlossen, {pruned} verworfen.")
+        )
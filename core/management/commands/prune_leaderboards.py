@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core import shards
+from core.leaderboards import prune_superseded
+
+
+class Command(BaseCommand):
+    help = "Delete superseded leaderboard snapshots (keeps latest boards and checkpoints)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--session", type=int, help="Only prune boards of this session.")
+
+    def handle(self, *args, **options):
+        if options.get("session"):
+            deleted = prune_superseded(options["session"])
+        else:
+            deleted = 0
+            for alias in shards.all_aliases():
+                with shards.using_db(alias):
+                    deleted += prune_superseded()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} Leaderboard-Snapshots gelöscht."))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.kiosk_snapshot import publish_all
+
+
+class Command(BaseCommand):
+    help = "Copy public session data (status, boards, start lists) into the kiosk snapshot DB."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Republish every N seconds instead of once.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        while True:
+            published = publish_all()
+            self.stdout.write(f"{published} Sessions veröffentlicht.")
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.career import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the driver career index (personal bests) from all finished runs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--driver", type=int, action="append", help="Only rebuild this driver (repeatable)."
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild(options.get("driver"))
+        self.stdout.write(self.style.SUCCESS(f"{rows} Bestzeit-Einträge neu berechnet."))
@@ -0,0 +1,59 @@
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.recorder import event_id_from_path, read_log
+from core.replay import ReplayError, parse_speed, replay
+
+
+class Command(BaseCommand):
+    help = "Replay a recorded gate message log into a fresh database and compare the results."
+
+    def add_arguments(self, parser):
+        parser.add_argument("log", help="Recorded log (recordings/event_<id>.jsonl).")
+        parser.add_argument("--event", type=int, help="Source event (default: from the file name).")
+        parser.add_argument(
+            "--speed", default="max", help="1 = original pace, 10 = ten times faster, max = no pauses."
+        )
+        parser.add_argument(
+            "--target", help="Directory for the replay database (default: a temporary directory)."
+        )
+        parser.add_argument("--show-diffs", type=int, default=20, help="Print at most N diffs.")
+
+    def handle(self, *args, **options):
+        path = Path(options["log"])
+        if not path.exists():
+            raise CommandError(f"{path} existiert nicht.")
+        event_id = options.get("event") or event_id_from_path(path)
+        if event_id is None:
+            raise CommandError("Event nicht erkennbar, bitte --event angeben.")
+        target = Path(options.get("target") or tempfile.mkdtemp(prefix="rallycontrol-replay-"))
+        messages = read_log(path)
+        try:
+            speed = parse_speed(options["speed"])
+            self.stdout.write(
+                f"Replay von {len(messages)} Nachrichten (Event {event_id}, "
+                f"Tempo {options['speed']}) nach {target} …"
+            )
+            report = replay(messages, event_id, target, speed)
+        except ReplayError as exc:
+            raise CommandError(str(exc)) from exc
+
+        rejected = ", ".join(f"{name} {count}" for name, count in report.rejected.items()) or "0"
+        self.stdout.write(
+            f"Angenommen: {report.accepted}, unterdrückt: {report.suppressed}, "
+            f"abgelehnt: {rejected}, Heartbeats: {report.heartbeats}, "
+            f"übersprungen: {report.skipped}"
+        )
+        self.stdout.write(
+            f"Dauer: {report.wall_seconds:.2f} s ({report.throughput:.0f} Nachrichten/s), "
+            f"Latenz p50 {report.latency_ms(0.5):.2f} ms, p95 {report.latency_ms(0.95):.2f} ms, "
+            f"max {report.latency_ms(1.0):.2f} ms, Nacharbeit {report.settle_seconds:.2f} s"
+        )
+        if not report.diffs:
+            self.stdout.write(self.style.SUCCESS("Ergebnisse identisch mit dem Original."))
+            return
+        self.stdout.write(self.style.WARNING(f"{len(report.diffs)} Abweichungen:"))
+        for diff in report.diffs[: options["show_diffs"]]:
+            self.stdout.write(f"  {diff}")
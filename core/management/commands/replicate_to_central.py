@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import replication
+
+
+class Command(BaseCommand):
+    help = "Push the change log of this stage node to the central node."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep pushing every N seconds instead of draining once.",
+        )
+
+    def handle(self, *args, **options):
+        if not replication.is_stage_node():
+            raise CommandError("RALLYCONTROL_CENTRAL_URL ist nicht gesetzt.")
+        interval = options["interval"]
+        while True:
+            try:
+                pushed = self.drain(options["batch_size"])
+                if pushed:
+                    self.stdout.write(f"{pushed} Änderungen repliziert.")
+            except replication.ReplicationError as exc:
+                if not interval:
+                    raise CommandError(str(exc)) from exc
+                self.stderr.write(str(exc))
+            if not interval:
+                break
+            time.sleep(interval)
+
+    def drain(self, batch_size: int) -> int:
+        total = 0
+        while pushed := replication.push_pending(batch_size):
+            total += pushed
+        return total
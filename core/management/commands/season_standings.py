@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.standings import season_standings
+
+
+class Command(BaseCommand):
+    help = "Print season standings from the final race boards of all events."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="Only events starting in this year.")
+
+    def handle(self, *args, **options):
+        standings = season_standings(options.get("year"))
+        if not standings:
+            self.stdout.write("Keine gewerteten Sessions gefunden.")
+            return
+        for class_name, rows in sorted(standings.items()):
+            self.stdout.write(self.style.MIGRATE_HEADING(class_name))
+            for row in rows:
+                self.stdout.write(
+                    f"{row['rank']:>3}. {row['driver']:<30} {row['points']:>4} Pkt."
+                    f"  {row['wins']} Siege, {row['events']} Events"
+                )
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_config_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaderboard',
+            name='is_checkpoint',
+            field=models.BooleanField(default=False, help_text='Checkpoints are kept by the retention policy; other superseded boards are pruned.'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboard',
+            index=models.Index(fields=['session', 'is_checkpoint', 'generated_at'], name='core_leader_session_af1271_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_leaderboard_checkpoints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KioskSession',
+            fields=[
+                ('session_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=150)),
+                ('stage_name', models.CharField(max_length=150)),
+                ('event_name', models.CharField(max_length=200)),
+                ('session_type', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('start_time', models.DateTimeField(blank=True, null=True)),
+                ('end_time', models.DateTimeField(blank=True, null=True)),
+                ('run_counts', models.JSONField(default=dict)),
+                ('published_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'kiosk_sessions',
+            },
+        ),
+        migrations.CreateModel(
+            name='KioskBoard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.BigIntegerField()),
+                ('race_class_id', models.BigIntegerField(blank=True, null=True)),
+                ('race_class_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('generated_at', models.DateTimeField()),
+                ('checksum', models.CharField(blank=True, max_length=64, null=True)),
+                ('data_json', models.JSONField()),
+            ],
+            options={
+                'db_table': 'kiosk_boards',
+                'indexes': [models.Index(fields=['session_id'], name='kiosk_board_session_4c6fa1_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='KioskStartListEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.BigIntegerField()),
+                ('position', models.PositiveIntegerField()),
+                ('run_id', models.BigIntegerField()),
+                ('driver_name', models.CharField(max_length=150)),
+                ('start_number', models.IntegerField(blank=True, null=True)),
+                ('status', models.CharField(max_length=20)),
+            ],
+            options={
+                'db_table': 'kiosk_start_list',
+                'ordering': ['session_id', 'position'],
+                'indexes': [models.Index(fields=['session_id', 'position'], name='kiosk_start_session_cf4a40_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_kiosk_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('operation', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete')], default='upsert', max_length=10)),
+                ('payload', models.JSONField(default=dict)),
+                ('is_manual', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'replication_changelog',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReplicationCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node_id', models.CharField(max_length=50, unique=True)),
+                ('last_seq', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'replication_cursors',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReplicatedObject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node_id', models.CharField(max_length=50)),
+                ('model', models.CharField(max_length=20)),
+                ('remote_id', models.BigIntegerField()),
+                ('local_id', models.BigIntegerField()),
+                ('manual_fields', models.JSONField(default=dict, help_text='Field name -> timestamp (ms) of the last manual correction.')),
+            ],
+            options={
+                'db_table': 'replication_objects',
+                'indexes': [models.Index(fields=['model', 'local_id'], name='replication_model_f8049d_idx')],
+                'unique_together': {('node_id', 'model', 'remote_id')},
+            },
+        ),
+    ]
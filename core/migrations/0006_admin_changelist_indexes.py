@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_replication'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='capture',
+            index=models.Index(fields=['created_at'], name='core_captur_created_b7bb86_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ocrresult',
+            index=models.Index(fields=['created_at'], name='core_ocrres_created_4a9c10_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passage',
+            index=models.Index(fields=['received_at'], name='core_passag_receive_529c6f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='run',
+            index=models.Index(fields=['started_at'], name='core_run_started_b16927_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_admin_changelist_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RunCorrection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('add_penalty', 'Add Penalty'), ('set_penalty', 'Set Penalty'), ('set_status', 'Set Status'), ('recompute', 'Recompute Final Times')], max_length=20)),
+                ('run_ids', models.JSONField(default=list)),
+                ('session_ids', models.JSONField(default=list)),
+                ('penalty_ms', models.IntegerField(blank=True, null=True)),
+                ('status', models.CharField(blank=True, choices=[('queued', 'Queued'), ('running', 'Running'), ('finished', 'Finished'), ('dnf', 'Did Not Finish'), ('dsq', 'Disqualified'), ('void', 'Void')], max_length=20, null=True)),
+                ('reason', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='run_corrections', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'run_corrections',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_run_corrections'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kioskstartlistentry',
+            name='planned_start_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='run',
+            name='planned_start_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='run',
+            name='start_position',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='start_interval_s',
+            field=models.PositiveIntegerField(default=30, help_text='Abstand zwischen zwei Starts in Sekunden.'),
+        ),
+        migrations.AddIndex(
+            model_name='run',
+            index=models.Index(fields=['session', 'status', 'start_position'], name='core_run_session_2e1368_idx'),
+        ),
+    ]
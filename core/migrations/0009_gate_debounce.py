@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_start_list'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gate',
+            name='debounce_ms',
+            field=models.PositiveIntegerField(blank=True, help_text='Entprellfenster in ms; leer = Standard für den Gate-Typ.', null=True),
+        ),
+    ]
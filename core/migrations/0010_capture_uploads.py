@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:44
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_gate_debounce'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaptureUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('sha256', models.CharField(max_length=64)),
+                ('extension', models.CharField(default='jpg', max_length=10)),
+                ('received_bytes', models.PositiveBigIntegerField(default=0)),
+                ('captured_at_ms', models.BigIntegerField(blank=True, null=True)),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('receiving', 'Receiving'), ('complete', 'Complete'), ('done', 'Done'), ('failed', 'Failed')], default='receiving', max_length=20)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('capture', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='uploads', to='core.capture')),
+                ('gate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='capture_uploads', to='core.gate')),
+                ('passage', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='capture_uploads', to='core.passage')),
+            ],
+            options={
+                'db_table': 'capture_uploads',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['gate', 'sha256'], name='capture_upl_gate_id_db8bd6_idx'), models.Index(fields=['status', 'updated_at'], name='capture_upl_status_003d4b_idx')],
+            },
+        ),
+    ]
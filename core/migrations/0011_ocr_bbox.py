@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_capture_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrresult',
+            name='bbox',
+            field=models.JSONField(blank=True, help_text='Bounding box of the detected number in pixels: [x, y, width, height].', null=True),
+        ),
+    ]
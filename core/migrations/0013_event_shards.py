@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_ocr_review_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='is_sharded',
+            field=models.BooleanField(default=False, editable=False, help_text="Timing data is stored in the event's own database file."),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_event_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GateHealthMinute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minute', models.DateTimeField()),
+                ('valid', models.PositiveIntegerField(default=0)),
+                ('invalid', models.PositiveIntegerField(default=0)),
+                ('debounced', models.PositiveIntegerField(default=0)),
+                ('rejected', models.PositiveIntegerField(default=0)),
+                ('signal_good', models.PositiveIntegerField(default=0)),
+                ('signal_fair', models.PositiveIntegerField(default=0)),
+                ('signal_poor', models.PositiveIntegerField(default=0)),
+                ('signal_unknown', models.PositiveIntegerField(default=0)),
+                ('latency_le_1ms', models.PositiveIntegerField(default=0)),
+                ('latency_le_5ms', models.PositiveIntegerField(default=0)),
+                ('latency_le_20ms', models.PositiveIntegerField(default=0)),
+                ('latency_le_100ms', models.PositiveIntegerField(default=0)),
+                ('latency_le_500ms', models.PositiveIntegerField(default=0)),
+                ('latency_slow', models.PositiveIntegerField(default=0)),
+                ('latency_max_ms', models.PositiveIntegerField(default=0)),
+                ('gate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='health_minutes', to='core.gate')),
+            ],
+            options={
+                'db_table': 'gate_health_minutes',
+                'ordering': ['-minute', 'gate'],
+                'indexes': [models.Index(fields=['minute'], name='gate_health_minute_a9c1c8_idx')],
+                'constraints': [models.UniqueConstraint(fields=('gate', 'minute'), name='gate_health_minute_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_gate_health_minutes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='run',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_run_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverBest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('stage', 'Stage'), ('course', 'Strecke'), ('season', 'Strecke/Saison')], max_length=20)),
+                ('key', models.CharField(max_length=255)),
+                ('label', models.CharField(blank=True, max_length=255)),
+                ('best_final_ms', models.BigIntegerField(blank=True, null=True)),
+                ('best_run_id', models.BigIntegerField(blank=True, null=True)),
+                ('best_session_id', models.BigIntegerField(blank=True, null=True)),
+                ('best_at', models.DateTimeField(blank=True, null=True)),
+                ('previous_best_ms', models.BigIntegerField(blank=True, null=True)),
+                ('finished_runs', models.PositiveIntegerField(default=0)),
+                ('total_final_ms', models.BigIntegerField(default=0)),
+                ('last_final_ms', models.BigIntegerField(blank=True, null=True)),
+                ('last_run_id', models.BigIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bests', to='core.driver')),
+                ('race_class', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='driver_bests', to='core.raceclass')),
+            ],
+            options={
+                'db_table': 'driver_bests',
+                'ordering': ['driver', 'scope', 'key'],
+                'constraints': [models.UniqueConstraint(fields=('driver', 'key'), name='driver_best_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_driver_bests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kiosksession',
+            name='gate_clock_offset_ms',
+            field=models.BigIntegerField(blank=True, help_text='Server clock minus gate clock, estimated from recent passages.', null=True),
+        ),
+        migrations.CreateModel(
+            name='KioskRunState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.BigIntegerField()),
+                ('run_id', models.BigIntegerField()),
+                ('driver_name', models.CharField(max_length=150)),
+                ('start_number', models.IntegerField(blank=True, null=True)),
+                ('status', models.CharField(max_length=20)),
+                ('started_ms', models.BigIntegerField(blank=True, null=True)),
+                ('finished_ms', models.BigIntegerField(blank=True, null=True)),
+                ('final_time_ms', models.BigIntegerField(blank=True, null=True)),
+                ('splits', models.JSONField(default=list)),
+                ('version', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'kiosk_run_states',
+                'indexes': [models.Index(fields=['session_id', 'version'], name='kiosk_run_s_session_af768a_idx')],
+                'constraints': [models.UniqueConstraint(fields=('session_id', 'run_id'), name='kiosk_run_state_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_overlay_live_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='passage',
+            name='clock_sync',
+            field=models.CharField(choices=[('none', 'Keine Synchronisation'), ('stable', 'Stabil'), ('unstable', 'Instabil')], default='none', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='passage',
+            name='gate_timestamp_ms',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='GateClock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('offset_ms', models.FloatField(default=0.0)),
+                ('drift_ppm', models.FloatField(default=0.0)),
+                ('reference_ms', models.BigIntegerField(default=0)),
+                ('jitter_ms', models.FloatField(blank=True, null=True)),
+                ('delay_ms', models.FloatField(blank=True, null=True)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('is_stable', models.BooleanField(default=False)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+                ('gate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='clock', to='core.gate')),
+            ],
+            options={
+                'db_table': 'gate_clocks',
+            },
+        ),
+    ]
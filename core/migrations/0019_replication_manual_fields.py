@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_gate_clock_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changelogentry',
+            name='manual_fields',
+            field=models.JSONField(blank=True, default=list, help_text='Fields changed by hand in this change (manual changes only).'),
+        ),
+        migrations.AlterField(
+            model_name='replicatedobject',
+            name='manual_fields',
+            field=models.JSONField(default=dict, help_text='Field name -> order stamp of the last manual change on this node.'),
+        ),
+    ]
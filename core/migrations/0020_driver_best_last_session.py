@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_replication_manual_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverbest',
+            name='last_session_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
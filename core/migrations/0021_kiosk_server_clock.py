@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:59
+
+from django.db import migrations
+
+
+def clear_run_states(apps, schema_editor):
+    # Splits were published with gate clock keys; the next publication
+    # rewrites all run states.
+    KioskRunState = apps.get_model('core', 'KioskRunState')
+    KioskRunState.objects.using(schema_editor.connection.alias).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_driver_best_last_session'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='kiosksession',
+            name='gate_clock_offset_ms',
+        ),
+        migrations.RunPython(
+            clear_run_states,
+            migrations.RunPython.noop,
+            hints={'model_name': 'kioskrunstate'},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_kiosk_server_clock'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='captureupload',
+            name='status',
+            field=models.CharField(choices=[('receiving', 'Receiving'), ('writing', 'Writing chunk'), ('complete', 'Complete'), ('done', 'Done'), ('failed', 'Failed')], default='receiving', max_length=20),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_capture_upload_writing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverBestRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('session_id', models.BigIntegerField()),
+                ('run_id', models.BigIntegerField()),
+                ('final_time_ms', models.BigIntegerField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_runs', to='core.driver')),
+            ],
+            options={
+                'db_table': 'driver_best_runs',
+                'constraints': [models.UniqueConstraint(fields=('driver', 'key', 'session_id', 'run_id'), name='driver_best_run_unique')],
+            },
+        ),
+    ]
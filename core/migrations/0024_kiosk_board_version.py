@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_driver_best_runs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kiosksession',
+            name='board_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_sessions(apps, schema_editor):
+    Capture = apps.get_model('core', 'Capture')
+    OCRResult = apps.get_model('core', 'OCRResult')
+    alias = schema_editor.connection.alias
+    sessions = Capture.objects.using(alias).filter(pk=OuterRef('capture_id'))
+    OCRResult.objects.using(alias).update(
+        session_id=Subquery(sessions.values('passage__session_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_kiosk_board_version'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ocrresult',
+            name='ocr_review_queue_idx',
+        ),
+        migrations.AddField(
+            model_name='ocrresult',
+            name='session',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ocr_results', to='core.session'),
+        ),
+        migrations.RunPython(
+            copy_sessions,
+            migrations.RunPython.noop,
+            hints={'model_name': 'ocrresult'},
+        ),
+        migrations.AddIndex(
+            model_name='ocrresult',
+            index=models.Index(fields=['session', 'status', 'reviewed_at', '-created_at', '-id'], name='ocr_review_queue_idx'),
+        ),
+    ]
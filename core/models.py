@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import uuid
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, router, transaction
 from django.utils import timezone
 
 
@@ -88,6 +91,11 @@ class Event(TimeStampedModel):
     end_date = models.DateField(blank=True, null=True)
     timezone = models.CharField(max_length=50, default="Europe/Berlin")
     notes = models.TextField(blank=True, null=True)
+    is_sharded = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text="Timing data is stored in the event's own database file.",
+    )
 
     class Meta:
         ordering = ["-start_date", "name"]
@@ -95,6 +103,11 @@ class Event(TimeStampedModel):
     def __str__(self) -> str:
         return f"{self.name} ({self.start_date})"
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and getattr(settings, "RALLYCONTROL_EVENT_SHARDS", False):
+            self.is_sharded = True
+        super().save(*args, **kwargs)
+
 
 class Stage(TimeStampedModel):
     """Stage within an event."""
@@ -153,6 +166,9 @@ class Session(TimeStampedModel):
     )
     start_time = models.DateTimeField(blank=True, null=True)
     end_time = models.DateTimeField(blank=True, null=True)
+    start_interval_s = models.PositiveIntegerField(
+        default=30, help_text="Abstand zwischen zwei Starts in Sekunden."
+    )
 
     class Meta:
         ordering = ["stage", "start_time", "name"]
@@ -187,6 +203,11 @@ class Gate(TimeStampedModel):
     is_enabled = models.BooleanField(default=True)
     last_seen_at = models.DateTimeField(blank=True, null=True)
     fw_version = models.CharField(max_length=50, blank=True, null=True)
+    debounce_ms = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text="Entprellfenster in ms; leer = Standard für den Gate-Typ.",
+    )
     notes = models.TextField(blank=True, null=True)
 
     class Meta:
@@ -221,8 +242,25 @@ class Vehicle(TimeStampedModel):
         return f"{self.driver} – {self.name}"
 
 
+class RunConflict(Exception):
+    """A run was changed by someone else since it was loaded."""
+
+    def __init__(self, run_id: int, version: int) -> None:
+        super().__init__(f"Run {run_id} was changed concurrently (expected version {version}).")
+        self.run_id = run_id
+        self.version = version
+
+
 class Run(TimeStampedModel):
-    """A single timed run of a driver."""
+    """A single timed run of a driver.
+
+    Gates, replication and race control change runs concurrently. Every
+    write increments ``version``: set-based updates add
+    ``version=F("version") + 1``, and ``save()`` of a loaded run only writes
+    the fields that changed, and only if ``version`` is still the one it was
+    loaded (or edited) with. Otherwise it raises ``RunConflict`` instead of
+    overwriting the newer row.
+    """
 
     class Status(models.TextChoices):
         QUEUED = "queued", "Queued"
@@ -269,21 +307,131 @@ class Run(TimeStampedModel):
         choices=StartNumberSource.choices,
         default=StartNumberSource.DRIVER_DEFAULT,
     )
+    start_position = models.PositiveIntegerField(blank=True, null=True)
+    planned_start_at = models.DateTimeField(blank=True, null=True)
     comment = models.TextField(blank=True, null=True)
+    version = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ["session", "driver"]
         indexes = [
             models.Index(fields=["session"]),
             models.Index(fields=["driver"]),
+            models.Index(fields=["started_at"]),
+            models.Index(fields=["session", "status", "start_position"]),
         ]
 
     def __str__(self) -> str:
         return f"{self.driver} @ {self.session}"
 
+    def compute_final_time(self) -> int | None:
+        if self.total_time_ms is None:
+            return self.final_time_ms
+        return self.total_time_ms + self.penalty_ms
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def changed_fields(self) -> list[str]:
+        """Fields that differ from the values loaded from the database."""
+        loaded = getattr(self, "_loaded_values", None)
+        deferred = self.get_deferred_fields()
+        return [
+            field.attname
+            for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.attname not in ("version", "updated_at")
+            and field.attname not in deferred
+            and (
+                loaded is None
+                or field.attname not in loaded
+                or getattr(self, field.attname) != loaded[field.attname]
+            )
+        ]
+
+    def _remember_loaded(self) -> None:
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields
+        }
+
+    def save(self, *args, **kwargs):
+        # final_time_ms is always total_time_ms + penalty_ms once a time exists.
+        self.final_time_ms = self.compute_final_time()
+        if self._state.adding or kwargs.get("force_insert"):
+            super().save(*args, **kwargs)
+            self._remember_loaded()
+            return
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            update_fields = self.changed_fields()
+            if not update_fields:
+                return
+        update_fields = set(update_fields) - {"version"}
+        if {"total_time_ms", "penalty_ms"} & update_fields:
+            update_fields.add("final_time_ms")
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            claimed = (
+                type(self)
+                .objects.using(using)
+                .filter(pk=self.pk, version=self.version)
+                .update(version=models.F("version") + 1)
+            )
+            if not claimed:
+                raise RunConflict(self.pk, self.version)
+            self.version += 1
+            kwargs.update(using=using, update_fields={*update_fields, "updated_at"})
+            super().save(*args, **kwargs)
+        self._remember_loaded()
+
+
+class RunCorrection(models.Model):
+    """Audit entry of a manual (bulk) correction applied by race control."""
+
+    class Action(models.TextChoices):
+        ADD_PENALTY = "add_penalty", "Add Penalty"
+        SET_PENALTY = "set_penalty", "Set Penalty"
+        SET_STATUS = "set_status", "Set Status"
+        RECOMPUTE = "recompute", "Recompute Final Times"
+
+    action = models.CharField(max_length=20, choices=Action.choices)
+    run_ids = models.JSONField(default=list)
+    session_ids = models.JSONField(default=list)
+    penalty_ms = models.IntegerField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=Run.Status.choices, blank=True, null=True)
+    reason = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="run_corrections",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "run_corrections"
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"{self.get_action_display()} ({len(self.run_ids)} Läufe)"
+
 
 class Passage(TimeStampedModel):
-    """Gate event with source timestamp."""
+    """Gate event with source timestamp.
+
+    ``timestamp_ms`` is on the server clock once the gate's clock is synced
+    (``core.clock_sync``); the gate's own value is kept in
+    ``gate_timestamp_ms``.
+    """
+
+    class ClockSync(models.TextChoices):
+        NONE = "none", "Keine Synchronisation"
+        STABLE = "stable", "Stabil"
+        UNSTABLE = "unstable", "Instabil"
 
     run = models.ForeignKey(
         Run,
@@ -308,6 +456,10 @@ class Passage(TimeStampedModel):
     signal_quality = models.CharField(max_length=50, blank=True, null=True)
     raw_payload = models.TextField(blank=True, null=True)
     is_valid = models.BooleanField(default=True)
+    gate_timestamp_ms = models.BigIntegerField(blank=True, null=True)
+    clock_sync = models.CharField(
+        max_length=10, choices=ClockSync.choices, default=ClockSync.NONE
+    )
 
     class Meta:
         ordering = ["timestamp_ms"]
@@ -315,6 +467,7 @@ class Passage(TimeStampedModel):
             models.Index(fields=["session"]),
             models.Index(fields=["gate"]),
             models.Index(fields=["timestamp_ms"]),
+            models.Index(fields=["received_at"]),
         ]
 
     def __str__(self) -> str:
@@ -338,6 +491,7 @@ class Capture(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["created_at"])]
 
     def __str__(self) -> str:
         return f"Capture {self.pk} for {self.passage}"
@@ -356,6 +510,15 @@ class OCRResult(models.Model):
         on_delete=models.CASCADE,
         related_name="ocr_results",
     )
+    # Copy of capture.passage.session, so the review queue needs no join.
+    session = models.ForeignKey(
+        Session,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="ocr_results",
+    )
     detected_number = models.IntegerField(blank=True, null=True)
     confidence = models.FloatField()
     engine = models.CharField(max_length=50)
@@ -364,16 +527,92 @@ class OCRResult(models.Model):
         max_length=20, choices=Status.choices, default=Status.OK
     )
     raw_text = models.TextField(blank=True, null=True)
+    bbox = models.JSONField(
+        blank=True,
+        null=True,
+        help_text="Bounding box of the detected number in pixels: [x, y, width, height].",
+    )
+    corrected_number = models.IntegerField(blank=True, null=True)
+    reviewed_at = models.DateTimeField(blank=True, null=True)
+    reviewed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="ocr_reviews",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at"]),
+            # Review queue: unresolved results of one session and status,
+            # newest first.
+            models.Index(
+                fields=["session", "status", "reviewed_at", "-created_at", "-id"],
+                name="ocr_review_queue_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.session_id is None:
+            self.session_id = self.capture.passage.session_id
+        super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         number = self.detected_number or "?"
         return f"OCR {number} ({self.engine})"
 
 
+class CaptureUpload(models.Model):
+    """Resumable chunked upload of a capture image from a gate."""
+
+    class Status(models.TextChoices):
+        RECEIVING = "receiving", "Receiving"
+        WRITING = "writing", "Writing chunk"
+        COMPLETE = "complete", "Complete"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    gate = models.ForeignKey(Gate, on_delete=models.CASCADE, related_name="capture_uploads")
+    passage = models.ForeignKey(
+        Passage, on_delete=models.CASCADE, related_name="capture_uploads"
+    )
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    extension = models.CharField(max_length=10, default="jpg")
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    captured_at_ms = models.BigIntegerField(blank=True, null=True)
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.RECEIVING
+    )
+    capture = models.ForeignKey(
+        Capture,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="uploads",
+    )
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "capture_uploads"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["gate", "sha256"]),
+            models.Index(fields=["status", "updated_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Upload {self.upload_id} ({self.received_bytes}/{self.size})"
+
+
 class Leaderboard(models.Model):
     """Cached leaderboard JSON payload for fast kiosk rendering."""
 
@@ -392,10 +631,377 @@ class Leaderboard(models.Model):
     generated_at = models.DateTimeField(auto_now_add=True)
     data_json = models.JSONField()
     checksum = models.CharField(max_length=64, blank=True, null=True)
+    is_checkpoint = models.BooleanField(
+        default=False,
+        help_text="Checkpoints are kept by the retention policy; other superseded boards are pruned.",
+    )
 
     class Meta:
         ordering = ["-generated_at"]
         unique_together = ("session", "race_class", "generated_at")
+        indexes = [
+            models.Index(fields=["session", "is_checkpoint", "generated_at"]),
+        ]
 
     def __str__(self) -> str:
         return f"Leaderboard for {self.session}"
+
+
+class GateHealthMinute(models.Model):
+    """Per-gate, per-minute passage counters maintained at ingest time."""
+
+    gate = models.ForeignKey(Gate, on_delete=models.CASCADE, related_name="health_minutes")
+    minute = models.DateTimeField()
+    valid = models.PositiveIntegerField(default=0)
+    invalid = models.PositiveIntegerField(default=0)
+    debounced = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    signal_good = models.PositiveIntegerField(default=0)
+    signal_fair = models.PositiveIntegerField(default=0)
+    signal_poor = models.PositiveIntegerField(default=0)
+    signal_unknown = models.PositiveIntegerField(default=0)
+    # Ingest latency histogram (server-side processing time per message).
+    latency_le_1ms = models.PositiveIntegerField(default=0)
+    latency_le_5ms = models.PositiveIntegerField(default=0)
+    latency_le_20ms = models.PositiveIntegerField(default=0)
+    latency_le_100ms = models.PositiveIntegerField(default=0)
+    latency_le_500ms = models.PositiveIntegerField(default=0)
+    latency_slow = models.PositiveIntegerField(default=0)
+    latency_max_ms = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "gate_health_minutes"
+        ordering = ["-minute", "gate"]
+        constraints = [
+            models.UniqueConstraint(fields=["gate", "minute"], name="gate_health_minute_unique")
+        ]
+        indexes = [models.Index(fields=["minute"])]
+
+    def __str__(self) -> str:
+        return f"{self.gate} @ {self.minute:%H:%M}"
+
+
+class GateClock(models.Model):
+    """Last clock estimate of a gate: server clock minus gate clock.
+
+    Written by ``core.clock_sync`` after heartbeats; seeds the in-memory
+    estimate after a restart and shows the sync state on the gate health
+    page.
+    """
+
+    gate = models.OneToOneField(Gate, on_delete=models.CASCADE, related_name="clock")
+    offset_ms = models.FloatField(default=0.0)
+    drift_ppm = models.FloatField(default=0.0)
+    reference_ms = models.BigIntegerField(default=0)
+    jitter_ms = models.FloatField(blank=True, null=True)
+    delay_ms = models.FloatField(blank=True, null=True)
+    samples = models.PositiveIntegerField(default=0)
+    is_stable = models.BooleanField(default=False)
+    synced_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "gate_clocks"
+
+    def __str__(self) -> str:
+        return f"{self.gate}: {self.offset_ms:+.1f} ms"
+
+
+class DriverBest(models.Model):
+    """Personal best and run statistics of a driver in one scope and class.
+
+    Maintained incrementally as runs finish (see ``core.career``). Runs may
+    live in event shards, where every shard numbers its runs from 1, so the
+    best and last run are plain ids that are only unique together with
+    their session.
+    """
+
+    class Scope(models.TextChoices):
+        STAGE = "stage", "Stage"
+        COURSE = "course", "Strecke"
+        SEASON = "season", "Strecke/Saison"
+
+    driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name="bests")
+    race_class = models.ForeignKey(
+        RaceClass,
+        on_delete=models.CASCADE,
+        related_name="driver_bests",
+        blank=True,
+        null=True,
+    )
+    scope = models.CharField(max_length=20, choices=Scope.choices)
+    key = models.CharField(max_length=255)
+    label = models.CharField(max_length=255, blank=True)
+    best_final_ms = models.BigIntegerField(blank=True, null=True)
+    best_run_id = models.BigIntegerField(blank=True, null=True)
+    best_session_id = models.BigIntegerField(blank=True, null=True)
+    best_at = models.DateTimeField(blank=True, null=True)
+    previous_best_ms = models.BigIntegerField(blank=True, null=True)
+    finished_runs = models.PositiveIntegerField(default=0)
+    total_final_ms = models.BigIntegerField(default=0)
+    last_final_ms = models.BigIntegerField(blank=True, null=True)
+    last_run_id = models.BigIntegerField(blank=True, null=True)
+    last_session_id = models.BigIntegerField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "driver_bests"
+        ordering = ["driver", "scope", "key"]
+        constraints = [
+            models.UniqueConstraint(fields=["driver", "key"], name="driver_best_unique")
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.driver} · {self.label or self.key}"
+
+    @property
+    def average_final_ms(self) -> int | None:
+        if not self.finished_runs:
+            return None
+        return round(self.total_final_ms / self.finished_runs)
+
+
+class DriverBestRun(models.Model):
+    """A finished run as counted in the ``DriverBest`` row of ``key``.
+
+    One row per driver, key, session and run: a run is counted once per
+    row, and a corrected time replaces the value it was counted with.
+    """
+
+    driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name="best_runs")
+    key = models.CharField(max_length=255)
+    session_id = models.BigIntegerField()
+    run_id = models.BigIntegerField()
+    final_time_ms = models.BigIntegerField()
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "driver_best_runs"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["driver", "key", "session_id", "run_id"], name="driver_best_run_unique"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.driver} · {self.key} · Lauf {self.run_id}"
+
+
+class ConfigVersion(models.Model):
+    """Monotonic version counter shared by all worker processes.
+
+    Process-local caches remember the version they were loaded at and
+    reload once the counter in the database has moved on.
+    """
+
+    GATE_REGISTRY = "gate_registry"
+    START_LISTS = "start_lists"
+    MASTER_DATA = "master_data"
+    LIVE_STATE = "live_state"
+    SEARCH_INDEX = "search_index"
+
+    key = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "config_versions"
+
+    def __str__(self) -> str:
+        return f"{self.key} v{self.version}"
+
+    @classmethod
+    def current(cls, key: str) -> int:
+        version = cls.objects.filter(key=key).values_list("version", flat=True).first()
+        return version or 0
+
+    @classmethod
+    def bump(cls, key: str) -> None:
+        updated = cls.objects.filter(key=key).update(
+            version=models.F("version") + 1, updated_at=timezone.now()
+        )
+        if not updated:
+            cls.objects.get_or_create(key=key, defaults={"version": 1})
+
+
+# ---------------------------------------------------------------------------
+# Kiosk snapshot models
+#
+# These tables live in the separate "kiosk" SQLite database (see
+# ``core.routers.KioskSnapshotRouter``). They are written only by the
+# snapshot publisher and read by the public spectator views, so public
+# traffic never touches the primary timing database.
+# ---------------------------------------------------------------------------
+
+
+class KioskSession(models.Model):
+    """Published public status of a session."""
+
+    kiosk_snapshot = True
+
+    session_id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=150)
+    stage_name = models.CharField(max_length=150)
+    event_name = models.CharField(max_length=200)
+    session_type = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+    start_time = models.DateTimeField(blank=True, null=True)
+    end_time = models.DateTimeField(blank=True, null=True)
+    run_counts = models.JSONField(default=dict)
+    published_at = models.DateTimeField()
+    # Publication (``published_at`` in microseconds) that last changed what
+    # the kiosk board page shows: boards, start list or session header.
+    board_version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "kiosk_sessions"
+
+    def __str__(self) -> str:
+        return f"Kiosk {self.name}"
+
+
+class KioskBoard(models.Model):
+    """Published current leaderboard of a session and class."""
+
+    kiosk_snapshot = True
+
+    session_id = models.BigIntegerField()
+    race_class_id = models.BigIntegerField(blank=True, null=True)
+    race_class_name = models.CharField(max_length=100, blank=True, null=True)
+    generated_at = models.DateTimeField()
+    checksum = models.CharField(max_length=64, blank=True, null=True)
+    data_json = models.JSONField()
+
+    class Meta:
+        db_table = "kiosk_boards"
+        indexes = [models.Index(fields=["session_id"])]
+
+    def __str__(self) -> str:
+        return f"Kiosk board {self.session_id}/{self.race_class_name or 'overall'}"
+
+
+class KioskStartListEntry(models.Model):
+    """Published start list position of a queued run."""
+
+    kiosk_snapshot = True
+
+    session_id = models.BigIntegerField()
+    position = models.PositiveIntegerField()
+    run_id = models.BigIntegerField()
+    driver_name = models.CharField(max_length=150)
+    start_number = models.IntegerField(blank=True, null=True)
+    status = models.CharField(max_length=20)
+    planned_start_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "kiosk_start_list"
+        ordering = ["session_id", "position"]
+        indexes = [models.Index(fields=["session_id", "position"])]
+
+    def __str__(self) -> str:
+        return f"{self.position}. {self.driver_name}"
+
+
+class KioskRunState(models.Model):
+    """Published live state of a run that has left the start list.
+
+    ``version`` is the publication (``published_at`` in microseconds) that
+    last changed the row, so overlays fetch only what changed since their
+    last poll. Times are server clock timestamps in milliseconds, as stored
+    in ``Passage.timestamp_ms``.
+    """
+
+    kiosk_snapshot = True
+
+    session_id = models.BigIntegerField()
+    run_id = models.BigIntegerField()
+    driver_name = models.CharField(max_length=150)
+    start_number = models.IntegerField(blank=True, null=True)
+    status = models.CharField(max_length=20)
+    started_ms = models.BigIntegerField(blank=True, null=True)
+    finished_ms = models.BigIntegerField(blank=True, null=True)
+    final_time_ms = models.BigIntegerField(blank=True, null=True)
+    splits = models.JSONField(default=list)
+    version = models.BigIntegerField()
+
+    class Meta:
+        db_table = "kiosk_run_states"
+        constraints = [
+            models.UniqueConstraint(fields=["session_id", "run_id"], name="kiosk_run_state_unique")
+        ]
+        indexes = [models.Index(fields=["session_id", "version"])]
+
+    def __str__(self) -> str:
+        return f"{self.driver_name} ({self.status})"
+
+
+# ---------------------------------------------------------------------------
+# Stage node replication
+# ---------------------------------------------------------------------------
+
+
+class ChangeLogEntry(models.Model):
+    """Outbound change of a timing row on a stage node.
+
+    The primary key is the per-node sequence number shipped to the
+    central node.
+    """
+
+    class Operation(models.TextChoices):
+        UPSERT = "upsert", "Upsert"
+        DELETE = "delete", "Delete"
+
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    operation = models.CharField(
+        max_length=10, choices=Operation.choices, default=Operation.UPSERT
+    )
+    payload = models.JSONField(default=dict)
+    is_manual = models.BooleanField(default=False)
+    manual_fields = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Fields changed by hand in this change (manual changes only).",
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "replication_changelog"
+        ordering = ["pk"]
+
+    def __str__(self) -> str:
+        return f"#{self.pk} {self.operation} {self.model}:{self.object_id}"
+
+
+class ReplicationCursor(models.Model):
+    """Last sequence number acknowledged (stage) or applied (central) per node."""
+
+    node_id = models.CharField(max_length=50, unique=True)
+    last_seq = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "replication_cursors"
+
+    def __str__(self) -> str:
+        return f"{self.node_id} @ {self.last_seq}"
+
+
+class ReplicatedObject(models.Model):
+    """Maps a row of a stage node to its local copy on the central node."""
+
+    node_id = models.CharField(max_length=50)
+    model = models.CharField(max_length=20)
+    remote_id = models.BigIntegerField()
+    local_id = models.BigIntegerField()
+    manual_fields = models.JSONField(
+        default=dict,
+        help_text="Field name -> order stamp of the last manual change on this node.",
+    )
+
+    class Meta:
+        db_table = "replication_objects"
+        unique_together = ("node_id", "model", "remote_id")
+        indexes = [models.Index(fields=["model", "local_id"])]
+
+    def __str__(self) -> str:
+        return f"{self.node_id}:{self.model}:{self.remote_id} -> {self.local_id}"
@@ -0,0 +1,34 @@
+"""Node-to-node HTTP endpoints (stage node -> central node replication)."""
+
+import json
+
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from . import replication
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ReplicationPushView(View):
+    """Accepts change log batches from stage nodes."""
+
+    http_method_names = ["post"]
+
+    def post(self, request):
+        if not replication.check_token(request.headers.get("X-RallyControl-Token")):
+            return JsonResponse({"error": "Invalid replication token."}, status=403)
+        try:
+            body = json.loads(request.body)
+            node = str(body["node_id"])
+            entries = list(body["entries"])
+        except (UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError) as exc:
+            return JsonResponse({"error": f"Malformed batch: {exc}"}, status=400)
+        if node == replication.node_id():
+            return JsonResponse({"error": "A node cannot replicate to itself."}, status=400)
+        try:
+            acked_seq = replication.apply_batch(node, entries)
+        except (replication.ReplicationError, KeyError, TypeError, ValueError) as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+        return JsonResponse({"node_id": node, "acked_seq": acked_seq})
@@ -0,0 +1,171 @@
+"""
+Review queue for OCR results race control has to confirm by hand.
+
+Unresolved ``LOW_CONFIDENCE`` and ``FAILED`` results of running sessions
+are listed newest first. The list is paged with a keyset cursor on
+``(created_at, id)``. Results carry the session of their passage, so each
+(session, status) pair is one range of the composite
+``ocr_review_queue_idx`` index, read in order without a join; every page
+stays fast with thousands of open items.
+
+Assigning a start number marks every open result of the capture as
+reviewed, sets ``start_number_used`` of the matching run with source
+``MANUAL_OVERRIDE`` and re-links the passage if it belonged to another run.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+
+from . import replication, shards
+from .leaderboards import schedule_regeneration
+from .models import OCRResult, Passage, Run, RunConflict, Session, User
+
+REVIEW_STATUSES = (OCRResult.Status.LOW_CONFIDENCE, OCRResult.Status.FAILED)
+PAGE_SIZE = 25
+
+
+class ReviewError(Exception):
+    """Raised when an OCR result cannot be assigned."""
+
+
+def encode_cursor(result: OCRResult) -> str:
+    return f"{result.created_at.isoformat()}_{result.pk}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        stamp, pk = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(stamp), int(pk)
+    except ValueError as exc:
+        raise ReviewError("Ungültiger Cursor.") from exc
+
+
+def running_sessions_by_db() -> dict[str, list[int]]:
+    """Running session ids grouped by the (event) database of their results."""
+    grouped: dict[str, list[int]] = {}
+    for session_id in Session.objects.filter(status=Session.Status.RUNNING).values_list(
+        "pk", flat=True
+    ):
+        grouped.setdefault(shards.alias_for_session(session_id), []).append(session_id)
+    return grouped
+
+
+def open_results(status: str | None = None, using: str | None = None, session_ids=None):
+    statuses = REVIEW_STATUSES if status is None else (status,)
+    if session_ids is None:
+        grouped = running_sessions_by_db()
+        using = using or shards.current_alias()
+        session_ids = grouped.get(using, [])
+    return OCRResult.objects.using(using).filter(
+        status__in=statuses,
+        reviewed_at__isnull=True,
+        session_id__in=session_ids,
+    )
+
+
+def review_page(cursor: str | None = None, limit: int = PAGE_SIZE):
+    """Return one page of the queue and the cursor of the next page.
+
+    Each session and review status is read separately so that every query
+    walks ``ocr_review_queue_idx`` in order; the pages are merged in Python.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    rows: list[OCRResult] = []
+    for using, session_ids in running_sessions_by_db().items():
+        rows.extend(_review_rows(using, session_ids, position, limit))
+    rows.sort(key=lambda result: (result.created_at, result.pk), reverse=True)
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def _review_rows(using: str, session_ids: list[int], position, limit: int) -> list[OCRResult]:
+    rows: list[OCRResult] = []
+    for session_id in session_ids:
+        for status in REVIEW_STATUSES:
+            queryset = open_results(status, using, [session_id]).select_related(
+                "capture__passage__gate", "capture__passage__run__driver"
+            )
+            if position is not None:
+                created_at, pk = position
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+                )
+            rows.extend(queryset.order_by("-created_at", "-pk")[: limit + 1])
+    return rows
+
+
+def _target_run(passage: Passage, start_number: int, run_id: int | None) -> Run:
+    runs = Run.objects.select_for_update().filter(session_id=passage.session_id)
+    if run_id is not None:
+        run = runs.filter(pk=run_id).first()
+        if run is None:
+            raise ReviewError(f"Lauf {run_id} gehört nicht zur Session der Passage.")
+        return run
+    if passage.run_id is not None:
+        current = runs.filter(pk=passage.run_id).first()
+        if current is not None and current.start_number_used in (None, start_number):
+            return current
+    run = (
+        runs.filter(start_number_used=start_number)
+        .exclude(status__in=[Run.Status.VOID, Run.Status.DSQ])
+        .order_by("-started_at", "-pk")
+        .first()
+    )
+    if run is not None:
+        return run
+    if passage.run_id is not None:
+        # No run with this number: the passage's run carried the wrong number.
+        return runs.get(pk=passage.run_id)
+    raise ReviewError(f"Kein Lauf mit Startnummer {start_number} in dieser Session.")
+
+
+def assign(
+    result: OCRResult,
+    start_number: int,
+    *,
+    user: User | None = None,
+    run_id: int | None = None,
+) -> Run:
+    """Resolve ``result`` with the start number race control read off the image."""
+    using = result._state.db or shards.current_alias()
+    with shards.using_db(using), shards.atomic(), replication.manual_changes():
+        passage = Passage.objects.select_for_update().get(captures__ocr_results=result)
+        run = _target_run(passage, start_number, run_id)
+        if (
+            run.start_number_used != start_number
+            or run.start_number_source != Run.StartNumberSource.MANUAL_OVERRIDE
+        ):
+            run.start_number_used = start_number
+            run.start_number_source = Run.StartNumberSource.MANUAL_OVERRIDE
+            try:
+                run.save(update_fields=["start_number_used", "start_number_source"])
+            except RunConflict as exc:
+                raise ReviewError(
+                    "Der Lauf wurde gerade geändert, bitte erneut zuordnen."
+                ) from exc
+        if passage.run_id != run.pk:
+            passage.run = run
+            passage.save(update_fields=["run", "updated_at"])
+        OCRResult.objects.filter(
+            capture_id=result.capture_id, reviewed_at__isnull=True
+        ).update(
+            corrected_number=start_number,
+            reviewed_at=timezone.now(),
+            reviewed_by=user if user is not None and user.is_authenticated else None,
+        )
+        schedule_regeneration(passage.session_id)
+    return run
+
+
+def dismiss(result: OCRResult, *, user: User | None = None) -> int:
+    """Mark the open results of a capture as reviewed without changes."""
+    return OCRResult.objects.using(result._state.db).filter(
+        capture_id=result.capture_id, reviewed_at__isnull=True
+    ).update(
+        reviewed_at=timezone.now(),
+        reviewed_by=user if user is not None and user.is_authenticated else None,
+    )
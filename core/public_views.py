@@ -0,0 +1,317 @@
+"""
+Public read-only views for spectators (kiosk, overlay, session status).
+
+These views are natively async and only use Django's async ORM, so under
+ASGI (``rallycontrol/asgi.py``) a single process can hold many slow
+spectator connections without dedicating a thread to each of them. They
+read exclusively from the kiosk snapshot database (``core.kiosk_snapshot``),
+never from the primary database that gates and race control write to.
+
+Responses are built once per version of what they show and served from
+``core.compression.payload_cache`` as gzip or brotli with an ETag, so
+repeated polls cost one primary key lookup. Feeds that carry the
+publication time (status, overlay feed) follow ``published_at``; the kiosk
+board page follows ``board_version``, which the publisher only moves when
+the boards, the start list or the session header change.
+
+The overlay live feed sends only the run states that changed since the
+client's last version, plus a clock reference; the overlay runs the timer
+of a run on course itself.
+"""
+
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import OperationalError
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.views import View
+
+from .compression import CompressedPayload, payload_cache
+from .models import KioskBoard, KioskRunState, KioskSession, KioskStartListEntry
+
+# How often a waiting live feed request looks for a new publication.
+LIVE_POLL_SECONDS = 0.25
+# Retry-After while the snapshot database cannot be read.
+SNAPSHOT_RETRY_SECONDS = 5
+
+
+class SnapshotUnavailable(Exception):
+    """The snapshot database cannot be read (not published yet, or busy)."""
+
+
+def snapshot_unavailable() -> JsonResponse:
+    response = JsonResponse({"error": "Noch keine Daten veröffentlicht."}, status=503)
+    response["Retry-After"] = str(SNAPSHOT_RETRY_SECONDS)
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+def _ms(value) -> int | None:
+    return int(value.timestamp() * 1000) if value else None
+
+
+async def _kiosk_session(session_id: int, field: str):
+    try:
+        value = await (
+            KioskSession.objects.filter(session_id=session_id)
+            .values_list(field, flat=True)
+            .afirst()
+        )
+    except OperationalError as exc:
+        # The publisher creates the snapshot file and its tables on the first
+        # publication, so a fresh installation has nothing to read yet.
+        raise SnapshotUnavailable from exc
+    if value is None:
+        raise Http404("Session not found")
+    return value
+
+
+async def get_published_version(session_id: int) -> int:
+    """Microsecond timestamp of the session's last publication (404 if unpublished)."""
+    published_at = await _kiosk_session(session_id, "published_at")
+    return int(published_at.timestamp() * 1_000_000)
+
+
+async def get_board_version(session_id: int) -> int:
+    """Publication that last changed the session's kiosk board (404 if unpublished)."""
+    return await _kiosk_session(session_id, "board_version")
+
+
+async def get_page_version(session_id: int) -> int:
+    """Constant version of pages that only depend on the session existing."""
+    await _kiosk_session(session_id, "session_id")
+    return 0
+
+
+async def cached_response(
+    request, kind: str, session_id: int, build, content_type: str, version=get_published_version
+):
+    """Serve ``build()`` for the current ``version(session_id)``, compressed and cached."""
+    try:
+        current = await version(session_id)
+    except SnapshotUnavailable:
+        return snapshot_unavailable()
+    key = (kind, session_id)
+    payload = payload_cache.get(key, current)
+    if payload is None:
+        body = await build()
+        etag = f'W/"{kind}-{session_id}-{current}"'
+        # Compression runs off the event loop; brotli at full quality takes a while.
+        payload = await sync_to_async(CompressedPayload, thread_sensitive=False)(
+            body, content_type, etag
+        )
+        payload_cache.put(key, current, payload)
+    return payload.response(request)
+
+
+def _json_bytes(payload: dict) -> bytes:
+    return json.dumps(payload, cls=DjangoJSONEncoder).encode()
+
+
+async def get_session_status(session_id: int) -> dict:
+    """Return the public status payload of a session."""
+    try:
+        session = await KioskSession.objects.aget(session_id=session_id)
+    except KioskSession.DoesNotExist as exc:
+        raise Http404("Session not found") from exc
+    return {
+        "session_id": session.session_id,
+        "name": session.name,
+        "stage": session.stage_name,
+        "event": session.event_name,
+        "session_type": session.session_type,
+        "status": session.status,
+        "start_time": _ms(session.start_time),
+        "end_time": _ms(session.end_time),
+        "runs": session.run_counts,
+        "published_at": _ms(session.published_at),
+    }
+
+
+async def get_current_boards(session_id: int) -> list[dict]:
+    """Return the current leaderboard of every class (overall board first)."""
+    boards = []
+    async for board in KioskBoard.objects.filter(session_id=session_id):
+        boards.append(
+            {
+                "race_class": board.race_class_name,
+                "generated_at": _ms(board.generated_at),
+                "checksum": board.checksum,
+                "data": board.data_json,
+            }
+        )
+    boards.sort(key=lambda board: (board["race_class"] is not None, board["race_class"] or ""))
+    return boards
+
+
+async def get_start_list(session_id: int) -> list[dict]:
+    return [
+        {
+            "position": entry.position,
+            "run_id": entry.run_id,
+            "driver": entry.driver_name,
+            "start_number": entry.start_number,
+            "planned_start_at": _ms(entry.planned_start_at),
+            "planned_start": (
+                timezone.localtime(entry.planned_start_at).strftime("%H:%M:%S")
+                if entry.planned_start_at
+                else None
+            ),
+        }
+        async for entry in KioskStartListEntry.objects.filter(session_id=session_id)
+    ]
+
+
+class SessionStatusView(View):
+    """JSON status of a session (state and run counters)."""
+
+    http_method_names = ["get"]
+
+    async def get(self, request, pk):
+        async def build():
+            return _json_bytes(await get_session_status(pk))
+
+        return await cached_response(request, "status", pk, build, "application/json")
+
+
+class OverlayFeedView(View):
+    """JSON feed for streaming overlays: status plus current boards."""
+
+    http_method_names = ["get"]
+
+    async def get(self, request, pk):
+        async def build():
+            payload = {
+                "session": await get_session_status(pk),
+                "boards": await get_current_boards(pk),
+                "start_list": await get_start_list(pk),
+            }
+            return _json_bytes(payload)
+
+        return await cached_response(request, "overlay", pk, build, "application/json")
+
+
+async def get_live_changes(session_id: int, since: int) -> dict:
+    """Run states published after version ``since`` (0 = all) and the clock reference."""
+    session = await (
+        KioskSession.objects.filter(session_id=session_id)
+        .values("status", "published_at")
+        .afirst()
+    )
+    if session is None:
+        raise Http404("Session not found")
+    overall = await (
+        KioskBoard.objects.filter(session_id=session_id, race_class_id__isnull=True)
+        .values_list("checksum", flat=True)
+        .afirst()
+    )
+    runs = [
+        {
+            "run_id": state.run_id,
+            "driver": state.driver_name,
+            "start_number": state.start_number,
+            "status": state.status,
+            "started_ms": state.started_ms,
+            "finished_ms": state.finished_ms,
+            "final_time_ms": state.final_time_ms,
+            "splits": state.splits,
+        }
+        async for state in KioskRunState.objects.filter(
+            session_id=session_id, version__gt=since
+        ).order_by("run_id")
+    ]
+    return {
+        "session_id": session_id,
+        "status": session["status"],
+        "version": int(session["published_at"].timestamp() * 1_000_000),
+        "board_version": overall,
+        "runs": runs,
+        "clock": {"server_ms": int(time.time() * 1000)},
+    }
+
+
+class OverlayLiveView(View):
+    """Sparse live feed for overlays: run starts, splits and finishes since ``?since=``.
+
+    Times are server clock milliseconds (ingest converts passages from the
+    gate clock); ``clock`` carries the server time of the response so the
+    overlay can run timers locally. With ``?wait=`` seconds (at most
+    ``RALLYCONTROL_OVERLAY_WAIT_SECONDS``) the request is held open until
+    something new is published.
+    """
+
+    http_method_names = ["get"]
+
+    async def get(self, request, pk):
+        max_wait = getattr(settings, "RALLYCONTROL_OVERLAY_WAIT_SECONDS", 15)
+        try:
+            since = int(request.GET.get("since", 0))
+            wait = min(max(float(request.GET.get("wait", 0)), 0.0), max_wait)
+        except ValueError:
+            return JsonResponse({"error": "since/wait müssen Zahlen sein."}, status=400)
+        deadline = time.monotonic() + wait
+        try:
+            while await get_published_version(pk) <= since and time.monotonic() < deadline:
+                await asyncio.sleep(LIVE_POLL_SECONDS)
+        except SnapshotUnavailable:
+            return snapshot_unavailable()
+        response = JsonResponse(await get_live_changes(pk, since))
+        response["Cache-Control"] = "no-store"
+        return response
+
+
+class OverlayView(View):
+    """Transparent overlay page (live run timer and board) for video production."""
+
+    http_method_names = ["get"]
+    template_name = "core/overlay.html"
+
+    async def get(self, request, pk):
+        async def build():
+            await get_session_status(pk)
+            context = {"session_id": pk, "page_title": "RallyControl Overlay"}
+            return render_to_string(self.template_name, context).encode()
+
+        return await cached_response(
+            request,
+            "overlay_page",
+            pk,
+            build,
+            "text/html; charset=utf-8",
+            version=get_page_version,
+        )
+
+
+class KioskBoardView(View):
+    """Full-screen leaderboard page for spectator monitors."""
+
+    http_method_names = ["get"]
+    template_name = "core/kiosk.html"
+    refresh_seconds = 5
+
+    async def get(self, request, pk):
+        async def build():
+            context = {
+                "session": await get_session_status(pk),
+                "boards": await get_current_boards(pk),
+                "start_list": await get_start_list(pk),
+                "refresh_seconds": self.refresh_seconds,
+                "page_title": "RallyControl Kiosk",
+            }
+            # The page does not depend on the request, so it can be shared.
+            return render_to_string(self.template_name, context).encode()
+
+        return await cached_response(
+            request,
+            "kiosk",
+            pk,
+            build,
+            "text/html; charset=utf-8",
+            version=get_board_version,
+        )
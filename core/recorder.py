@@ -0,0 +1,118 @@
+"""
+Append-only log of inbound gate messages, one JSON line per message.
+
+Every passage and heartbeat a gate posts is written to
+``RALLYCONTROL_RECORD_DIR/event_<id>.jsonl`` before it is processed, with
+the receive time, the gate and the session it was routed to. The logs are
+the input of ``core.replay`` (``manage.py replay_event``), which drives a
+whole race day through the real ingest code again. Heartbeats carry the
+clock exchanges that ingest normalises passage timestamps with, so a
+replay ends up with the same run times.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, TextIO
+
+from django.conf import settings
+
+from . import shards
+from .gate_registry import GateEntry
+from .models import Stage
+
+logger = logging.getLogger(__name__)
+
+LOG_NAME_RE = re.compile(r"event_(\d+)\.jsonl$")
+
+
+def enabled() -> bool:
+    return getattr(settings, "RALLYCONTROL_RECORD_GATE_MESSAGES", False)
+
+
+def record_dir() -> Path:
+    return Path(getattr(settings, "RALLYCONTROL_RECORD_DIR", settings.BASE_DIR / "recordings"))
+
+
+def log_path(event_id: int | None) -> Path:
+    name = f"event_{event_id}.jsonl" if event_id is not None else "unassigned.jsonl"
+    return record_dir() / name
+
+
+def event_id_from_path(path: Path) -> int | None:
+    match = LOG_NAME_RE.search(Path(path).name)
+    return int(match.group(1)) if match else None
+
+
+class MessageRecorder:
+    """Writes gate messages to per-event logs; files stay open between writes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._files: dict[Path, TextIO] = {}
+        self._stage_events: dict[int, int | None] = {}
+
+    def record(self, entry: GateEntry, kind: str, payload: dict[str, Any]) -> None:
+        if not enabled():
+            return
+        line = json.dumps(
+            {
+                "at_ms": int(time.time() * 1000),
+                "kind": kind,
+                "gate": entry.gate_uid,
+                "session": entry.session_id,
+                "payload": payload,
+            },
+            separators=(",", ":"),
+        )
+        try:
+            path = log_path(self._event_for(entry))
+            with self._lock:
+                handle = self._files.get(path)
+                if handle is None:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    handle = self._files[path] = open(path, "a", encoding="utf-8")
+                handle.write(line + "\n")
+                handle.flush()
+        except OSError:
+            # Recording must never cost a passage.
+            logger.exception("Could not record gate message of %s", entry.gate_uid)
+
+    def close(self) -> None:
+        with self._lock:
+            for handle in self._files.values():
+                handle.close()
+            self._files.clear()
+
+    def _event_for(self, entry: GateEntry) -> int | None:
+        if entry.session_id is not None:
+            event_id = shards.shards.event_for_session(entry.session_id)
+            if event_id is not None:
+                return event_id
+        if entry.stage_id is None:
+            return None
+        if entry.stage_id not in self._stage_events:
+            self._stage_events[entry.stage_id] = (
+                Stage.objects.filter(pk=entry.stage_id).values_list("event_id", flat=True).first()
+            )
+        return self._stage_events[entry.stage_id]
+
+
+recorder = MessageRecorder()
+
+
+def read_log(path: Path) -> list[dict[str, Any]]:
+    """Messages of a log in order; a torn last line (crash) is skipped."""
+    messages = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                messages.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning("Skipping unreadable line in %s", path)
+    return messages
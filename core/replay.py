@@ -0,0 +1,370 @@
+"""
+Replay of recorded race days.
+
+``replay`` feeds the gate messages of an event log (see ``core.recorder``)
+through the real ingest path — gate registry, clock sync, debounce, run
+matching, leaderboard regeneration — into a fresh database, at the original pace, a
+multiple of it or as fast as possible. It measures throughput and
+per-message latency and compares the final results with the original
+event, which makes a recorded race day both a reproducible benchmark and a
+regression test for changes to timing or ranking rules.
+
+The fresh database starts from a snapshot of the source event: master
+data, the sessions (set back to ``PLANNED``) and the start lists (all runs
+``QUEUED`` again, start numbers and penalties kept). Sessions are started
+and finished in the order their messages appear. Decisions of race
+control that are not gate messages are re-applied when a session ends:
+``DSQ`` and ``VOID`` always, ``DNF`` for runs that are still open.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import F
+
+from . import ingest, shards
+from .background import worker
+from .clock_sync import clocks
+from .debounce import debounce
+from .gate_registry import registry
+from .leaderboards import latest_board_ids, schedule_regeneration
+from .live_state import live_sessions
+from .models import Driver, Event, Gate, Leaderboard, RaceClass, Run, Session, Stage, Vehicle
+from .routers import KIOSK_DB
+from .start_list import start_queues
+
+RESULT_FIELDS = ("status", "total_time_ms", "final_time_ms", "position", "class_position")
+
+
+class ReplayError(Exception):
+    """Raised when a log cannot be replayed."""
+
+
+def parse_speed(value: str) -> float | None:
+    """``"max"`` -> ``None`` (no pacing), otherwise the speed-up factor."""
+    if value == "max":
+        return None
+    try:
+        speed = float(value)
+    except ValueError as exc:
+        raise ReplayError(f"Ungültige Geschwindigkeit {value!r}.") from exc
+    if speed <= 0:
+        raise ReplayError("Die Geschwindigkeit muss größer als 0 sein.")
+    return speed
+
+
+def final_results(session_ids) -> dict[int, dict[str, Any]]:
+    """Final state and board positions of every run of ``session_ids``."""
+    session_ids = list(session_ids)
+    results: dict[int, dict[str, Any]] = {}
+    runs = Run.objects.filter(session_id__in=session_ids).select_related("driver").order_by("pk")
+    for run in runs:
+        results[run.pk] = {
+            "driver": str(run.driver),
+            "session_id": run.session_id,
+            "status": run.status,
+            "total_time_ms": run.total_time_ms,
+            "final_time_ms": run.final_time_ms,
+            "position": None,
+            "class_position": None,
+        }
+    for session_id in session_ids:
+        boards = Leaderboard.objects.filter(pk__in=latest_board_ids(session_id)).values(
+            "race_class_id", "data_json"
+        )
+        for board in boards:
+            key = "position" if board["race_class_id"] is None else "class_position"
+            for entry in board["data_json"].get("entries", []):
+                if entry.get("run_id") in results:
+                    results[entry["run_id"]][key] = entry.get("position")
+    return results
+
+
+def diff_results(original: dict[int, dict], replayed: dict[int, dict]) -> list[str]:
+    diffs = []
+    for run_id in sorted(original.keys() | replayed.keys()):
+        before, after = original.get(run_id, {}), replayed.get(run_id, {})
+        changed = [
+            f"{field}: {before.get(field)} → {after.get(field)}"
+            for field in RESULT_FIELDS
+            if before.get(field) != after.get(field)
+        ]
+        if changed:
+            driver = before.get("driver") or after.get("driver")
+            diffs.append(f"Lauf {run_id} ({driver}): " + ", ".join(changed))
+    return diffs
+
+
+class EventSnapshot:
+    """Master data, reset start lists and final results of a source event."""
+
+    def __init__(self, event_id: int) -> None:
+        self.event_id = event_id
+        event = Event.objects.filter(pk=event_id).first()
+        if event is None:
+            raise ReplayError(f"Event {event_id} existiert nicht.")
+        self.sessions = list(Session.objects.filter(stage__event_id=event_id))
+        session_ids = [session.pk for session in self.sessions]
+        with shards.using_event(event_id):
+            runs = list(Run.objects.filter(session_id__in=session_ids))
+            self.results = final_results(session_ids)
+        self.rows = [
+            (RaceClass, list(RaceClass.objects.all())),
+            (Driver, list(Driver.objects.all())),
+            (Vehicle, list(Vehicle.objects.all())),
+            (Event, [event]),
+            (Stage, list(Stage.objects.filter(event_id=event_id))),
+            (Gate, list(Gate.objects.filter(stage__event_id=event_id))),
+            (Session, [self._reset_session(session) for session in self.sessions]),
+            (Run, [self._reset_run(run) for run in runs]),
+        ]
+
+    @property
+    def stage_of(self) -> dict[int, int]:
+        return {session.pk: session.stage_id for session in self.sessions}
+
+    @staticmethod
+    def _reset_session(session: Session) -> Session:
+        session.status = Session.Status.PLANNED
+        session.end_time = None
+        return session
+
+    @staticmethod
+    def _reset_run(run: Run) -> Run:
+        run.status = Run.Status.QUEUED
+        run.started_at = run.finished_at = None
+        run.total_time_ms = run.final_time_ms = None
+        return run
+
+    def restore(self) -> None:
+        """Insert the snapshot into the (fresh) default database."""
+        for model, rows in self.rows:
+            for row in rows:
+                row._state.db = None
+                row._state.adding = True
+            model.objects.bulk_create(rows, batch_size=500)
+
+    def apply_manual_statuses(self, session_id: int) -> None:
+        changed = 0
+        for run_id, result in self.results.items():
+            if result["session_id"] != session_id:
+                continue
+            runs = Run.objects.filter(pk=run_id)
+            if result["status"] in (Run.Status.DSQ, Run.Status.VOID):
+                changed += runs.update(status=result["status"], version=F("version") + 1)
+            elif result["status"] == Run.Status.DNF:
+                changed += runs.filter(
+                    status__in=[Run.Status.QUEUED, Run.Status.RUNNING]
+                ).update(status=Run.Status.DNF, version=F("version") + 1)
+        if changed:
+            # Bulk updates skip the signals; rank the session again like a
+            # correction by race control does.
+            schedule_regeneration(session_id)
+
+
+class ReplayReport:
+    """Counters and timings of one replay."""
+
+    def __init__(self, speed: float | None) -> None:
+        self.speed = speed
+        self.messages = 0
+        self.heartbeats = 0
+        self.accepted = 0
+        self.suppressed = 0
+        self.skipped = 0
+        self.rejected: dict[str, int] = {}
+        self.latencies_ms: list[float] = []
+        self.wall_seconds = 0.0
+        self.settle_seconds = 0.0
+        self.diffs: list[str] = []
+
+    @property
+    def throughput(self) -> float:
+        return self.messages / self.wall_seconds if self.wall_seconds else 0.0
+
+    def latency_ms(self, quantile: float) -> float:
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(int(len(ordered) * quantile), len(ordered) - 1)]
+
+
+def _reset_process_state() -> None:
+    registry.invalidate()
+    start_queues.invalidate()
+    live_sessions.invalidate()
+    debounce.reset()
+    clocks.reset()
+    shards.shards.invalidate()
+
+
+@contextmanager
+def fresh_database(directory: Path):
+    """Point the default and kiosk databases at new files in ``directory``."""
+    directory.mkdir(parents=True, exist_ok=True)
+    db_path, kiosk_path = directory / "replay.sqlite3", directory / "replay_kiosk.sqlite3"
+    for path in (db_path, kiosk_path):
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{path}{suffix}").unlink(missing_ok=True)
+    databases = {
+        # Ingest and the background worker write concurrently at full speed:
+        # take the write lock when a transaction begins instead of failing
+        # to upgrade a read lock later.
+        "default": {
+            "NAME": str(db_path),
+            "OPTIONS": {
+                "init_command": "PRAGMA journal_mode=WAL",
+                "transaction_mode": "IMMEDIATE",
+            },
+        },
+        "kiosk": {"NAME": str(kiosk_path)},
+        "kiosk_ro": {"NAME": f"file:{kiosk_path}?mode=ro"},
+    }
+    worker.join()
+    previous_databases = {}
+    previous_settings = {
+        "RALLYCONTROL_EVENT_SHARDS": getattr(settings, "RALLYCONTROL_EVENT_SHARDS", False),
+        "RALLYCONTROL_RECORD_GATE_MESSAGES": getattr(
+            settings, "RALLYCONTROL_RECORD_GATE_MESSAGES", False
+        ),
+    }
+    for alias, overrides in databases.items():
+        if alias not in connections.settings:
+            continue
+        connections[alias].close()
+        config = connections.settings[alias]
+        previous_databases[alias] = {key: config.get(key) for key in overrides}
+        config.update(overrides)
+    for name in previous_settings:
+        setattr(settings, name, False)
+    try:
+        call_command("migrate", verbosity=0)
+        call_command("migrate", "core", database=KIOSK_DB, verbosity=0)
+        _reset_process_state()
+        yield db_path
+        worker.join()
+    finally:
+        for alias, previous in previous_databases.items():
+            connections[alias].close()
+            connections.settings[alias].update(previous)
+        for name, value in previous_settings.items():
+            setattr(settings, name, value)
+        _reset_process_state()
+
+
+class Replayer:
+    """Drives recorded messages through ingest, switching sessions as recorded."""
+
+    def __init__(self, snapshot: EventSnapshot, speed: float | None) -> None:
+        self.snapshot = snapshot
+        self.report = ReplayReport(speed)
+        self._stage_of = snapshot.stage_of
+        self._running: dict[int, int] = {}
+
+    def run(self, messages: list[dict[str, Any]]) -> ReplayReport:
+        report = self.report
+        if not messages:
+            return report
+        first_at = messages[0]["at_ms"]
+        started = time.perf_counter()
+        for message in messages:
+            report.messages += 1
+            kind = message.get("kind")
+            session_id = message.get("session")
+            if kind == "passage" and session_id in self._stage_of:
+                self._activate(session_id)
+            elif kind != "heartbeat":
+                report.skipped += 1
+                continue
+            if report.speed is not None:
+                due = (message["at_ms"] - first_at) / 1000 / report.speed
+                delay = due - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            if kind == "heartbeat":
+                self._heartbeat(message)
+            else:
+                self._ingest(message)
+        report.wall_seconds = time.perf_counter() - started
+
+        settle_started = time.perf_counter()
+        for session_id in list(self._running.values()):
+            self._finish(session_id)
+        worker.join()
+        report.settle_seconds = time.perf_counter() - settle_started
+        return report
+
+    def _ingest(self, message: dict[str, Any]) -> None:
+        report = self.report
+        payload = message.get("payload") or {}
+        begin = time.perf_counter()
+        try:
+            entry = ingest.authenticate_gate(message["gate"])
+            passage = ingest.record_passage(
+                entry, payload, raw_payload=json.dumps(payload, separators=(",", ":"))
+            )
+        except ingest.IngestError as exc:
+            name = type(exc).__name__
+            report.rejected[name] = report.rejected.get(name, 0) + 1
+        else:
+            if passage is None or not passage.is_valid:
+                report.suppressed += 1
+            else:
+                report.accepted += 1
+        report.latencies_ms.append((time.perf_counter() - begin) * 1000)
+
+    def _heartbeat(self, message: dict[str, Any]) -> None:
+        try:
+            entry = ingest.authenticate_gate(message["gate"])
+            ingest.record_heartbeat(entry, message.get("payload") or {}, message["at_ms"])
+        except ingest.IngestError:
+            self.report.skipped += 1
+        else:
+            self.report.heartbeats += 1
+
+    def _activate(self, session_id: int) -> None:
+        stage_id = self._stage_of[session_id]
+        current = self._running.get(stage_id)
+        if current == session_id:
+            return
+        if current is not None:
+            self._finish(current)
+        self._set_status(session_id, Session.Status.RUNNING)
+        self._running[stage_id] = session_id
+
+    def _finish(self, session_id: int) -> None:
+        self.snapshot.apply_manual_statuses(session_id)
+        self._set_status(session_id, Session.Status.FINISHED)
+        self._running.pop(self._stage_of[session_id], None)
+
+    @staticmethod
+    def _set_status(session_id: int, status: str) -> None:
+        # Saved through the model so the usual signals (gate registry,
+        # board finalisation, kiosk) fire exactly as during the event.
+        session = Session.objects.get(pk=session_id)
+        session.status = status
+        session.save()
+
+
+def replay(
+    messages: list[dict[str, Any]],
+    event_id: int,
+    directory: Path,
+    speed: float | None = None,
+) -> ReplayReport:
+    """Replay ``messages`` of ``event_id`` into a fresh database in ``directory``."""
+    snapshot = EventSnapshot(event_id)
+    with fresh_database(directory):
+        snapshot.restore()
+        report = Replayer(snapshot, speed).run(messages)
+        replayed = final_results(session.pk for session in snapshot.sessions)
+    report.diffs = diff_results(snapshot.results, replayed)
+    return report
@@ -0,0 +1,381 @@
+"""
+Replication of timing data from stage nodes to a central node.
+
+A stage node (``RALLYCONTROL_CENTRAL_URL`` set) ingests its own gates and
+appends every change of a ``Passage``, ``Capture`` or ``Run`` to the
+``ChangeLogEntry`` table within the same transaction. The primary key of
+that table is the node's sequence number. ``push_pending`` ships unacked
+entries in order to the central node, which applies them idempotently
+(``apply_batch``) and acknowledges the last applied sequence number.
+
+Master data (events, stages, sessions, drivers, vehicles, classes, gates)
+is maintained on the central node and loaded onto stage nodes with
+``dumpdata``/``loaddata``, so those primary keys are identical everywhere.
+Rows created on a stage node are mapped to central rows via
+``ReplicatedObject``.
+
+Conflict rules for runs work per field. Every manual change carries the
+fields it actually changed (``ChangeLogEntry.manual_fields``); the central
+node stamps each manually changed field of a run with a per-run counter in
+the order the changes are applied there, never with a wall clock of either
+machine. Automatic changes and the untouched fields of a manual change
+never overwrite a manually corrected field, and between two manual changes
+of the same field the one applied last wins.
+"""
+
+from __future__ import annotations
+
+import hmac
+import json
+import threading
+import urllib.request
+from contextlib import contextmanager
+from typing import Iterable
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+
+from . import career, shards
+from .leaderboards import schedule_regeneration
+from .models import Capture, ChangeLogEntry, Passage, ReplicatedObject, ReplicationCursor, Run
+
+REPLICATED_MODELS = {
+    "passage": Passage,
+    "capture": Capture,
+    "run": Run,
+}
+
+# Foreign keys that point at rows created on the stage node itself.
+REMOTE_REFERENCES = {
+    "passage": {"run_id": "run"},
+    "capture": {"passage_id": "passage"},
+}
+
+# Run fields that race control corrects by hand.
+MANUAL_RUN_FIELDS = (
+    "status",
+    "penalty_ms",
+    "final_time_ms",
+    "start_number_used",
+    "start_number_source",
+    "comment",
+)
+
+OUTBOUND_CURSOR = "central"
+
+_state = threading.local()
+
+
+class ReplicationError(Exception):
+    """Raised when a batch cannot be pushed or applied."""
+
+
+def node_id() -> str:
+    return getattr(settings, "RALLYCONTROL_NODE_ID", "central")
+
+
+def central_url() -> str:
+    return getattr(settings, "RALLYCONTROL_CENTRAL_URL", "")
+
+
+def is_stage_node() -> bool:
+    return bool(central_url())
+
+
+def check_token(token: str | None) -> bool:
+    expected = getattr(settings, "RALLYCONTROL_REPLICATION_TOKEN", "")
+    return bool(expected) and hmac.compare_digest(expected, token or "")
+
+
+@contextmanager
+def manual_changes():
+    """Mark all changes made inside the block as manual corrections."""
+    previous = getattr(_state, "manual", False)
+    _state.manual = True
+    try:
+        yield
+    finally:
+        _state.manual = previous
+
+
+def is_manual_change() -> bool:
+    return getattr(_state, "manual", False)
+
+
+def model_key(instance) -> str | None:
+    for key, model in REPLICATED_MODELS.items():
+        if isinstance(instance, model):
+            return key
+    return None
+
+
+def serialize(instance) -> dict:
+    payload = {}
+    for field in instance._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        payload[field.attname] = field.value_from_object(instance)
+    return json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+
+
+def deserialize(model, payload: dict) -> dict:
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.attname not in payload:
+            continue
+        raw = payload[field.attname]
+        values[field.attname] = None if raw is None else field.to_python(raw)
+    return values
+
+
+# ---------------------------------------------------------------------------
+# Stage node: change log
+# ---------------------------------------------------------------------------
+
+
+def _manual_run_fields(fields: Iterable[str]) -> list[str]:
+    fields = set(fields)
+    return [field for field in MANUAL_RUN_FIELDS if field in fields]
+
+
+def record_change(
+    instance,
+    operation: str = ChangeLogEntry.Operation.UPSERT,
+    changed_fields: Iterable[str] = (),
+) -> None:
+    """Append a change of ``instance`` to the outbound change log.
+
+    ``changed_fields`` are the fields the change touched; for manual run
+    changes they decide which fields count as corrected on the central node.
+    """
+    key = model_key(instance)
+    if key is None or not is_stage_node():
+        return
+    manual = is_manual_change()
+    ChangeLogEntry.objects.create(
+        model=key,
+        object_id=instance.pk,
+        operation=operation,
+        payload=serialize(instance) if operation == ChangeLogEntry.Operation.UPSERT else {},
+        is_manual=manual,
+        manual_fields=_manual_run_fields(changed_fields) if manual and key == "run" else [],
+    )
+
+
+def record_bulk_changes(model, pks: Iterable[int], changed_fields: Iterable[str] = ()) -> None:
+    """Log rows changed with ``QuerySet.update()`` (which sends no signals)."""
+    if not is_stage_node():
+        return
+    key = next(k for k, m in REPLICATED_MODELS.items() if m is model)
+    manual = is_manual_change()
+    manual_fields = _manual_run_fields(changed_fields) if manual and key == "run" else []
+    ChangeLogEntry.objects.bulk_create(
+        ChangeLogEntry(
+            model=key,
+            object_id=obj.pk,
+            payload=serialize(obj),
+            is_manual=manual,
+            manual_fields=manual_fields,
+        )
+        for obj in model.objects.filter(pk__in=list(pks))
+    )
+
+
+def pending_entries(limit: int) -> list[ChangeLogEntry]:
+    cursor, _ = ReplicationCursor.objects.get_or_create(node_id=OUTBOUND_CURSOR)
+    return list(ChangeLogEntry.objects.filter(pk__gt=cursor.last_seq).order_by("pk")[:limit])
+
+
+def outbound_batch(entries: list[ChangeLogEntry]) -> dict:
+    """Body of a push request (input of ``apply_batch`` on the central node)."""
+    return {
+        "node_id": node_id(),
+        "entries": [
+            {
+                "seq": entry.pk,
+                "model": entry.model,
+                "object_id": entry.object_id,
+                "operation": entry.operation,
+                "payload": entry.payload,
+                "is_manual": entry.is_manual,
+                "manual_fields": entry.manual_fields,
+                "changed_at_ms": int(entry.created_at.timestamp() * 1000),
+            }
+            for entry in entries
+        ],
+    }
+
+
+def push_pending(batch_size: int = 500, timeout: float = 10.0) -> int:
+    """Push one batch of unacked entries to the central node.
+
+    Returns the number of acknowledged entries.
+    """
+    entries = pending_entries(batch_size)
+    if not entries:
+        return 0
+    body = json.dumps(outbound_batch(entries)).encode("utf-8")
+    request = urllib.request.Request(
+        central_url().rstrip("/") + "/api/replication/push/",
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            "X-RallyControl-Token": getattr(settings, "RALLYCONTROL_REPLICATION_TOKEN", ""),
+        },
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            acked_seq = int(json.load(response)["acked_seq"])
+    except (OSError, ValueError, KeyError) as exc:
+        raise ReplicationError(f"Push to central node failed: {exc}") from exc
+    ReplicationCursor.objects.filter(node_id=OUTBOUND_CURSOR).update(last_seq=acked_seq)
+    return sum(1 for entry in entries if entry.pk <= acked_seq)
+
+
+# ---------------------------------------------------------------------------
+# Central node: applying batches
+# ---------------------------------------------------------------------------
+
+
+def _stamp_manual_fields(mapping: ReplicatedObject, fields: Iterable[str]) -> None:
+    """Mark ``fields`` of a run as manually changed, after all earlier changes."""
+    fields = _manual_run_fields(fields)
+    if not fields:
+        return
+    stamp = max(mapping.manual_fields.values(), default=0) + 1
+    mapping.manual_fields.update({field: stamp for field in fields})
+    mapping.save(update_fields=["manual_fields"])
+
+
+def note_local_manual_change(
+    run_ids: Iterable[int], fields: Iterable[str] = MANUAL_RUN_FIELDS
+) -> None:
+    """Remember manual corrections of replicated runs made on this node."""
+    fields = list(fields)
+    for mapping in ReplicatedObject.objects.filter(model="run", local_id__in=list(run_ids)):
+        _stamp_manual_fields(mapping, fields)
+
+
+def _resolve_references(node: str, key: str, values: dict) -> dict:
+    for attname, target in REMOTE_REFERENCES.get(key, {}).items():
+        remote_id = values.get(attname)
+        if remote_id is None:
+            continue
+        values[attname] = (
+            ReplicatedObject.objects.filter(node_id=node, model=target, remote_id=remote_id)
+            .values_list("local_id", flat=True)
+            .first()
+        )
+    return values
+
+
+def _entry_manual_fields(entry: dict) -> list[str]:
+    """Run fields a replicated entry changed by hand."""
+    if not entry.get("is_manual"):
+        return []
+    if "manual_fields" not in entry:
+        # Nodes that predate per-field tracking: the whole row was manual.
+        return list(MANUAL_RUN_FIELDS)
+    return _manual_run_fields(entry["manual_fields"])
+
+
+def _apply_run_conflict_rules(mapping: ReplicatedObject, values: dict, entry: dict) -> dict:
+    changed = _entry_manual_fields(entry)
+    for field in MANUAL_RUN_FIELDS:
+        if field in mapping.manual_fields and field not in changed:
+            values.pop(field, None)
+    _stamp_manual_fields(mapping, changed)
+    return values
+
+
+def _apply_entry(node: str, entry: dict) -> int | None:
+    """Apply a single entry; return the affected session id if any."""
+    key = entry["model"]
+    model = REPLICATED_MODELS.get(key)
+    if model is None:
+        raise ReplicationError(f"Unknown model {key!r}.")
+    mapping = ReplicatedObject.objects.filter(
+        node_id=node, model=key, remote_id=entry["object_id"]
+    ).first()
+
+    if entry["operation"] == ChangeLogEntry.Operation.DELETE:
+        if mapping is not None:
+            session_id = _session_of(model, mapping.local_id)
+            model.objects.filter(pk=mapping.local_id).delete()
+            mapping.delete()
+            return session_id
+        return None
+
+    values = _resolve_references(node, key, deserialize(model, entry["payload"]))
+    if key == "capture" and values.get("passage_id") is None:
+        return None
+    manual_fields = {}
+    if key == "run" and mapping is not None:
+        values = _apply_run_conflict_rules(mapping, values, entry)
+    elif key == "run":
+        manual_fields = dict.fromkeys(_entry_manual_fields(entry), 1)
+
+    bump = {}
+    if key == "run":
+        # Versions are local to each node.
+        values.pop("version", None)
+        bump = {"version": F("version") + 1}
+    if mapping is not None and model.objects.filter(pk=mapping.local_id).update(
+        **values, **bump
+    ):
+        if key == "run":
+            Run.objects.filter(pk=mapping.local_id, total_time_ms__isnull=False).update(
+                final_time_ms=F("total_time_ms") + F("penalty_ms")
+            )
+        return _session_of(model, mapping.local_id)
+
+    obj = model(**values)
+    obj.save()
+    if mapping is None:
+        ReplicatedObject.objects.create(
+            node_id=node,
+            model=key,
+            remote_id=entry["object_id"],
+            local_id=obj.pk,
+            manual_fields=manual_fields,
+        )
+    else:
+        mapping.local_id = obj.pk
+        mapping.save(update_fields=["local_id"])
+    return _session_of(model, obj.pk)
+
+
+def _session_of(model, pk: int) -> int | None:
+    if model is Capture:
+        return Passage.objects.filter(captures__pk=pk).values_list("session_id", flat=True).first()
+    return model.objects.filter(pk=pk).values_list("session_id", flat=True).first()
+
+
+def apply_batch(node: str, entries: list[dict]) -> int:
+    """Apply entries of ``node`` in sequence order; return the acked sequence."""
+    with transaction.atomic():
+        cursor, _ = ReplicationCursor.objects.select_for_update().get_or_create(node_id=node)
+        last_seq = cursor.last_seq
+        sessions: set[int] = set()
+        drivers: set[int] = set()
+        for entry in sorted(entries, key=lambda item: item["seq"]):
+            if entry["seq"] <= last_seq:
+                continue
+            if entry["model"] == "run" and (entry.get("payload") or {}).get("driver_id"):
+                drivers.add(entry["payload"]["driver_id"])
+            session_hint = (entry.get("payload") or {}).get("session_id")
+            with shards.using_session(session_hint), shards.atomic():
+                session_id = _apply_entry(node, entry)
+            if session_id is not None:
+                sessions.add(session_id)
+            last_seq = entry["seq"]
+        cursor.last_seq = last_seq
+        cursor.save(update_fields=["last_seq", "updated_at"])
+        for session_id in sessions:
+            schedule_regeneration(session_id)
+        career.schedule_rebuild(drivers)
+    return last_seq
+
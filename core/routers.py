@@ -0,0 +1,89 @@
+"""Database routers for RallyControl."""
+
+from django.apps import apps
+from django.conf import settings
+
+KIOSK_DB = "kiosk"
+KIOSK_READ_DB = "kiosk_ro"
+
+
+def is_kiosk_model(model) -> bool:
+    return getattr(model, "kiosk_snapshot", False)
+
+
+class KioskSnapshotRouter:
+    """Route kiosk snapshot models to the separate snapshot database.
+
+    Reads go through the read-only alias ``kiosk_ro`` (if configured) so
+    spectator views can never write or lock the snapshot; the publisher
+    writes through ``kiosk``. Nothing else is ever migrated to either alias.
+    """
+
+    def db_for_read(self, model, **hints):
+        if is_kiosk_model(model):
+            return KIOSK_READ_DB if KIOSK_READ_DB in settings.DATABASES else KIOSK_DB
+        return None
+
+    def db_for_write(self, model, **hints):
+        if is_kiosk_model(model):
+            return KIOSK_DB
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_kiosk_model(type(obj1)) or is_kiosk_model(type(obj2)):
+            return is_kiosk_model(type(obj1)) and is_kiosk_model(type(obj2))
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == KIOSK_READ_DB:
+            return False
+        is_kiosk = False
+        if model_name is not None:
+            try:
+                is_kiosk = is_kiosk_model(apps.get_model(app_label, model_name))
+            except LookupError:
+                is_kiosk = False
+        if db == KIOSK_DB:
+            return is_kiosk
+        if is_kiosk:
+            return False
+        return None
+
+
+
+class EventShardRouter:
+    """Route timing data to the SQLite shard of its event (see ``core.shards``).
+
+    The shard is taken from the instance's database or session when the
+    hints carry an instance, otherwise from the current query context.
+    Master data is never routed here and stays in ``default``.
+    """
+
+    def _db(self, model, hints):
+        from . import shards
+
+        if not shards.enabled() or not shards.is_sharded_model(model):
+            return None
+        instance = hints.get("instance")
+        if instance is not None:
+            if instance._state.db:
+                return instance._state.db
+            session_id = getattr(instance, "session_id", None)
+            if session_id is not None:
+                return shards.alias_for_session(session_id)
+        return shards.current_alias()
+
+    def db_for_read(self, model, **hints):
+        return self._db(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        from .shards import is_shard_alias
+
+        dbs = {obj1._state.db, obj2._state.db}
+        if any(is_shard_alias(db) for db in dbs):
+            # Master rows are mirrored into every shard with identical keys.
+            return True
+        return None
@@ -0,0 +1,251 @@
+"""
+In-memory typeahead index over drivers and vehicles.
+
+Operators at the start line look up drivers by name, team, start number
+or transponder on a tablet, one request per keystroke. ``LIKE '%x%'``
+scans over ``Driver`` and ``Vehicle`` are too slow for that, so every
+process keeps a small index of both tables:
+
+* a prefix map from every prefix of every normalised token (case folded,
+  accents removed) to the documents containing it, and
+* a trigram map used for queries that match inside a token
+  (``"ller"`` -> Müller).
+
+A query is split into terms; a document matches if every term matches one
+of its tokens. Lookups are dictionary hits and set intersections, so a
+query costs well below a millisecond for a few thousand entries.
+
+Saves and deletes of drivers, vehicles and classes mark the index stale
+(see ``core.signals``), queue a rebuild on the background worker and bump
+``ConfigVersion.SEARCH_INDEX`` for the other processes, which look at it
+every ``RALLYCONTROL_SEARCH_INDEX_CHECK_SECONDS``. A stale index keeps
+answering until the rebuild is done; only the very first query of a
+process builds it synchronously.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+import unicodedata
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import transaction
+
+from .background import worker
+from .models import ConfigVersion, Driver, Vehicle
+
+DRIVER = "driver"
+VEHICLE = "vehicle"
+KINDS = (DRIVER, VEHICLE)
+
+MAX_PREFIX = 20
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def normalize(text) -> str:
+    """Case folded text without accents (``"Müller"`` -> ``"muller"``)."""
+    if text is None:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(text).casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(*values) -> set[str]:
+    tokens: set[str] = set()
+    for value in values:
+        tokens.update(TOKEN_RE.findall(normalize(value)))
+    return tokens
+
+
+def trigrams(token: str) -> set[str]:
+    return {token[index : index + 3] for index in range(len(token) - 2)}
+
+
+class SearchEntry(NamedTuple):
+    """One typeahead result."""
+
+    kind: str
+    pk: int
+    label: str
+    detail: str
+    start_number: int | None
+    driver_id: int
+    is_active: bool
+
+    def as_dict(self) -> dict:
+        return {
+            "type": self.kind,
+            "id": self.pk,
+            "label": self.label,
+            "detail": self.detail,
+            "start_number": self.start_number,
+            "driver_id": self.driver_id,
+            "is_active": self.is_active,
+        }
+
+
+class _Index:
+    """Immutable index structures; replaced as a whole on rebuild."""
+
+    __slots__ = ("entries", "tokens", "prefixes", "trigram_map")
+
+    def __init__(self) -> None:
+        self.entries: list[SearchEntry] = []
+        self.tokens: list[frozenset[str]] = []
+        self.prefixes: dict[str, set[int]] = {}
+        self.trigram_map: dict[str, set[int]] = {}
+
+    def add(self, entry: SearchEntry, tokens: set[str]) -> None:
+        doc = len(self.entries)
+        self.entries.append(entry)
+        self.tokens.append(frozenset(tokens))
+        for token in tokens:
+            for length in range(1, min(len(token), MAX_PREFIX) + 1):
+                self.prefixes.setdefault(token[:length], set()).add(doc)
+            for trigram in trigrams(token):
+                self.trigram_map.setdefault(trigram, set()).add(doc)
+
+    def match_term(self, term: str) -> set[int]:
+        docs = set(self.prefixes.get(term[:MAX_PREFIX], ()))
+        if len(term) > MAX_PREFIX:
+            docs = {doc for doc in docs if any(t.startswith(term) for t in self.tokens[doc])}
+        if len(term) >= 3:
+            grams = sorted(trigrams(term), key=lambda gram: len(self.trigram_map.get(gram, ())))
+            candidates = set(self.trigram_map.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not candidates:
+                    break
+                candidates &= self.trigram_map.get(gram, set())
+            docs |= {
+                doc
+                for doc in candidates - docs
+                if any(term in token for token in self.tokens[doc])
+            }
+        return docs
+
+
+class SearchIndex:
+    """Process-local typeahead index with cross-process versioning."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._index: _Index | None = None
+        self._version = -1
+        self._stale = True
+        self._checked_at = 0.0
+
+    def search(self, query: str, kinds=KINDS, limit: int = 10) -> list[SearchEntry]:
+        terms = sorted(tokenize(query), key=len, reverse=True)
+        if not terms:
+            return []
+        index = self._current()
+        docs: set[int] | None = None
+        for term in terms:
+            matched = index.match_term(term)
+            docs = matched if docs is None else docs & matched
+            if not docs:
+                return []
+        ranked = []
+        for doc in docs:
+            entry = index.entries[doc]
+            if entry.kind not in kinds:
+                continue
+            ranked.append((self._rank(entry, index.tokens[doc], terms), entry.label, doc))
+        ranked.sort()
+        return [index.entries[doc] for _rank, _label, doc in ranked[:limit]]
+
+    @staticmethod
+    def _rank(entry: SearchEntry, tokens: frozenset[str], terms: list[str]) -> tuple:
+        number_hit = entry.start_number is not None and str(entry.start_number) in terms
+        exact = sum(term in tokens for term in terms)
+        prefix = sum(any(token.startswith(term) for token in tokens) for term in terms)
+        return (
+            not number_hit,
+            -exact,
+            -prefix,
+            not entry.is_active,
+            entry.kind != DRIVER,
+        )
+
+    def invalidate(self) -> None:
+        """Mark the index stale; it is rebuilt in the background."""
+        self._stale = True
+
+    def rebuild(self) -> None:
+        with self._lock:
+            version = ConfigVersion.current(ConfigVersion.SEARCH_INDEX)
+            self._stale = False
+            index = _build_index()
+            self._index = index
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def _current(self) -> _Index:
+        if self._index is None:
+            self.rebuild()
+            return self._index
+        if not self._stale:
+            interval = getattr(settings, "RALLYCONTROL_SEARCH_INDEX_CHECK_SECONDS", 1.0)
+            now = time.monotonic()
+            if now - self._checked_at >= interval:
+                self._checked_at = now
+                if ConfigVersion.current(ConfigVersion.SEARCH_INDEX) != self._version:
+                    self._stale = True
+        if self._stale:
+            worker.submit(self.rebuild, key=("search_index_rebuild",))
+        return self._index
+
+
+def _build_index() -> _Index:
+    index = _Index()
+    drivers = {}
+    for row in Driver.objects.values_list(
+        "pk",
+        "first_name",
+        "last_name",
+        "display_name",
+        "team",
+        "default_start_number",
+        "transponder_id",
+        "is_active",
+        "race_class__name",
+    ).order_by("last_name", "first_name", "pk"):
+        pk, first, last, display, team, number, transponder, active, class_name = row
+        label = display or f"{first} {last}"
+        drivers[pk] = (label, first, last, display)
+        detail = " · ".join(part for part in (team, class_name) if part)
+        index.add(
+            SearchEntry(DRIVER, pk, label, detail, number, pk, active),
+            tokenize(first, last, display, team, number, transponder, class_name),
+        )
+    for row in Vehicle.objects.values_list(
+        "pk",
+        "name",
+        "driver_id",
+        "default_start_number",
+        "is_active",
+        "race_class__name",
+    ).order_by("name", "pk"):
+        pk, name, driver_id, number, active, class_name = row
+        driver_label, first, last, display = drivers.get(driver_id, ("", "", "", ""))
+        detail = " · ".join(part for part in (driver_label, class_name) if part)
+        index.add(
+            SearchEntry(VEHICLE, pk, name, detail, number, driver_id, active),
+            tokenize(name, number, first, last, display, class_name),
+        )
+    return index
+
+
+search_index = SearchIndex()
+
+
+def search_index_changed() -> None:
+    def bump() -> None:
+        ConfigVersion.bump(ConfigVersion.SEARCH_INDEX)
+        worker.submit(search_index.rebuild, key=("search_index_rebuild",))
+
+    search_index.invalidate()
+    transaction.on_commit(bump)
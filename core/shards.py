@@ -0,0 +1,423 @@
+"""
+Per-event SQLite shards for timing data.
+
+With ``RALLYCONTROL_EVENT_SHARDS`` enabled, every new ``Event`` keeps its
+runs, passages, captures, OCR results, leaderboards and corrections in its
+own SQLite file (``RALLYCONTROL_SHARD_DIR/event_<id>.sqlite3``). Live
+queries then only touch a small file, and a finished event is backed up
+with a single file copy (``manage.py backup_event_shard``).
+
+Master data (users, classes, drivers, vehicles, events, stages, gates and
+sessions) is maintained in the shared ``default`` database. Each shard
+holds a read-only mirror of these rows with identical primary keys, so
+foreign keys and joins inside a shard keep working. Users are mirrored
+with their username only: a shard file is the unit that is backed up and
+handed over, so it carries no password hashes or contact data.
+
+A change of a mirrored model bumps a version per model
+(``master_data:<model>``); saves that touch no mirrored field (such as
+``User.last_login``) are ignored. New rows are mirrored before the shard
+is used next, as timing data may reference them right away; updates and
+deletions are re-synced by the background worker, model by model. Sessions
+stay in the shared database so their ids remain globally unique for the
+gate registry, the kiosk snapshot and replication.
+
+``EventShardRouter`` picks the shard of a query from the instance (its
+database or its session), from an explicit ``using_event()`` /
+``using_session()`` / ``using_db()`` block, or falls back to the live
+event (the event of the newest running session). Events created before sharding was enabled
+stay in ``default``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Max, Q
+
+from .models import (
+    Capture,
+    CaptureUpload,
+    ConfigVersion,
+    Driver,
+    Event,
+    Gate,
+    Leaderboard,
+    OCRResult,
+    Passage,
+    RaceClass,
+    Run,
+    RunCorrection,
+    Session,
+    Stage,
+    User,
+    Vehicle,
+)
+
+SHARD_PREFIX = "event_"
+
+SHARDED_MODELS = (
+    Run,
+    Passage,
+    Capture,
+    CaptureUpload,
+    OCRResult,
+    Leaderboard,
+    RunCorrection,
+)
+
+# Mirrored into every shard, parents before children.
+MASTER_MODELS = (User, RaceClass, Driver, Vehicle, Event, Stage, Gate, Session)
+# Models mirrored with some fields only; the others keep their defaults.
+MIRRORED_FIELDS = {User: ("username",)}
+
+_context = threading.local()
+
+
+def enabled() -> bool:
+    return getattr(settings, "RALLYCONTROL_EVENT_SHARDS", False)
+
+
+def shard_dir() -> Path:
+    return Path(getattr(settings, "RALLYCONTROL_SHARD_DIR", settings.BASE_DIR / "shards"))
+
+
+def shard_path(event_id: int) -> Path:
+    return shard_dir() / f"{SHARD_PREFIX}{event_id}.sqlite3"
+
+
+def is_shard_alias(alias: str | None) -> bool:
+    return bool(alias) and alias.startswith(SHARD_PREFIX)
+
+
+def is_sharded_model(model) -> bool:
+    return model in SHARDED_MODELS
+
+
+def mirrored_fields(model) -> tuple[str, ...]:
+    """Attribute names of the fields of ``model`` copied into the shards."""
+    if model in MIRRORED_FIELDS:
+        return MIRRORED_FIELDS[model]
+    return tuple(field.attname for field in model._meta.concrete_fields if not field.primary_key)
+
+
+def master_key(model) -> str:
+    """``ConfigVersion`` key of a mirrored model."""
+    return f"{ConfigVersion.MASTER_DATA}:{model._meta.model_name}"
+
+
+MASTER_KEYS = {master_key(model): model for model in MASTER_MODELS}
+
+
+class ShardManager:
+    """Attaches event shards to this process and keeps their mirrors fresh."""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._attached: dict[int, str] = {}
+        self._synced: set[str] = set()
+        # Mirrored models per alias to re-sync before the next use / in the background.
+        self._urgent: dict[str, set] = {}
+        self._stale: dict[str, set] = {}
+        self._max_pks: dict[type, int] = {}
+        self._sharded_events: dict[int, bool] = {}
+        self._session_events: dict[int, int] = {}
+        self._live_event_id: int | None = None
+        self._live_loaded = False
+        self._versions: dict[str, int] = {}
+        self._checked_at = 0.0
+
+    # -- lookups -------------------------------------------------------------
+
+    def alias_for_event(self, event_id: int | None) -> str:
+        if event_id is None or not enabled():
+            return DEFAULT_DB_ALIAS
+        self._refresh_if_needed()
+        sharded = self._sharded_events.get(event_id)
+        if sharded is None:
+            sharded = bool(
+                Event.objects.using(DEFAULT_DB_ALIAS)
+                .filter(pk=event_id, is_sharded=True)
+                .exists()
+            )
+            self._sharded_events[event_id] = sharded
+        if not sharded:
+            return DEFAULT_DB_ALIAS
+        return self.attach(event_id)
+
+    def event_for_session(self, session_id: int | None) -> int | None:
+        if session_id is None:
+            return None
+        event_id = self._session_events.get(session_id)
+        if event_id is None:
+            event_id = (
+                Session.objects.using(DEFAULT_DB_ALIAS)
+                .filter(pk=session_id)
+                .values_list("stage__event_id", flat=True)
+                .first()
+            )
+            if event_id is not None:
+                self._session_events[session_id] = event_id
+        return event_id
+
+    def alias_for_session(self, session_id: int | None) -> str:
+        if not enabled():
+            return DEFAULT_DB_ALIAS
+        return self.alias_for_event(self.event_for_session(session_id))
+
+    def live_event_id(self) -> int | None:
+        """Event of the newest running session, else the latest event."""
+        self._refresh_if_needed()
+        if not self._live_loaded:
+            sessions = Session.objects.using(DEFAULT_DB_ALIAS).filter(
+                status=Session.Status.RUNNING
+            )
+            event_id = (
+                sessions.order_by("-start_time", "-pk")
+                .values_list("stage__event_id", flat=True)
+                .first()
+            )
+            if event_id is None:
+                event_id = (
+                    Event.objects.using(DEFAULT_DB_ALIAS)
+                    .order_by("-start_date", "-pk")
+                    .values_list("pk", flat=True)
+                    .first()
+                )
+            self._live_event_id = event_id
+            self._live_loaded = True
+        return self._live_event_id
+
+    def attached_aliases(self) -> list[str]:
+        return list(self._attached.values())
+
+    # -- attaching and mirroring ---------------------------------------------
+
+    def attach(self, event_id: int) -> str:
+        """Register the shard of ``event_id`` as a connection (and migrate it)."""
+        alias = self._attached.get(event_id)
+        if alias is not None and alias in self._synced and not self._urgent.get(alias):
+            return alias
+        with self._lock:
+            alias = f"{SHARD_PREFIX}{event_id}"
+            if alias not in connections.settings:
+                path = shard_path(event_id)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                config = dict(connections.settings[DEFAULT_DB_ALIAS])
+                # Same locking as the shared database (IMMEDIATE, busy timeout).
+                options = dict(config.get("OPTIONS", {}))
+                options["init_command"] = "PRAGMA journal_mode=WAL"
+                config.update(
+                    NAME=str(path),
+                    OPTIONS=options,
+                    TEST=dict(config.get("TEST", {}), NAME=None, MIRROR=None),
+                )
+                connections.settings[alias] = config
+                self._migrate(alias)
+            self._attached[event_id] = alias
+            if alias not in self._synced:
+                self.sync(alias, event_id)
+            elif self._urgent.get(alias):
+                self.sync(alias, event_id, set(self._urgent[alias]))
+            return alias
+
+    def _migrate(self, alias: str) -> None:
+        executor = MigrationExecutor(connections[alias])
+        if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+            call_command("migrate", database=alias, verbosity=0)
+
+    def sync(self, alias: str, event_id: int, models=None) -> None:
+        """Mirror the master data (or only ``models``) of the shared database into a shard."""
+        models = [model for model in MASTER_MODELS if models is None or model in models]
+        with self._lock, transaction.atomic(using=alias):
+            keep: dict[type, list[int]] = {}
+            for model in models:
+                rows = self._master_rows(model, event_id)
+                keep[model] = [row.pk for row in rows]
+                # All fields are written, so fields no longer mirrored are reset.
+                fields = [
+                    field.name
+                    for field in model._meta.concrete_fields
+                    if not field.primary_key
+                ]
+                model._default_manager.using(alias).bulk_create(
+                    rows,
+                    batch_size=500,
+                    update_conflicts=True,
+                    unique_fields=[model._meta.pk.name],
+                    update_fields=fields,
+                )
+            for model in reversed(models):
+                model._default_manager.using(alias).exclude(pk__in=keep[model]).delete()
+            self._synced.add(alias)
+            for pending in (self._urgent, self._stale):
+                pending.get(alias, set()).difference_update(models)
+
+    def _master_rows(self, model, event_id: int) -> list:
+        fields = mirrored_fields(model)
+        rows = model._default_manager.using(DEFAULT_DB_ALIAS).order_by("pk")
+        if model is Session:
+            rows = rows.filter(stage__event_id=event_id)
+        return [
+            model(pk=pk, **dict(zip(fields, values)))
+            for pk, *values in rows.values_list("pk", *fields)
+        ]
+
+    def resync_stale(self) -> None:
+        """Re-sync the models changed since the last sync (background worker)."""
+        for event_id, alias in list(self._attached.items()):
+            models = self._stale.get(alias)
+            if models and alias in self._synced:
+                self.sync(alias, event_id, set(models))
+
+    # -- invalidation --------------------------------------------------------
+
+    def invalidate(self) -> None:
+        """Forget everything: the shards are fully re-synced before the next use."""
+        with self._lock:
+            self._synced.clear()
+            self._urgent.clear()
+            self._stale.clear()
+            self._sharded_events.clear()
+            self._session_events.clear()
+            self._live_loaded = False
+
+    def mark_stale(self, models, created: bool = False) -> None:
+        """Mirrored ``models`` changed; new rows must be mirrored before the next use."""
+        with self._lock:
+            pending = self._urgent if created else self._stale
+            for alias in self._synced:
+                pending.setdefault(alias, set()).update(models)
+            if Event in models or Session in models:
+                self._sharded_events.clear()
+                self._session_events.clear()
+                self._live_loaded = False
+        if not created:
+            transaction.on_commit(self._schedule_resync)
+
+    def _schedule_resync(self) -> None:
+        from .background import worker
+
+        worker.submit(self.resync_stale, key=("shard_mirror",))
+
+    def _refresh_if_needed(self) -> None:
+        interval = getattr(settings, "RALLYCONTROL_GATE_REGISTRY_CHECK_SECONDS", 1.0)
+        now = time.monotonic()
+        if now - self._checked_at < interval:
+            return
+        self._checked_at = now
+        versions = dict(
+            ConfigVersion.objects.using(DEFAULT_DB_ALIAS)
+            .filter(Q(key__in=MASTER_KEYS) | Q(key=ConfigVersion.GATE_REGISTRY))
+            .values_list("key", "version")
+        )
+        previous, self._versions = self._versions, versions
+        if versions.get(ConfigVersion.GATE_REGISTRY) != previous.get(
+            ConfigVersion.GATE_REGISTRY
+        ):
+            self._live_loaded = False
+        for key, model in MASTER_KEYS.items():
+            if versions.get(key) != previous.get(key):
+                self._changed_elsewhere(model)
+
+    def _changed_elsewhere(self, model) -> None:
+        """Another process changed ``model``; new rows show up as a higher id."""
+        last = model._default_manager.using(DEFAULT_DB_ALIAS).aggregate(last=Max("pk"))["last"]
+        created = (last or 0) > self._max_pks.get(model, 0)
+        self._max_pks[model] = last or 0
+        self.mark_stale([model], created)
+
+
+shards = ShardManager()
+
+
+# ---------------------------------------------------------------------------
+# Query context
+# ---------------------------------------------------------------------------
+
+
+@contextmanager
+def using_db(alias: str | None):
+    """Route sharded models to database ``alias`` inside the block."""
+    previous = getattr(_context, "alias", None)
+    _context.alias = alias
+    try:
+        yield
+    finally:
+        _context.alias = previous
+
+
+def using_event(event_id: int | None):
+    """Route to the database of ``event_id`` (``None`` keeps the current one)."""
+    if not enabled() or event_id is None:
+        return using_db(explicit_alias())
+    return using_db(alias_for_event(event_id))
+
+
+def using_session(session_id: int | None):
+    """Route to the database of the event of ``session_id``."""
+    if not enabled() or session_id is None:
+        return using_db(explicit_alias())
+    return using_db(alias_for_session(session_id))
+
+
+def alias_for_event(event_id: int | None) -> str:
+    return shards.alias_for_event(event_id) if enabled() else DEFAULT_DB_ALIAS
+
+
+def alias_for_session(session_id: int | None) -> str:
+    return shards.alias_for_session(session_id)
+
+
+def explicit_alias() -> str | None:
+    """Database set by an enclosing ``using_*`` block, if any."""
+    return getattr(_context, "alias", None)
+
+
+def current_alias() -> str:
+    if not enabled():
+        return DEFAULT_DB_ALIAS
+    alias = explicit_alias()
+    if alias is None:
+        alias = shards.alias_for_event(shards.live_event_id())
+    return alias
+
+
+def atomic():
+    """``transaction.atomic`` on the database of the current event."""
+    return transaction.atomic(using=current_alias())
+
+
+def on_commit(func, using: str | None = None) -> None:
+    """Run ``func`` after the transaction of ``using`` (or the current event) commits."""
+    transaction.on_commit(func, using=using or current_alias())
+
+
+def master_data_changed(model, created: bool = False, update_fields=None) -> None:
+    """A row of a mirrored ``model`` was saved or deleted in this process."""
+    if update_fields is not None and not {
+        model._meta.get_field(name).attname for name in update_fields
+    } & set(mirrored_fields(model)):
+        return
+    shards.mark_stale([model], created)
+    key = master_key(model)
+    transaction.on_commit(lambda: ConfigVersion.bump(key))
+
+
+def sharded_events():
+    return Event.objects.using(DEFAULT_DB_ALIAS).filter(is_sharded=True)
+
+
+def all_aliases() -> list[str]:
+    """The shared database plus the shards of all sharded events."""
+    aliases = [DEFAULT_DB_ALIAS]
+    if enabled():
+        aliases += [shards.attach(pk) for pk in sharded_events().values_list("pk", flat=True)]
+    return aliases
@@ -0,0 +1,204 @@
+"""Signal receivers keeping caches, snapshots and the change log in sync."""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import career, shards
+from .gate_registry import registry
+from .kiosk_snapshot import schedule_publish
+from .leaderboards import FINAL_SESSION_STATUSES, finalize_session_boards
+from .live_state import live_sessions, live_state_changed
+from .models import (
+    Capture,
+    ChangeLogEntry,
+    ConfigVersion,
+    Driver,
+    Gate,
+    Leaderboard,
+    Passage,
+    RaceClass,
+    Run,
+    Session,
+    Stage,
+    Vehicle,
+)
+from .replication import is_manual_change, note_local_manual_change, record_change
+from .search_index import search_index_changed
+from .start_list import start_queues
+from .timing import transitions
+
+
+def _mirrored(kwargs) -> bool:
+    """Master rows written into an event shard by ``shards.sync``."""
+    return shards.is_shard_alias(kwargs.get("using"))
+
+
+def _bump_gate_registry() -> None:
+    def bump() -> None:
+        ConfigVersion.bump(ConfigVersion.GATE_REGISTRY)
+        registry.invalidate()
+
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Gate)
+@receiver(post_delete, sender=Gate)
+def gate_changed(sender, instance, **kwargs):
+    if not _mirrored(kwargs):
+        _bump_gate_registry()
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+def session_changed(sender, instance, **kwargs):
+    if not _mirrored(kwargs):
+        _bump_gate_registry()
+
+
+@receiver(post_save, sender=Session)
+def session_finished(sender, instance, created, **kwargs):
+    if not created and not _mirrored(kwargs) and instance.status in FINAL_SESSION_STATUSES:
+        finalize_session_boards(instance.pk)
+        live_sessions.invalidate(instance.pk)
+        transitions.forget(instance.pk)
+
+
+@receiver(post_delete, sender=Stage)
+def stage_deleted(sender, instance, **kwargs):
+    # Gates of a deleted stage are detached via SET_NULL without post_save.
+    if not _mirrored(kwargs):
+        _bump_gate_registry()
+
+
+def master_data_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    if shards.enabled() and not _mirrored(kwargs):
+        shards.master_data_changed(sender, created, update_fields)
+
+
+for _model in shards.MASTER_MODELS:
+    post_save.connect(master_data_changed, sender=_model)
+    post_delete.connect(master_data_changed, sender=_model)
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+@receiver(post_save, sender=Leaderboard)
+def publish_session_snapshot(sender, instance, **kwargs):
+    if sender is Session and _mirrored(kwargs):
+        return
+    session_id = instance.pk if sender is Session else instance.session_id
+    schedule_publish(session_id, using=kwargs.get("using"))
+
+
+@receiver(post_save, sender=Run)
+@receiver(post_delete, sender=Run)
+def publish_run_snapshot(sender, instance, **kwargs):
+    schedule_publish(instance.session_id, using=kwargs.get("using"))
+
+
+@receiver(post_save, sender=Passage)
+@receiver(post_save, sender=Capture)
+@receiver(post_save, sender=Run)
+def replicate_saved(sender, instance, **kwargs):
+    if sender is not Run:
+        record_change(instance)
+        return
+    changed = instance.changed_fields()
+    record_change(instance, changed_fields=changed)
+    if is_manual_change():
+        note_local_manual_change([instance.pk], changed)
+
+
+@receiver(post_delete, sender=Passage)
+@receiver(post_delete, sender=Capture)
+@receiver(post_delete, sender=Run)
+def replicate_deleted(sender, instance, **kwargs):
+    record_change(instance, ChangeLogEntry.Operation.DELETE)
+
+
+def _start_list_changed(session_id: int, using: str | None) -> None:
+    start_queues.invalidate(session_id)
+    shards.on_commit(lambda: ConfigVersion.bump(ConfigVersion.START_LISTS), using=using)
+
+
+@receiver(post_save, sender=Run)
+def run_saved_start_list(sender, instance, created, **kwargs):
+    if created or instance.status == Run.Status.QUEUED:
+        _start_list_changed(instance.session_id, kwargs.get("using"))
+
+
+@receiver(post_delete, sender=Run)
+def run_deleted_start_list(sender, instance, **kwargs):
+    _start_list_changed(instance.session_id, kwargs.get("using"))
+
+
+# Run fields the live state holds; ingest changes them by plain UPDATEs.
+LIVE_STATE_FIELDS = {
+    "status",
+    "started_at",
+    "finished_at",
+    "penalty_ms",
+    "driver_id",
+    "start_number_used",
+    "session_id",
+}
+
+
+@receiver(post_save, sender=Run)
+def run_saved_live_state(sender, instance, created, **kwargs):
+    if created:
+        # Queued runs are picked up when their start passage arrives.
+        if instance.status == Run.Status.QUEUED:
+            return
+    elif not LIVE_STATE_FIELDS.intersection(instance.changed_fields()):
+        return
+    live_state_changed(instance.session_id, kwargs.get("using"))
+
+
+@receiver(post_save, sender=Passage)
+def passage_saved_live_state(sender, instance, created, **kwargs):
+    # New passages are applied by ingest or caught up from the database.
+    if not created:
+        live_state_changed(instance.session_id, kwargs.get("using"))
+
+
+@receiver(post_delete, sender=Run)
+@receiver(post_delete, sender=Passage)
+def deleted_live_state(sender, instance, **kwargs):
+    live_state_changed(instance.session_id, kwargs.get("using"))
+
+
+# Run fields that decide whether and where a run counts in the career index.
+CAREER_FIELDS = {"status", "final_time_ms", "finished_at", "driver_id", "vehicle_id", "session_id"}
+
+
+@receiver(post_save, sender=Run)
+def run_saved_career(sender, instance, created, **kwargs):
+    # Ingest finishes runs with UPDATE statements; this covers manual edits.
+    if created:
+        if instance.status == Run.Status.FINISHED:
+            career.schedule_rebuild([instance.driver_id], kwargs.get("using"))
+        return
+    if CAREER_FIELDS.isdisjoint(instance.changed_fields()):
+        return
+    previous = getattr(instance, "_loaded_values", None) or {}
+    drivers = {instance.driver_id, previous.get("driver_id")} - {None}
+    career.schedule_rebuild(drivers, kwargs.get("using"))
+
+
+@receiver(post_delete, sender=Run)
+def run_deleted_career(sender, instance, **kwargs):
+    if instance.status == Run.Status.FINISHED:
+        career.schedule_rebuild([instance.driver_id], kwargs.get("using"))
+
+
+@receiver(post_save, sender=Driver)
+@receiver(post_delete, sender=Driver)
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+@receiver(post_save, sender=RaceClass)
+@receiver(post_delete, sender=RaceClass)
+def search_index_outdated(sender, instance, **kwargs):
+    if not _mirrored(kwargs):
+        search_index_changed()
@@ -0,0 +1,76 @@
+"""
+Season standings across events (and their shards).
+
+Points are awarded per class from the final boards of finished race-mode
+sessions (``RALLYCONTROL_SEASON_POINTS``, by position). Each event's boards
+are read from the event's own database, so the report works the same for
+sharded and unsharded events.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+
+from django.conf import settings
+
+from . import shards
+from .leaderboards import FINAL_SESSION_STATUSES, latest_board_ids
+from .models import Leaderboard, RaceClass, Session, Stage
+
+OVERALL = "Gesamt"
+
+
+def points_table() -> list[int]:
+    return list(getattr(settings, "RALLYCONTROL_SEASON_POINTS", [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]))
+
+
+def scored_sessions(year: int | None = None):
+    sessions = Session.objects.filter(
+        stage__mode=Stage.Mode.RACE, status__in=FINAL_SESSION_STATUSES
+    )
+    if year is not None:
+        sessions = sessions.filter(stage__event__start_date__year=year)
+    return sessions.values_list("pk", "stage__event_id")
+
+
+def season_standings(year: int | None = None) -> dict[str, list[dict]]:
+    """Return the standings per class name (``"Gesamt"`` = overall board)."""
+    points = points_table()
+    totals: dict[tuple[int | None, int], dict] = {}
+    for session_id, event_id in scored_sessions(year):
+        with shards.using_session(session_id):
+            boards = Leaderboard.objects.filter(pk__in=latest_board_ids(session_id)).values(
+                "race_class_id", "data_json"
+            )
+            for board in boards:
+                for entry in board["data_json"].get("entries", []):
+                    position = entry.get("position")
+                    if not position:
+                        continue
+                    key = (board["race_class_id"], entry["driver_id"])
+                    total = totals.setdefault(
+                        key,
+                        {
+                            "driver_id": entry["driver_id"],
+                            "driver": entry["driver"],
+                            "points": 0,
+                            "wins": 0,
+                            "results": 0,
+                            "events": set(),
+                        },
+                    )
+                    total["points"] += points[position - 1] if position <= len(points) else 0
+                    total["wins"] += position == 1
+                    total["results"] += 1
+                    total["events"].add(event_id)
+
+    class_names = dict(RaceClass.objects.values_list("pk", "name"))
+    standings: dict[str, list[dict]] = defaultdict(list)
+    for (race_class_id, _driver_id), total in totals.items():
+        total["events"] = len(total["events"])
+        standings[class_names.get(race_class_id, OVERALL)].append(total)
+    for rows in standings.values():
+        rows.sort(key=lambda row: (-row["points"], -row["wins"], row["driver"]))
+        for rank, row in enumerate(rows, start=1):
+            row["rank"] = rank
+    return dict(standings)
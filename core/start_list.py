@@ -0,0 +1,198 @@
+"""
+Start lists and the armed start queue.
+
+A session's start list is its ``QUEUED`` runs ordered by
+``start_position``. Race control builds it in bulk for all active drivers
+of a class, reorders it and predicts start times from the session's start
+interval. These bulk operations send no model signals, so they log their
+rows for replication themselves.
+
+For ingest, ``start_queues`` keeps the next few queued runs of every
+running session "armed" in process memory. A start passage takes the
+first armed run without searching the database; binding it is a single
+conditional ``UPDATE`` that only succeeds while the run is still queued,
+so two processes can never start the same run.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db.models import F, Max, Q
+
+from . import replication, shards
+from .models import ConfigVersion, Driver, RaceClass, Run, Session
+
+
+class ArmedRun(NamedTuple):
+    run_id: int
+    driver_id: int
+    start_number: int | None
+
+
+def start_list(session: Session | int):
+    runs = Run.objects.using(shards.alias_for_session(getattr(session, "pk", session)))
+    return runs.filter(session=session, status=Run.Status.QUEUED).order_by(
+        F("start_position").asc(nulls_last=True), "pk"
+    )
+
+
+def _start_lists_changed() -> None:
+    shards.on_commit(lambda: ConfigVersion.bump(ConfigVersion.START_LISTS))
+    start_queues.invalidate()
+
+
+def create_start_list(
+    session: Session, race_class: RaceClass | None = None, order_by: str = "default_start_number"
+) -> list[Run]:
+    """Append queued runs for all active drivers (of ``race_class``) to the start list.
+
+    Drivers that already have a queued run in the session are skipped.
+    """
+    drivers = Driver.objects.filter(is_active=True)
+    if race_class is not None:
+        drivers = drivers.filter(race_class=race_class)
+    # Runs may live in the event's shard, so the subquery is evaluated first.
+    queued = list(start_list(session).values_list("driver_id", flat=True))
+    drivers = drivers.exclude(pk__in=queued).order_by(
+        F(order_by).asc(nulls_last=True), "last_name", "first_name"
+    )
+    with shards.using_session(session.pk), shards.atomic():
+        last = Run.objects.filter(session=session).aggregate(last=Max("start_position"))["last"]
+        runs = [
+            Run(
+                session=session,
+                driver=driver,
+                status=Run.Status.QUEUED,
+                start_position=position,
+                start_number_used=driver.default_start_number,
+                start_number_source=Run.StartNumberSource.DRIVER_DEFAULT,
+            )
+            for position, driver in enumerate(drivers, start=(last or 0) + 1)
+        ]
+        created = Run.objects.bulk_create(runs)
+        replication.record_bulk_changes(Run, [run.pk for run in created])
+        _start_lists_changed()
+    return created
+
+
+def reorder_start_list(session: Session, run_ids: list[int]) -> None:
+    """Assign start positions in the given order (unlisted runs follow)."""
+    with shards.using_session(session.pk), shards.atomic():
+        runs = {run.pk: run for run in start_list(session)}
+        ordered = [runs.pop(pk) for pk in run_ids if pk in runs] + list(runs.values())
+        for position, run in enumerate(ordered, start=1):
+            run.start_position = position
+            run.version = F("version") + 1
+        Run.objects.bulk_update(ordered, ["start_position", "version"])
+        replication.record_bulk_changes(Run, [run.pk for run in ordered], ["start_position"])
+        _start_lists_changed()
+
+
+def predict_start_times(session: Session, first_start: datetime | None = None) -> None:
+    """Set ``planned_start_at`` for the start list at the session's interval."""
+    first_start = first_start or session.start_time
+    if first_start is None:
+        return
+    interval = timedelta(seconds=session.start_interval_s)
+    with shards.using_session(session.pk), shards.atomic():
+        runs = list(start_list(session))
+        for index, run in enumerate(runs):
+            run.planned_start_at = first_start + index * interval
+            run.version = F("version") + 1
+        Run.objects.bulk_update(runs, ["planned_start_at", "version"])
+        replication.record_bulk_changes(Run, [run.pk for run in runs], ["planned_start_at"])
+        _start_lists_changed()
+
+
+class SessionQueue:
+    """Armed runs of one session."""
+
+    __slots__ = ("lock", "armed", "loaded")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.armed: deque[ArmedRun] = deque()
+        self.loaded = False
+
+
+class StartQueues:
+    """Process-local armed start queues for all sessions."""
+
+    def __init__(self, size: int | None = None) -> None:
+        self._size = size
+        self._lock = threading.Lock()
+        self._queues: dict[int, SessionQueue] = {}
+        self._version = -1
+        self._checked_at = 0.0
+
+    @property
+    def size(self) -> int:
+        if self._size is not None:
+            return self._size
+        return getattr(settings, "RALLYCONTROL_START_QUEUE_ARMED", 8)
+
+    def invalidate(self, session_id: int | None = None) -> None:
+        with self._lock:
+            if session_id is None:
+                self._queues.clear()
+            else:
+                self._queues.pop(session_id, None)
+
+    def armed(self, session_id: int) -> list[ArmedRun]:
+        queue = self._queue(session_id)
+        with queue.lock:
+            self._fill(session_id, queue)
+            return list(queue.armed)
+
+    def take(self, session_id: int) -> ArmedRun | None:
+        """Pop the next armed run of a session (no query while armed)."""
+        queue = self._queue(session_id)
+        with queue.lock:
+            if not queue.loaded:
+                self._fill(session_id, queue)
+            return queue.armed.popleft() if queue.armed else None
+
+    def refill(self, session_id: int) -> None:
+        """Top up the armed runs; call after the start has been recorded."""
+        queue = self._queue(session_id)
+        with queue.lock:
+            if len(queue.armed) <= self.size // 2:
+                self._fill(session_id, queue)
+
+    def _queue(self, session_id: int) -> SessionQueue:
+        self._check_version()
+        with self._lock:
+            queue = self._queues.get(session_id)
+            if queue is None:
+                queue = self._queues[session_id] = SessionQueue()
+            return queue
+
+    def _fill(self, session_id: int, queue: SessionQueue) -> None:
+        armed_ids = [run.run_id for run in queue.armed]
+        rows = (
+            start_list(session_id)
+            .filter(~Q(pk__in=armed_ids))
+            .values_list("pk", "driver_id", "start_number_used")[: self.size - len(armed_ids)]
+        )
+        queue.armed.extend(ArmedRun(*row) for row in rows)
+        queue.loaded = True
+
+    def _check_version(self) -> None:
+        interval = getattr(settings, "RALLYCONTROL_GATE_REGISTRY_CHECK_SECONDS", 1.0)
+        now = time.monotonic()
+        if now - self._checked_at < interval:
+            return
+        self._checked_at = now
+        version = ConfigVersion.current(ConfigVersion.START_LISTS)
+        if version != self._version:
+            self._version = version
+            self.invalidate()
+
+
+start_queues = StartQueues()
@@ -0,0 +1,18 @@
+'use strict';
+// Applies autocomplete list filters (core.admin_changelist.AutocompleteFilter)
+// by reloading the changelist with the selected id in the query string.
+window.addEventListener('load', function() {
+    const $ = django.jQuery;
+    $('.rc-autocomplete-filter select').on('change', function() {
+        const params = new URLSearchParams(window.location.search);
+        const name = this.dataset.filterParam;
+        params.delete('cursor');
+        params.delete('p');
+        if (this.value) {
+            params.set(name, this.value);
+        } else {
+            params.delete(name);
+        }
+        window.location.search = params.toString();
+    });
+});
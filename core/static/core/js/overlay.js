@@ -0,0 +1,159 @@
+'use strict';
+// Streaming overlay: keeps the run states of the live feed
+// (core.public_views.OverlayLiveView) and runs the timer of the run on
+// course locally from its start time, so the server only sends
+// starts, splits and finishes. The board is reloaded when its version
+// changes.
+(function() {
+    const root = document.getElementById('overlay');
+    const liveUrl = root.dataset.liveUrl;
+    const feedUrl = root.dataset.feedUrl;
+    const titleEl = document.getElementById('run-title');
+    const timerEl = document.getElementById('run-timer');
+    const infoEl = document.getElementById('run-info');
+    const viewRun = document.getElementById('view-run');
+    const viewBoard = document.getElementById('view-board');
+    const boardListEl = document.getElementById('board-list');
+
+    const WAIT_SECONDS = 15;
+    const RETRY_MS = 2000;
+    // A finished run stays on screen this long before the board is shown.
+    const RESULT_MS = 6000;
+    const CLOCK_SAMPLES = 10;
+
+    const runs = new Map();
+    let version = 0;
+    let boardVersion = null;
+    let bestEntries = new Map();
+    let skews = [];
+    let skew = 0;
+
+    function formatTime(ms) {
+        if (ms === null || ms === undefined) {
+            return '';
+        }
+        const negative = ms < 0;
+        ms = Math.abs(Math.round(ms));
+        const minutes = Math.floor(ms / 60000);
+        const seconds = Math.floor(ms / 1000) % 60;
+        const fraction = String(Math.floor(ms / 10) % 100).padStart(2, '0');
+        const text = minutes
+            ? `${minutes}:${String(seconds).padStart(2, '0')}.${fraction}`
+            : `${seconds}.${fraction}`;
+        return negative ? `-${text}` : text;
+    }
+
+    // Current time on the server clock, which all run times are in.
+    function serverNow() {
+        return Date.now() + skew;
+    }
+
+    function noteClock(clock, receivedAt) {
+        // server_ms - receivedAt is the clock difference minus the network
+        // delay of the response; the largest recent sample has the least delay.
+        skews.push(clock.server_ms - receivedAt);
+        skews = skews.slice(-CLOCK_SAMPLES);
+        skew = Math.max(...skews);
+    }
+
+    function currentRun() {
+        let current = null;
+        runs.forEach(function(run) {
+            if (run.status === 'running' && run.started_ms !== null) {
+                if (current === null || current.status !== 'running' || run.started_ms > current.started_ms) {
+                    current = run;
+                }
+            } else if (run.finished_ms !== null && serverNow() - run.finished_ms < RESULT_MS) {
+                if (current === null || (current.status !== 'running' && run.finished_ms > current.finished_ms)) {
+                    current = run;
+                }
+            }
+        });
+        return current;
+    }
+
+    function render() {
+        const run = currentRun();
+        viewRun.classList.toggle('hidden', run === null);
+        viewBoard.classList.toggle('hidden', run !== null);
+        if (run !== null) {
+            const number = run.start_number !== null ? `#${run.start_number} ` : '';
+            titleEl.textContent = `${number}${run.driver}`;
+            if (run.status === 'running') {
+                timerEl.textContent = `${formatTime(serverNow() - run.started_ms)} s`;
+                const split = run.splits[run.splits.length - 1];
+                infoEl.textContent = split
+                    ? `${split.gate}: ${formatTime(split.timestamp_ms - run.started_ms)} s`
+                    : '';
+                infoEl.classList.remove('pb');
+            } else {
+                timerEl.textContent = run.final_time_ms !== null ? `${formatTime(run.final_time_ms)} s` : run.status.toUpperCase();
+                const entry = bestEntries.get(run.run_id);
+                infoEl.textContent = entry && entry.is_personal_best ? 'Neue persönliche Bestzeit!' : '';
+                infoEl.classList.toggle('pb', Boolean(entry && entry.is_personal_best));
+            }
+        }
+        requestAnimationFrame(render);
+    }
+
+    function renderBoard(entries) {
+        boardListEl.innerHTML = '';
+        bestEntries = new Map();
+        entries.forEach(function(entry) {
+            bestEntries.set(entry.run_id, entry);
+            if (!entry.position || entry.position > 10) {
+                return;
+            }
+            const row = document.createElement('div');
+            row.className = 'row';
+            const name = document.createElement('div');
+            name.textContent = `${entry.position}. ${entry.driver}`;
+            const time = document.createElement('div');
+            time.textContent = entry.final_time;
+            time.classList.toggle('pb', Boolean(entry.is_personal_best));
+            row.append(name, time);
+            boardListEl.appendChild(row);
+        });
+    }
+
+    async function loadBoard() {
+        const response = await fetch(feedUrl);
+        if (!response.ok) {
+            return;
+        }
+        const feed = await response.json();
+        const overall = feed.boards.find(function(board) { return board.race_class === null; });
+        renderBoard(overall ? overall.data.entries : []);
+    }
+
+    async function poll() {
+        try {
+            const response = await fetch(`${liveUrl}?since=${version}&wait=${WAIT_SECONDS}`, {cache: 'no-store'});
+            if (!response.ok) {
+                throw new Error(response.statusText);
+            }
+            const feed = await response.json();
+            noteClock(feed.clock, Date.now());
+            feed.runs.forEach(function(run) {
+                if (run.status === 'removed') {
+                    runs.delete(run.run_id);
+                } else {
+                    runs.set(run.run_id, run);
+                }
+            });
+            version = feed.version;
+            if (feed.board_version !== boardVersion) {
+                boardVersion = feed.board_version;
+                await loadBoard();
+            }
+            root.classList.remove('hidden');
+            setTimeout(poll, 0);
+        } catch (error) {
+            // Lossy connection: keep the timers running and ask again later.
+            setTimeout(poll, RETRY_MS);
+        }
+    }
+
+    requestAnimationFrame(render);
+    poll();
+})();
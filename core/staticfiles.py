@@ -0,0 +1,84 @@
+"""
+Hashed, precompressed static assets.
+
+``collectstatic`` with ``PrecompressedManifestStaticFilesStorage`` writes
+every asset under a content-hashed name (``styles.3f2a…css``) plus ``.gz``
+(and ``.br`` when ``brotli`` is installed) siblings for text assets.
+``serve_static`` answers from ``STATIC_ROOT`` when Django serves the files
+itself (``DEBUG=False`` without a front proxy): it picks the precompressed
+sibling the client accepts and marks hashed names as immutable, so
+spectator browsers fetch the stylesheet once per release instead of on
+every kiosk refresh.
+"""
+
+from __future__ import annotations
+
+import gzip
+import mimetypes
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+
+from .compression import accepted_encodings, brotli
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".json", ".html", ".txt", ".map")
+ENCODING_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _compress(path: Path) -> None:
+    data = path.read_bytes()
+    if len(data) < 256:
+        return
+    Path(f"{path}.gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        Path(f"{path}.br").write_bytes(brotli.compress(data, quality=11))
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also writes compressed variants of text assets."""
+
+    # Keep pages rendering if collectstatic has not run yet.
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in set(self.hashed_files.values()):
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                _compress(Path(self.path(hashed_name)))
+
+
+def serve_static(request, path: str):
+    """Serve a collected asset, precompressed if possible."""
+    try:
+        full_path = Path(safe_join(settings.STATIC_ROOT, path))
+    except ValueError as exc:
+        raise Http404("Invalid path") from exc
+    if not full_path.is_file():
+        raise Http404("Not found")
+    content_type, _encoding = mimetypes.guess_type(full_path.name)
+    accepted = accepted_encodings(request)
+    chosen, encoding = full_path, None
+    for coding, suffix in ENCODING_SUFFIXES:
+        candidate = Path(f"{full_path}{suffix}")
+        if coding in accepted and candidate.is_file():
+            chosen, encoding = candidate, coding
+            break
+    response = FileResponse(
+        open(chosen, "rb"), content_type=content_type or "application/octet-stream"
+    )
+    if encoding is not None:
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept-Encoding"
+    if HASHED_NAME_RE.search(full_path.name):
+        response["Cache-Control"] = IMMUTABLE
+    else:
+        response["Cache-Control"] = "public, max-age=300"
+    return response
@@ -0,0 +1,127 @@
+"""Shared fixtures for the core tests."""
+
+from __future__ import annotations
+
+import datetime
+import json
+import shutil
+import tempfile
+
+from django.db import connections
+from django.test import override_settings
+
+from ..clock_sync import clocks
+from ..debounce import debounce
+from ..gate_registry import registry
+from ..live_state import live_sessions
+from ..search_index import search_index
+from ..models import Driver, Event, Gate, RaceClass, Session, Stage
+from ..shards import SHARD_PREFIX, shards
+from ..start_list import start_queues
+
+
+def reset_process_state() -> None:
+    """Forget the process-local caches; the database is reset per test."""
+    registry.invalidate()
+    start_queues.invalidate()
+    live_sessions.invalidate()
+    debounce.reset()
+    clocks.reset()
+    shards.invalidate()
+    search_index.invalidate()
+
+
+class RallyFixtureMixin:
+    """An event with one running race session, its gates and four drivers.
+
+    Background tasks run inline so every test sees their results at once.
+    """
+
+    databases = {"default", "kiosk", "kiosk_ro"}
+    settings_overrides = {
+        "RALLYCONTROL_BACKGROUND_EAGER": True,
+        "RALLYCONTROL_RECORD_GATE_MESSAGES": False,
+        "RALLYCONTROL_GATE_REGISTRY_CHECK_SECONDS": 0,
+        "RALLYCONTROL_SEARCH_INDEX_CHECK_SECONDS": 0,
+        # Tests do not run collectstatic, so there is no manifest.
+        "STORAGES": {
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            },
+        },
+    }
+
+    def setUp(self):
+        super().setUp()
+        overrides = override_settings(**self.settings_overrides)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_process_state()
+        self.addCleanup(reset_process_state)
+        self.event = Event.objects.create(
+            name="Bergrennen", location="Wolfsberg", start_date=datetime.date(2026, 6, 1)
+        )
+        self.stage = Stage.objects.create(
+            event=self.event, name="Bergprüfung", mode=Stage.Mode.RACE
+        )
+        self.session = Session.objects.create(
+            stage=self.stage, name="Lauf 1", status=Session.Status.RUNNING
+        )
+        self.race_class = RaceClass.objects.create(name="4WD")
+        self.drivers = [
+            Driver.objects.create(
+                first_name=f"Fahrer{number}",
+                last_name="Test",
+                race_class=self.race_class,
+                default_start_number=number,
+            )
+            for number in range(1, 5)
+        ]
+        self.start_gate = Gate.objects.create(
+            gate_uid="start", name="Start", stage=self.stage, gate_type=Gate.GateType.START
+        )
+        self.finish_gate = Gate.objects.create(
+            gate_uid="finish", name="Ziel", stage=self.stage, gate_type=Gate.GateType.FINISH
+        )
+
+    def post_passage(self, gate_uid: str, timestamp_ms: int, client=None):
+        return (client or self.client).post(
+            f"/api/gates/{gate_uid}/passages/",
+            json.dumps({"timestamp_ms": timestamp_ms}),
+            content_type="application/json",
+        )
+
+
+class ShardedEventsMixin:
+    """Enables event shards in a temporary directory.
+
+    Use with ``TransactionTestCase``: shards are separate SQLite files that
+    the test transaction does not cover.
+    """
+
+    def enable_shards(self) -> None:
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        overrides = override_settings(
+            RALLYCONTROL_EVENT_SHARDS=True, RALLYCONTROL_SHARD_DIR=directory
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(self.detach_shards)
+
+    def create_sharded_event(self, name: str, start_date: datetime.date) -> tuple[Event, str]:
+        """A new event and the alias of its shard."""
+        event = Event.objects.create(name=name, location="Wolfsberg", start_date=start_date)
+        # Shards are attached at runtime; the test case has to allow them.
+        databases = type(self).databases
+        type(self).databases = databases | {f"{SHARD_PREFIX}{event.pk}"}
+        self.addCleanup(setattr, type(self), "databases", databases)
+        return event, shards.alias_for_event(event.pk)
+
+    def detach_shards(self) -> None:
+        for alias in shards.attached_aliases():
+            connections[alias].close()
+            del connections[alias]
+            connections.settings.pop(alias, None)
+        shards._attached.clear()
@@ -0,0 +1,230 @@
+import datetime
+from unittest import mock
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import shards
+from ..admin import PassageAdmin
+from ..admin_changelist import EstimatedCountPaginator
+from ..models import Driver, Passage, Run, Session, Stage, Vehicle
+from .base import RallyFixtureMixin, ShardedEventsMixin
+
+
+class RunAdminTests(RallyFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_superuser(
+            "leitung", "leitung@example.org", "geheim"
+        )
+        self.client.force_login(self.user)
+        self.run = Run.objects.create(
+            session=self.session, driver=self.drivers[0], start_position=1
+        )
+        self.url = reverse("admin:core_run_change", args=[self.run.pk])
+
+    def form_data(self, response, **changes):
+        form = response.context["adminform"].form
+        data = {
+            name: value
+            for name, value in (
+                (name, form[name].value()) for name in form.fields
+            )
+            if value is not None
+        }
+        data.update(changes)
+        return data
+
+    def test_add_and_change_forms_render(self):
+        self.assertEqual(self.client.get(reverse("admin:core_run_add")).status_code, 200)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'name="loaded_version"')
+
+    def test_change_saves_and_bumps_version(self):
+        data = self.form_data(self.client.get(self.url), comment="Reifenschaden")
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 302)
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.comment, "Reifenschaden")
+        self.assertEqual(self.run.version, 1)
+
+    def test_stale_version_is_refused(self):
+        data = self.form_data(self.client.get(self.url), comment="Veraltet")
+        # A gate starts the run while the operator has the form open.
+        Run.objects.filter(pk=self.run.pk).update(status=Run.Status.RUNNING, version=1)
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "inzwischen geändert")
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.status, Run.Status.RUNNING)
+        self.assertIsNone(self.run.comment)
+
+
+class ShardedRunAdminTests(ShardedEventsMixin, RallyFixtureMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enable_shards()
+        self.client.force_login(
+            get_user_model().objects.create_superuser("leitung", "leitung@example.org", "geheim")
+        )
+        self.events = []
+        for name, start_date, session_name, status in (
+            ("Talrennen", datetime.date(2026, 7, 1), "Vorlauf", Session.Status.FINISHED),
+            ("Sprint", datetime.date(2026, 8, 1), "Hauptlauf", Session.Status.RUNNING),
+        ):
+            event, alias = self.create_sharded_event(name, start_date)
+            stage = Stage.objects.create(event=event, name=name, mode=Stage.Mode.RACE)
+            session = Session.objects.create(
+                stage=stage, name=session_name, status=status, start_time=timezone.now()
+            )
+            Run.objects.using(alias).create(session=session, driver=self.drivers[0])
+            self.events.append(event)
+
+    def test_event_filter_selects_the_shard(self):
+        url = reverse("admin:core_run_changelist")
+        self.assertContains(self.client.get(url), "Hauptlauf")
+        response = self.client.get(url, {"event": self.events[0].pk})
+        self.assertContains(response, "Vorlauf")
+        self.assertNotContains(response, "Hauptlauf")
+
+    def test_change_form_keeps_the_filtered_shard(self):
+        run = Run.objects.using(shards.alias_for_event(self.events[0].pk)).get()
+        url = reverse("admin:core_run_change", args=[run.pk])
+        query = urlencode({"_changelist_filters": f"event={self.events[0].pk}"})
+        response = self.client.get(f"{url}?{query}")
+        self.assertEqual(response.context["original"].session.name, "Vorlauf")
+
+
+class ScalableChangeListTests(RallyFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(
+            get_user_model().objects.create_superuser("leitung", "leitung@example.org", "geheim")
+        )
+        self.passages = [
+            Passage.objects.create(
+                session=self.session, gate=self.start_gate, timestamp_ms=1_750_000_000_000 + index
+            )
+            for index in range(7)
+        ]
+        self.newest_first = [passage.pk for passage in reversed(self.passages)]
+        per_page = mock.patch.object(PassageAdmin, "list_per_page", 3)
+        per_page.start()
+        self.addCleanup(per_page.stop)
+
+    def page(self, query=""):
+        response = self.client.get(reverse("admin:core_passage_changelist") + query)
+        self.assertEqual(response.status_code, 200)
+        return response.context["cl"]
+
+    @staticmethod
+    def params(url: str) -> dict:
+        return {key: values[0] for key, values in parse_qs(urlparse(url).query).items()}
+
+    def test_cursor_links_walk_the_table_both_ways(self):
+        first = self.page()
+        self.assertEqual([row.pk for row in first.result_list], self.newest_first[:3])
+        self.assertIsNone(first.get_previous_page_url())
+        self.assertIsNone(first.get_first_page_url())
+        self.assertEqual(
+            self.params(first.get_next_page_url()), {"cursor": str(self.newest_first[2])}
+        )
+
+        second = self.page(first.get_next_page_url())
+        self.assertEqual([row.pk for row in second.result_list], self.newest_first[3:6])
+        self.assertEqual(self.params(second.get_first_page_url()), {})
+        third = self.page(second.get_next_page_url())
+        self.assertEqual([row.pk for row in third.result_list], self.newest_first[6:])
+        self.assertIsNone(third.get_next_page_url())
+
+        back = self.page(third.get_previous_page_url())
+        self.assertEqual([row.pk for row in back.result_list], self.newest_first[3:6])
+        self.assertEqual(
+            self.params(back.get_previous_page_url()), {"before": str(self.newest_first[3])}
+        )
+        self.assertEqual(
+            self.params(back.get_next_page_url()), {"cursor": str(self.newest_first[5])}
+        )
+        top = self.page(back.get_previous_page_url())
+        self.assertEqual([row.pk for row in top.result_list], self.newest_first[:3])
+        self.assertIsNone(top.get_previous_page_url())
+        self.assertContains(
+            self.client.get(reverse("admin:core_passage_changelist") + second.get_next_page_url()),
+            "Neuere",
+        )
+
+    def test_links_keep_the_filters(self):
+        cl = self.page("?is_valid__exact=1")
+        self.assertEqual(
+            self.params(cl.get_next_page_url()),
+            {"is_valid__exact": "1", "cursor": str(self.newest_first[2])},
+        )
+
+    def test_column_sort_uses_the_regular_paginator(self):
+        cl = self.page("?o=3")
+        self.assertFalse(cl.uses_cursor)
+        oldest_first = [passage.pk for passage in self.passages]
+        self.assertEqual([row.pk for row in cl.result_list], oldest_first[:3])
+        self.assertIsNone(cl.get_next_page_url())
+
+    def test_invalid_cursor_is_refused(self):
+        response = self.client.get(reverse("admin:core_passage_changelist"), {"cursor": "x"})
+        self.assertEqual(response.status_code, 302)
+
+
+class EstimatedCountPaginatorTests(RallyFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(6):
+            Passage.objects.create(
+                session=self.session,
+                gate=self.start_gate,
+                timestamp_ms=1_750_000_000_000 + index,
+                is_valid=index % 2 == 0,
+            )
+
+    def test_unfiltered_count_is_the_highest_pk(self):
+        passages = Passage.objects.order_by("pk")
+        highest = passages.last().pk
+        passages.first().delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(EstimatedCountPaginator(Passage.objects.all(), 10).count, highest)
+        Passage.objects.all().delete()
+        self.assertEqual(EstimatedCountPaginator(Passage.objects.all(), 10).count, 0)
+
+    def test_filtered_count_is_capped(self):
+        valid = Passage.objects.filter(is_valid=True)
+        self.assertEqual(EstimatedCountPaginator(valid, 10).count, 3)
+        with mock.patch.object(EstimatedCountPaginator, "count_cap", 2):
+            self.assertEqual(EstimatedCountPaginator(valid, 10).count, 2)
+
+
+class IndexedSearchTests(RallyFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(
+            get_user_model().objects.create_superuser("leitung", "leitung@example.org", "geheim")
+        )
+        self.mueller = Driver.objects.create(first_name="Jürgen", last_name="Müller")
+        self.vehicle = Vehicle.objects.create(driver=self.mueller, name="Subaru Impreza")
+
+    def search(self, model: str, term: str) -> list:
+        url = reverse(f"admin:core_{model}_changelist")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"q": term})
+        self.assertFalse(any("LIKE" in query["sql"] for query in queries))
+        return list(response.context["cl"].result_list)
+
+    def test_changelist_search_uses_the_index(self):
+        self.assertEqual(self.search("driver", "mul"), [self.mueller])
+        self.assertEqual(self.search("driver", "fahrer2"), [self.drivers[1]])
+        self.assertEqual(self.search("driver", "impreza"), [])
+        self.assertEqual(self.search("vehicle", "mpre"), [self.vehicle])
+        self.assertEqual(self.search("vehicle", "müller"), [self.vehicle])
+        self.assertEqual(self.search("driver", "unbekannt"), [])
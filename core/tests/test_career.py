@@ -0,0 +1,151 @@
+import datetime
+from unittest import mock
+
+from django.test import TestCase
+
+from .. import career
+from ..background import worker
+from ..models import DriverBest, DriverBestRun, Event, Run, Session, Stage
+from .base import RallyFixtureMixin
+
+
+class CareerRunIdentityTests(RallyFixtureMixin, TestCase):
+    """Event shards number their runs from 1, so run ids repeat across events."""
+
+    def setUp(self):
+        super().setUp()
+        event = Event.objects.create(
+            name="Bergrennen 2", location="Wolfsberg", start_date=datetime.date(2026, 8, 1)
+        )
+        stage = Stage.objects.create(event=event, name="Bergprüfung", mode=Stage.Mode.RACE)
+        self.other_session = Session.objects.create(stage=stage, name="Lauf 1")
+        self.driver = self.drivers[0]
+
+    def finish(self, session, run_id, final_ms):
+        run = career.FinishedRun(
+            run_id=run_id,
+            session_id=session.pk,
+            driver_id=self.driver.pk,
+            race_class_id=self.race_class.pk,
+            final_time_ms=final_ms,
+            finished_at=None,
+        )
+        for scope, key, label in career.stage_keys(session.stage, self.race_class.pk):
+            career._add_run(run, scope, key, label)
+
+    def course_row(self):
+        return DriverBest.objects.get(driver=self.driver, scope=DriverBest.Scope.COURSE)
+
+    def test_same_run_id_in_another_event_is_counted(self):
+        self.finish(self.session, 1, 60_000)
+        self.finish(self.other_session, 1, 58_000)
+        row = self.course_row()
+        self.assertEqual(row.finished_runs, 2)
+        self.assertEqual(row.best_final_ms, 58_000)
+        self.assertEqual(row.best_session_id, self.other_session.pk)
+        self.assertEqual(row.previous_best_ms, 60_000)
+
+    def test_repeated_task_counts_a_run_once(self):
+        self.finish(self.session, 1, 60_000)
+        self.finish(self.session, 1, 60_000)
+        self.assertEqual(self.course_row().finished_runs, 1)
+
+    def test_compare_tells_runs_with_the_same_id_apart(self):
+        self.finish(self.session, 1, 60_000)
+        self.finish(self.other_session, 1, 58_000)
+        row = self.course_row()
+        # The best run compares against the best before it ...
+        self.assertEqual(career._compare(row, self.other_session.pk, 1, 58_000), (60_000, 58_000))
+        # ... the slower run with the same id against the current best.
+        self.assertEqual(career._compare(row, self.session.pk, 1, 60_000), (58_000, 58_000))
+
+    def test_finishes_with_the_same_run_id_are_not_coalesced(self):
+        with mock.patch.object(worker, "submit") as submit, self.captureOnCommitCallbacks(
+            execute=True
+        ):
+            career.schedule_record_finish(self.session.pk, 1)
+            career.schedule_record_finish(self.other_session.pk, 1)
+        keys = {call.kwargs["key"] for call in submit.call_args_list}
+        self.assertEqual(len(keys), 2)
+
+
+class CareerContributionTests(RallyFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.driver = self.drivers[0]
+
+    def finish(self, run_id, final_ms, finished_at=None):
+        run = career.FinishedRun(
+            run_id=run_id,
+            session_id=self.session.pk,
+            driver_id=self.driver.pk,
+            race_class_id=self.race_class.pk,
+            final_time_ms=final_ms,
+            finished_at=finished_at,
+        )
+        for scope, key, label in career.stage_keys(self.session.stage, self.race_class.pk):
+            career._add_run(run, scope, key, label)
+
+    def course_row(self):
+        return DriverBest.objects.get(driver=self.driver, scope=DriverBest.Scope.COURSE)
+
+    def test_task_repeated_after_another_finish_counts_once(self):
+        self.finish(1, 60_000)
+        self.finish(2, 59_000)
+        self.finish(1, 60_000)
+        row = self.course_row()
+        self.assertEqual(row.finished_runs, 2)
+        self.assertEqual(row.total_final_ms, 119_000)
+        self.assertEqual(DriverBestRun.objects.filter(key=row.key).count(), 2)
+
+    def test_new_time_of_a_counted_run_replaces_the_old_one(self):
+        self.finish(1, 60_000)
+        self.finish(2, 62_000)
+        self.finish(2, 58_000)
+        row = self.course_row()
+        self.assertEqual(row.finished_runs, 2)
+        self.assertEqual(row.total_final_ms, 118_000)
+        self.assertEqual(row.last_final_ms, 58_000)
+        self.assertEqual((row.best_final_ms, row.best_run_id), (58_000, 2))
+        self.assertEqual(row.previous_best_ms, 60_000)
+
+    def test_slower_best_run_rebuilds_from_the_runs(self):
+        runs = [
+            Run.objects.create(
+                session=self.session,
+                driver=self.driver,
+                status=Run.Status.FINISHED,
+                final_time_ms=final_ms,
+            )
+            for final_ms in (60_000, 58_000)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            for run in runs:
+                career.record_finish(self.session.pk, run.pk)
+        Run.objects.filter(pk=runs[1].pk).update(final_time_ms=63_000)
+        with self.captureOnCommitCallbacks(execute=True):
+            career.record_finish(self.session.pk, runs[1].pk)
+        row = self.course_row()
+        self.assertEqual((row.best_final_ms, row.best_run_id), (60_000, runs[0].pk))
+        self.assertEqual(row.total_final_ms, 123_000)
+
+    def test_first_finish_is_a_personal_best(self):
+        entries = [
+            {
+                "run_id": 1,
+                "driver_id": self.driver.pk,
+                "final_time": "1:00.000",
+                "final_time_ms": 60_000,
+            }
+        ]
+        career.annotate_entries(self.session, entries, {1: self.race_class.pk})
+        self.assertTrue(entries[0]["is_personal_best"])
+        self.assertTrue(entries[0]["is_season_best"])
+        self.assertIsNone(entries[0]["personal_best_delta_ms"])
+
+        self.finish(1, 60_000)
+        self.finish(2, 59_000)
+        entries[0].update(run_id=3, final_time_ms=61_000)
+        career.annotate_entries(self.session, entries, {3: self.race_class.pk})
+        self.assertFalse(entries[0]["is_personal_best"])
+        self.assertEqual(entries[0]["personal_best_delta_ms"], 2_000)
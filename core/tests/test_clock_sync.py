@@ -0,0 +1,144 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .. import clock_sync
+from ..clock_sync import ClockEstimate, GateClockEstimator, clocks, exchange_sample
+from ..gate_registry import registry
+from ..models import Passage
+from .base import RallyFixtureMixin
+
+START_MS = 1_750_000_000_000
+HOLD_MS = 1
+
+
+def exchange(gate_ms: float, offset_ms: float, up_ms: float, down_ms: float):
+    """Sample of an exchange sent at ``gate_ms`` by a gate ``offset_ms`` behind the server."""
+    t1 = round(gate_ms)
+    t2 = t1 + up_ms + offset_ms
+    t3 = t2 + HOLD_MS
+    t4 = t1 + up_ms + HOLD_MS + down_ms
+    return exchange_sample(t1, t2, t3, t4)
+
+
+def estimate(**fields) -> ClockEstimate:
+    values = {
+        "offset_ms": 0.0,
+        "drift": 0.0,
+        "reference_ms": START_MS,
+        "jitter_ms": 1.0,
+        "delay_ms": 10.0,
+        "points": clock_sync.MIN_STABLE_POINTS,
+        "updated_ms": START_MS,
+    }
+    values.update(fields)
+    return ClockEstimate(**values)
+
+
+@override_settings(
+    RALLYCONTROL_CLOCK_MAX_DELAY_MS=1000,
+    RALLYCONTROL_CLOCK_STEP_MS=50,
+    RALLYCONTROL_CLOCK_MAX_JITTER_MS=5,
+    RALLYCONTROL_CLOCK_MAX_AGE_SECONDS=120,
+)
+class GateClockEstimatorTests(SimpleTestCase):
+    def feed(self, estimator, samples, received_ms=START_MS):
+        for sample in samples:
+            estimator.add(sample, received_ms)
+
+    def test_exchange_formulas(self):
+        sample = exchange(START_MS, 250, up_ms=30, down_ms=10)
+        self.assertEqual(sample.offset_ms, 260)
+        self.assertEqual(sample.delay_ms, 40)
+
+    def test_keeps_the_fastest_of_each_round(self):
+        estimator = GateClockEstimator()
+        self.feed(estimator, [exchange(START_MS, 250, 5, 5)])
+        self.assertEqual(estimator.estimate.offset_ms, 250)
+        # Asymmetric slow exchanges are off by half their asymmetry.
+        self.feed(
+            estimator,
+            [
+                exchange(START_MS + 1000, 250, 300, 20),
+                exchange(START_MS + 2000, 250, 4, 4),
+                exchange(START_MS + 3000, 250, 20, 200),
+            ],
+        )
+        self.assertEqual(len(estimator.points), 1)
+        self.feed(estimator, [exchange(START_MS + 4000, 250, 90, 10)])
+        self.assertEqual(len(estimator.points), 2)
+        self.assertEqual(estimator.points[-1].delay_ms, 8)
+        self.assertEqual(estimator.estimate.offset_ms, 250)
+
+    def test_implausible_delays_are_rejected(self):
+        estimator = GateClockEstimator()
+        self.feed(
+            estimator, [exchange(START_MS, 250, 900, 900), exchange(START_MS, 250, 10, -20)]
+        )
+        self.assertEqual(estimator.rejected, 2)
+        self.assertIsNone(estimator.estimate)
+
+    def test_least_squares_offset_and_drift(self):
+        drift = 100 / 1_000_000
+        estimator = GateClockEstimator()
+        for index in range(8 * clock_sync.FILTER_SAMPLES):
+            gate_ms = START_MS + index * 2000
+            offset = 250 + drift * (gate_ms - START_MS)
+            self.feed(estimator, [exchange(gate_ms, offset, 5, 5)])
+        fitted = estimator.estimate
+        self.assertGreaterEqual(fitted.points, clock_sync.MIN_STABLE_POINTS)
+        self.assertAlmostEqual(fitted.drift, drift, places=9)
+        self.assertAlmostEqual(fitted.jitter_ms, 0, places=3)
+        later = round(fitted.reference_ms) + 10_000
+        self.assertAlmostEqual(
+            fitted.to_server(later) - later, 250 + drift * (later - START_MS), delta=1
+        )
+
+    def test_fit_of_scattered_points(self):
+        points = [
+            clock_sync.ClockSample(gate_ms=x, offset_ms=y, delay_ms=5)
+            for x, y in ((0, 10), (1000, 14), (2000, 10), (3000, 14))
+        ]
+        offset, drift, jitter = clock_sync.fit(points)
+        self.assertAlmostEqual(drift, 0.0008)
+        self.assertAlmostEqual(offset, 13.2)
+        self.assertAlmostEqual(jitter, 3.2**0.5)
+        self.assertEqual(clock_sync.fit(points[:2]), (14, 0.0, None))
+
+    def test_clock_jump_resets_the_fit(self):
+        estimator = GateClockEstimator()
+        for index in range(4 * clock_sync.FILTER_SAMPLES):
+            self.feed(estimator, [exchange(START_MS + index * 2000, 250, 5, 5)])
+        self.assertGreater(len(estimator.points), 1)
+        self.feed(estimator, [exchange(START_MS + 40_000, 1250, 5, 5)])
+        self.assertEqual(len(estimator.points), 1)
+        self.assertEqual(estimator.estimate.offset_ms, 1250)
+
+    def test_stability(self):
+        now = START_MS + 1000
+        self.assertTrue(clock_sync.is_stable(estimate(), now))
+        for reason, unstable in (
+            ("missing", None),
+            ("seeded", estimate(jitter_ms=None)),
+            ("young", estimate(points=clock_sync.MIN_STABLE_POINTS - 1)),
+            ("jittery", estimate(jitter_ms=5.5)),
+            ("stale", estimate(updated_ms=now - 121_000)),
+        ):
+            with self.subTest(reason):
+                self.assertFalse(clock_sync.is_stable(unstable, now))
+
+
+class NormalizeTests(RallyFixtureMixin, TestCase):
+    def test_sync_state_of_passages(self):
+        entry = registry.get("start")
+        self.assertEqual(clocks.normalize(entry, START_MS), (START_MS, Passage.ClockSync.NONE))
+
+        clocks.add_exchange(entry, START_MS, START_MS + 255, START_MS + 256, START_MS + 11)
+        self.assertEqual(
+            clocks.normalize(entry, START_MS + 1000),
+            (START_MS + 1250, Passage.ClockSync.UNSTABLE),
+        )
+        for index in range(1, 4 * clock_sync.FILTER_SAMPLES):
+            t1 = START_MS + index * 2000
+            clocks.add_exchange(entry, t1, t1 + 255, t1 + 256, t1 + 11)
+        timestamp, state = clocks.normalize(entry, START_MS + 100_000)
+        self.assertEqual(state, Passage.ClockSync.STABLE)
+        self.assertEqual(timestamp, START_MS + 100_250)
@@ -0,0 +1,140 @@
+import gzip
+import shutil
+import tempfile
+import types
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .. import compression, staticfiles
+from ..compression import CompressedPayload, PayloadCache
+
+BODY = b'{"entries": [' + b", ".join(b'{"position": %d}' % index for index in range(40)) + b"]}"
+# Stand-in for the optional brotli package, so both variants are always built.
+FAKE_BROTLI = types.SimpleNamespace(compress=lambda data, quality: b"br" + data[:8])
+
+
+class CompressedPayloadTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        with mock.patch.object(compression, "brotli", FAKE_BROTLI):
+            self.payload = CompressedPayload(BODY, "application/json", 'W/"kiosk-1-7"')
+
+    def get(self, **headers):
+        return self.payload.response(self.factory.get("/", headers=headers))
+
+    def test_accept_encoding_negotiation(self):
+        for accept, encoding in (
+            ("", None),
+            ("gzip", "gzip"),
+            ("gzip, deflate, br", "br"),
+            ("br;q=0, gzip;q=0.5", "gzip"),
+            ("br;q=0, gzip;q=0", None),
+            ("identity", None),
+        ):
+            with self.subTest(accept=accept):
+                response = self.get(**{"Accept-Encoding": accept})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.get("Content-Encoding"), encoding)
+                self.assertEqual(response["Vary"], "Accept-Encoding")
+                self.assertEqual(response["Content-Length"], str(len(response.content)))
+        body = self.get(**{"Accept-Encoding": "gzip"}).content
+        self.assertEqual(gzip.decompress(body), BODY)
+
+    def test_small_payloads_are_sent_as_is(self):
+        payload = CompressedPayload(b"{}", "application/json", 'W/"status-1-7"')
+        self.assertEqual(set(payload.variants), {None})
+        response = payload.response(self.factory.get("/", headers={"Accept-Encoding": "gzip"}))
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_etag_revalidation(self):
+        response = self.get()
+        self.assertEqual(response["ETag"], 'W/"kiosk-1-7"')
+        self.assertEqual(response["Cache-Control"], "public, no-cache")
+        for header in ('W/"kiosk-1-7"', '"kiosk-1-7"', 'W/"kiosk-1-6", W/"kiosk-1-7"', "*"):
+            with self.subTest(header=header):
+                response = self.get(**{"If-None-Match": header, "Accept-Encoding": "gzip"})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+                self.assertEqual(response["ETag"], 'W/"kiosk-1-7"')
+                self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(self.get(**{"If-None-Match": 'W/"kiosk-1-6"'}).status_code, 200)
+
+
+class PayloadCacheTests(SimpleTestCase):
+    def test_only_the_current_version_is_served(self):
+        cache = PayloadCache()
+        first = CompressedPayload(b"1", "application/json", '"a"')
+        cache.put(("kiosk", 1), 7, first)
+        self.assertIs(cache.get(("kiosk", 1), 7), first)
+        self.assertIsNone(cache.get(("kiosk", 1), 8))
+        cache.put(("kiosk", 1), 8, CompressedPayload(b"2", "application/json", '"b"'))
+        self.assertIsNone(cache.get(("kiosk", 1), 7))
+
+    @override_settings(RALLYCONTROL_PUBLIC_CACHE_ENTRIES=2)
+    def test_least_recently_used_entries_are_dropped(self):
+        cache = PayloadCache()
+        payload = CompressedPayload(b"1", "application/json", '"a"')
+        for session_id in (1, 2):
+            cache.put(("kiosk", session_id), 1, payload)
+        cache.get(("kiosk", 1), 1)
+        cache.put(("kiosk", 3), 1, payload)
+        self.assertIsNone(cache.get(("kiosk", 2), 1))
+        self.assertIs(cache.get(("kiosk", 1), 1), payload)
+
+
+class PrecompressedStaticFilesTests(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        overrides = override_settings(
+            STATIC_ROOT=self.root,
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {
+                    "BACKEND": "core.staticfiles.PrecompressedManifestStaticFilesStorage"
+                },
+            },
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        with mock.patch.object(staticfiles, "brotli", FAKE_BROTLI):
+            call_command("collectstatic", interactive=False, verbosity=0)
+        self.stylesheet = staticfiles_storage.stored_name("core/css/styles.css")
+        self.factory = RequestFactory()
+
+    def test_collectstatic_writes_compressed_siblings(self):
+        self.assertRegex(self.stylesheet, staticfiles.HASHED_NAME_RE)
+        hashed = self.root / self.stylesheet
+        self.assertEqual(gzip.decompress(Path(f"{hashed}.gz").read_bytes()), hashed.read_bytes())
+        self.assertTrue(Path(f"{hashed}.br").is_file())
+        # Only the hashed names are compressed.
+        self.assertFalse((self.root / "core/css/styles.css.gz").exists())
+
+    def test_serve_static_picks_the_precompressed_sibling(self):
+        for accept, encoding, suffix in (
+            ("gzip, br", "br", ".br"),
+            ("gzip", "gzip", ".gz"),
+            ("", None, ""),
+        ):
+            with self.subTest(accept=accept):
+                request = self.factory.get("/", headers={"Accept-Encoding": accept})
+                response = staticfiles.serve_static(request, self.stylesheet)
+                self.assertEqual(response.get("Content-Encoding"), encoding)
+                self.assertEqual(response["Content-Type"], "text/css")
+                self.assertEqual(response["Vary"], "Accept-Encoding")
+                self.assertEqual(response["Cache-Control"], staticfiles.IMMUTABLE)
+                self.assertEqual(
+                    b"".join(response.streaming_content),
+                    Path(f"{self.root / self.stylesheet}{suffix}").read_bytes(),
+                )
+                response.close()
+
+    def test_unhashed_names_are_revalidated(self):
+        response = staticfiles.serve_static(self.factory.get("/"), "core/css/styles.css")
+        self.assertEqual(response["Cache-Control"], "public, max-age=300")
+        response.close()
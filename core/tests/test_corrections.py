@@ -0,0 +1,175 @@
+import datetime
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import corrections
+from ..models import Run, RunCorrection, Session, Stage
+from .base import RallyFixtureMixin, ShardedEventsMixin
+
+
+class CorrectionTests(RallyFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_superuser(
+            "leitung", "leitung@example.org", "geheim"
+        )
+        self.finished = [
+            Run.objects.create(
+                session=self.session,
+                driver=driver,
+                status=Run.Status.FINISHED,
+                total_time_ms=50_000 + index * 1000,
+                final_time_ms=50_000 + index * 1000,
+            )
+            for index, driver in enumerate(self.drivers[:3])
+        ]
+        self.running = Run.objects.create(
+            session=self.session, driver=self.drivers[3], status=Run.Status.RUNNING
+        )
+        self.ids = [run.pk for run in self.finished]
+
+    def runs(self) -> list[Run]:
+        return list(Run.objects.filter(pk__in=self.ids).order_by("pk"))
+
+    def test_bulk_penalty_and_audit_entry(self):
+        correction = corrections.add_penalty(
+            self.ids, 5000, session=self.session, user=self.user, reason="Frühstart"
+        )
+        self.assertEqual(
+            [(run.penalty_ms, run.final_time_ms, run.version) for run in self.runs()],
+            [(5000, 55_000, 1), (5000, 56_000, 1), (5000, 57_000, 1)],
+        )
+        correction = RunCorrection.objects.get(pk=correction.pk)
+        self.assertEqual(correction.action, RunCorrection.Action.ADD_PENALTY)
+        self.assertEqual(correction.run_ids, self.ids)
+        self.assertEqual(correction.session_ids, [self.session.pk])
+        self.assertEqual(correction.penalty_ms, 5000)
+        self.assertEqual(correction.reason, "Frühstart")
+        self.assertEqual(correction.created_by, self.user)
+
+    def test_penalty_is_clamped_at_zero(self):
+        corrections.add_penalty(self.ids[:1], 2000, session=self.session)
+        corrections.add_penalty(self.ids, -3000, session=self.session)
+        self.assertEqual(
+            [(run.penalty_ms, run.final_time_ms) for run in self.runs()],
+            [(0, 50_000), (0, 51_000), (0, 52_000)],
+        )
+
+    def test_set_penalty_replaces_the_penalty(self):
+        corrections.add_penalty(self.ids, 2000, session=self.session)
+        corrections.set_penalty(self.ids[1:], 10_000, session=self.session)
+        self.assertEqual([run.final_time_ms for run in self.runs()], [52_000, 61_000, 62_000])
+        with self.assertRaises(corrections.CorrectionError):
+            corrections.set_penalty(self.ids, -1, session=self.session)
+
+    def test_set_status(self):
+        corrections.set_status(self.ids[:2], Run.Status.DSQ, session=self.session)
+        self.assertEqual(
+            [run.status for run in self.runs()],
+            [Run.Status.DSQ, Run.Status.DSQ, Run.Status.FINISHED],
+        )
+        with self.assertRaises(corrections.CorrectionError):
+            corrections.set_status(self.ids, Run.Status.FINISHED, session=self.session)
+
+    def test_dnf_running_runs(self):
+        correction = corrections.dnf_running_runs(self.session)
+        self.assertEqual(correction.run_ids, [self.running.pk])
+        self.running.refresh_from_db()
+        self.assertEqual(self.running.status, Run.Status.DNF)
+        self.assertEqual({run.status for run in self.runs()}, {Run.Status.FINISHED})
+
+    def test_recompute_final_times(self):
+        Run.objects.filter(pk=self.ids[0]).update(penalty_ms=3000)
+        correction = corrections.recompute_final_times(self.session.pk)
+        self.assertEqual(correction.run_ids, self.ids[:1])
+        self.assertEqual(self.runs()[0].final_time_ms, 53_000)
+        self.assertIsNone(corrections.recompute_final_times(self.session.pk))
+
+    def test_one_board_regeneration_per_session(self):
+        other = Session.objects.create(stage=self.stage, name="Lauf 2")
+        other_run = Run.objects.create(session=other, driver=self.drivers[0])
+        with mock.patch.object(corrections, "schedule_regeneration") as regenerate:
+            corrections.add_penalty(self.ids, 1000, session=self.session)
+        regenerate.assert_called_once_with(self.session.pk)
+        with mock.patch.object(corrections, "schedule_regeneration") as regenerate:
+            corrections.set_status(
+                Run.objects.filter(pk__in=[*self.ids, other_run.pk]), Run.Status.VOID
+            )
+        self.assertEqual(
+            sorted(call.args[0] for call in regenerate.call_args_list),
+            sorted([self.session.pk, other.pk]),
+        )
+
+
+class ShardedCorrectionTests(ShardedEventsMixin, RallyFixtureMixin, TransactionTestCase):
+    """Run pks repeat across event shards; corrections must use the session's."""
+
+    def setUp(self):
+        super().setUp()
+        self.enable_shards()
+        self.client.force_login(
+            get_user_model().objects.create_superuser("leitung", "leitung@example.org", "geheim")
+        )
+        self.runs = {}
+        for name, start_date, status in (
+            ("Talrennen", datetime.date(2026, 7, 1), Session.Status.FINISHED),
+            ("Sprint", datetime.date(2026, 8, 1), Session.Status.RUNNING),
+        ):
+            event, alias = self.create_sharded_event(name, start_date)
+            stage = Stage.objects.create(event=event, name=name, mode=Stage.Mode.RACE)
+            session = Session.objects.create(
+                stage=stage, name="Lauf 1", status=status, start_time=timezone.now()
+            )
+            self.runs[name] = Run.objects.using(alias).create(
+                session=session,
+                driver=self.drivers[0],
+                status=Run.Status.FINISHED,
+                total_time_ms=50_000,
+                final_time_ms=50_000,
+            )
+
+    def correct(self, **body):
+        return self.client.post(
+            reverse("core:run_corrections"), json.dumps(body), content_type="application/json"
+        )
+
+    def test_penalty_lands_in_the_shard_of_the_session(self):
+        earlier, live = self.runs["Talrennen"], self.runs["Sprint"]
+        self.assertEqual(earlier.pk, live.pk)
+        response = self.correct(
+            action="add_penalty",
+            session_id=earlier.session_id,
+            run_ids=[earlier.pk],
+            penalty_ms=5000,
+        )
+        self.assertEqual(response.status_code, 200)
+        earlier.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual(earlier.final_time_ms, 55_000)
+        self.assertEqual(live.final_time_ms, 50_000)
+        self.assertTrue(RunCorrection.objects.using(earlier._state.db).exists())
+        self.assertFalse(RunCorrection.objects.using(live._state.db).exists())
+
+    def test_runs_of_another_session_are_refused(self):
+        earlier = self.runs["Talrennen"]
+        response = self.correct(
+            action="set_status",
+            session_id=self.session.pk,
+            run_ids=[earlier.pk],
+            status=Run.Status.DSQ,
+        )
+        self.assertEqual(response.status_code, 400)
+        earlier.refresh_from_db()
+        self.assertEqual(earlier.status, Run.Status.FINISHED)
+
+    def test_session_is_required_for_run_ids(self):
+        self.assertEqual(
+            self.correct(action="add_penalty", run_ids=[1], penalty_ms=5000).status_code, 400
+        )
+        with self.assertRaises(corrections.CorrectionError):
+            corrections.add_penalty([1], 5000)
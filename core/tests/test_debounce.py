@@ -0,0 +1,51 @@
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import Client, TestCase, override_settings
+
+from .. import ingest, start_list
+from ..debounce import MODE_DROP, MODE_MARK
+from ..models import Passage, Run
+from .base import RallyFixtureMixin
+
+
+class DebounceRetryTests(RallyFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        start_list.create_start_list(self.session)
+        self.client = Client(raise_request_exception=False)
+
+    def fail_first_store(self):
+        store = ingest._match_and_store
+        calls = []
+
+        def flaky(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return store(*args, **kwargs)
+
+        return mock.patch.object(ingest, "_match_and_store", flaky)
+
+    def assert_retry_is_stored(self):
+        with self.fail_first_store():
+            self.assertEqual(self.post_passage("start", 1_750_000_000_000).status_code, 500)
+            response = self.post_passage("start", 1_750_000_000_000)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.json()["suppressed"])
+        passage = Passage.objects.get()
+        self.assertTrue(passage.is_valid)
+        self.assertEqual(Run.objects.get(pk=passage.run_id).status, Run.Status.RUNNING)
+
+    @override_settings(RALLYCONTROL_DEBOUNCE_MODE=MODE_DROP)
+    def test_retry_after_failed_store_is_not_dropped(self):
+        self.assert_retry_is_stored()
+
+    @override_settings(RALLYCONTROL_DEBOUNCE_MODE=MODE_MARK)
+    def test_retry_after_failed_store_is_not_marked_invalid(self):
+        self.assert_retry_is_stored()
+
+    def test_bounce_after_stored_trigger_is_still_dropped(self):
+        self.assertEqual(self.post_passage("start", 1_750_000_000_000).status_code, 201)
+        self.assertEqual(self.post_passage("start", 1_750_000_000_100).status_code, 202)
+        self.assertEqual(Passage.objects.count(), 1)
@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import derivatives
+from ..models import Capture, OCRResult, Passage
+from .base import RallyFixtureMixin
+
+
+class CropViewTests(RallyFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        overrides = override_settings(
+            RALLYCONTROL_CAPTURE_DIR=directory / "captures",
+            RALLYCONTROL_DERIVATIVE_DIR=directory / "derivatives",
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(derivatives.derivative_cache.clear)
+        (directory / "captures").mkdir()
+        Image.new("RGB", (640, 480), "white").save(directory / "captures" / "start.jpg")
+
+        passage = Passage.objects.create(
+            session=self.session, gate=self.start_gate, timestamp_ms=1_750_000_000_000
+        )
+        capture = Capture.objects.create(
+            passage=passage, image_path="start.jpg", width=640, height=480, sha256="ab" * 32
+        )
+        self.result = OCRResult.objects.create(
+            capture=capture,
+            detected_number=7,
+            confidence=0.4,
+            engine="test",
+            bbox=[100, 100, 80, 60],
+        )
+        self.url = reverse("core:ocr_crop", args=[self.session.pk, self.result.pk])
+        self.client.force_login(
+            get_user_model().objects.create_superuser("leitung", "leitung@example.org", "geheim")
+        )
+
+    def test_crop_is_revalidated_against_its_box(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("immutable", response["Cache-Control"])
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.result.bbox = [300, 200, 80, 60]
+        self.result.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_crop_evicted_before_it_is_opened_is_rendered_again(self):
+        crop_for = derivatives.crop_for
+        calls = []
+
+        def evicted_once(result):
+            path = crop_for(result)
+            if not calls:
+                path.unlink()
+            calls.append(path)
+            return path
+
+        with mock.patch.object(derivatives, "crop_for", evicted_once):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"\xff\xd8"))
@@ -0,0 +1,19 @@
+import time
+
+from django.test import TestCase, override_settings
+
+from .base import RallyFixtureMixin
+
+
+@override_settings(RALLYCONTROL_GATE_CONFIG_WAIT_SECONDS=0.2)
+class GateConfigLongPollTests(RallyFixtureMixin, TestCase):
+    url = "/api/gates/start/config/"
+
+    def test_non_finite_wait_falls_back_to_the_maximum(self):
+        etag = self.client.get(self.url)["ETag"]
+        for wait in ("nan", "inf", "-inf", "abc"):
+            with self.subTest(wait=wait):
+                began = time.monotonic()
+                response = self.client.get(self.url, {"wait": wait}, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertLess(time.monotonic() - began, 2)
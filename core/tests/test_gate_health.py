@@ -0,0 +1,145 @@
+import datetime
+from unittest import mock
+
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .. import gate_health
+from ..gate_health import (
+    COUNT_FIELDS,
+    DEBOUNCED,
+    INVALID,
+    VALID,
+    GateHealthRollup,
+    latency_percentile,
+    signal_bucket,
+)
+from ..gate_registry import registry
+from ..models import GateHealthMinute
+from .base import RallyFixtureMixin
+
+# Recent enough to survive the retention pruning that runs on flush.
+MINUTE = gate_health.minute_of(timezone.now()) - datetime.timedelta(minutes=5)
+
+
+class BucketTests(SimpleTestCase):
+    def test_signal_bucket(self):
+        for value, bucket in (
+            (95, "good"),
+            ("70", "good"),
+            (69.9, "fair"),
+            (40, "fair"),
+            (39, "poor"),
+            (0, "poor"),
+            ("Good", "good"),
+            (" ok ", "fair"),
+            ("weak", "poor"),
+            ("BAD", "poor"),
+            (None, "unknown"),
+            ("", "unknown"),
+            ("rauschen", "unknown"),
+        ):
+            with self.subTest(value=value):
+                self.assertEqual(signal_bucket(value), bucket)
+
+    def test_latency_percentile(self):
+        totals = dict.fromkeys(gate_health.LATENCY_FIELDS, 0)
+        totals["latency_max_ms"] = 0
+        self.assertIsNone(latency_percentile(totals, 0.5))
+        totals.update(latency_le_1ms=50, latency_le_5ms=40, latency_le_100ms=8, latency_slow=2)
+        totals["latency_max_ms"] = 2400
+        self.assertEqual(latency_percentile(totals, 0.5), 1)
+        self.assertEqual(latency_percentile(totals, 0.9), 5)
+        self.assertEqual(latency_percentile(totals, 0.95), 100)
+        self.assertEqual(latency_percentile(totals, 0.99), 2400)
+        # Rows summed by the database may report None for empty buckets.
+        self.assertEqual(latency_percentile({**totals, "latency_le_5ms": None}, 0.5), 1)
+
+    def test_latency_field(self):
+        self.assertEqual(gate_health.latency_field(0.4), "latency_le_1ms")
+        self.assertEqual(gate_health.latency_field(5), "latency_le_5ms")
+        self.assertEqual(gate_health.latency_field(501), "latency_slow")
+
+
+class RollupTests(RallyFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # Deltas accumulate until flush() is called explicitly.
+        submit = mock.patch.object(gate_health.worker, "submit")
+        submit.start()
+        self.addCleanup(submit.stop)
+        self.entry = registry.get("start")
+
+    def note(self, rollup, outcome, signal=None, elapsed_ms=0.5, seconds=0):
+        now = MINUTE + datetime.timedelta(seconds=seconds)
+        rollup.note(self.entry, outcome, signal, elapsed_ms, now=now)
+
+    def row(self) -> GateHealthMinute:
+        return GateHealthMinute.objects.get(gate=self.start_gate, minute=MINUTE)
+
+    def test_flush_adds_the_deltas_of_one_minute(self):
+        rollup = GateHealthRollup()
+        self.note(rollup, VALID, 90, seconds=1)
+        self.note(rollup, VALID, "weak", elapsed_ms=12, seconds=30)
+        self.note(rollup, DEBOUNCED, seconds=59)
+        self.note(rollup, VALID, seconds=60)
+        self.assertEqual(rollup.flush(), 2)
+        row = self.row()
+        self.assertEqual((row.valid, row.debounced, row.invalid), (2, 1, 0))
+        self.assertEqual((row.signal_good, row.signal_poor, row.signal_unknown), (1, 1, 1))
+        self.assertEqual((row.latency_le_1ms, row.latency_le_20ms, row.latency_max_ms), (2, 1, 12))
+        self.assertEqual(GateHealthMinute.objects.count(), 2)
+        self.assertEqual(rollup.flush(), 0)
+
+    def test_deltas_of_concurrent_processes_are_merged(self):
+        first, second = GateHealthRollup(), GateHealthRollup()
+        self.note(first, VALID, 90, elapsed_ms=3)
+        self.note(first, INVALID, 20, elapsed_ms=700)
+        self.note(second, VALID, 50, elapsed_ms=40)
+        self.note(second, VALID, 80, elapsed_ms=0.2)
+        second.flush()
+        first.flush()
+        row = self.row()
+        self.assertEqual((row.valid, row.invalid), (3, 1))
+        self.assertEqual((row.signal_good, row.signal_fair, row.signal_poor), (2, 1, 1))
+        self.assertEqual(row.latency_max_ms, 700)
+        self.assertEqual(sum(getattr(row, field) for field in gate_health.LATENCY_FIELDS), 4)
+
+    def test_row_created_by_another_process_in_between(self):
+        rollup = GateHealthRollup()
+        self.note(rollup, VALID)
+        rollup.flush()
+        self.note(rollup, INVALID, elapsed_ms=30)
+        update = QuerySet.update
+        calls = []
+
+        def missed_first_update(queryset, **kwargs):
+            # The row does not exist yet when this process looks...
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", missed_first_update):
+            rollup.flush()
+        # ...so the insert fails on the unique constraint and is retried as update.
+        self.assertEqual(len(calls), 2)
+        row = self.row()
+        self.assertEqual((row.valid, row.invalid, row.latency_max_ms), (1, 1, 30))
+
+    def test_summary_reads_the_rollups(self):
+        rollup = GateHealthRollup()
+        for outcome in (VALID, VALID, VALID, DEBOUNCED):
+            self.note(rollup, outcome, 90)
+        rollup.flush()
+        summary = {
+            row["gate"].gate_uid: row
+            for row in gate_health.gate_health_summary(minutes=5, now=MINUTE)
+        }
+        start = summary["start"]
+        self.assertEqual((start["triggers"], start["valid"], start["debounced"]), (4, 3, 1))
+        self.assertEqual(start["problem_share"], 0.25)
+        self.assertTrue(start["warning"])
+        self.assertEqual(start["latency_p50_ms"], 1)
+        self.assertEqual(summary["finish"]["triggers"], 0)
+        self.assertIsNone(summary["finish"]["latency_p95_ms"])
+        self.assertTrue(set(COUNT_FIELDS) <= set(vars(self.row())))
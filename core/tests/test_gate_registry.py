@@ -0,0 +1,77 @@
+import threading
+import time
+
+from django.test import TestCase
+
+from ..gate_registry import GateRegistry, registry
+from ..models import ConfigVersion, Gate, Session
+from .base import RallyFixtureMixin
+
+
+class GateRegistryTests(RallyFixtureMixin, TestCase):
+    def test_lookups_are_served_from_memory(self):
+        entry = registry.get("start")
+        self.assertEqual(
+            (entry.gate_id, entry.session_id, entry.session_name, entry.stage_name),
+            (self.start_gate.pk, self.session.pk, "Lauf 1", "Bergprüfung"),
+        )
+        cached = GateRegistry(check_interval=3600)
+        cached.load()
+        with self.assertNumQueries(0):
+            self.assertEqual(cached.get("finish").gate_type, Gate.GateType.FINISH)
+            self.assertIsNone(cached.get("unbekannt"))
+            self.assertEqual(cached.running_session_for_stage(self.stage.pk), self.session.pk)
+
+    def test_other_processes_reload_after_a_version_bump(self):
+        other = GateRegistry(check_interval=0)
+        other.load()
+        # A change made by another process: no signal reaches this one.
+        Gate.objects.filter(pk=self.start_gate.pk).update(is_enabled=False)
+        self.assertTrue(other.get("start").is_enabled)
+        ConfigVersion.bump(ConfigVersion.GATE_REGISTRY)
+        self.assertFalse(other.get("start").is_enabled)
+        self.assertEqual(other.version, ConfigVersion.current(ConfigVersion.GATE_REGISTRY))
+
+    def test_version_is_only_checked_every_interval(self):
+        other = GateRegistry(check_interval=3600)
+        other.load()
+        Gate.objects.filter(pk=self.start_gate.pk).update(name="Start alt")
+        ConfigVersion.bump(ConfigVersion.GATE_REGISTRY)
+        self.assertEqual(other.get("start").name, "Start")
+        other.invalidate()
+        self.assertEqual(other.get("start").name, "Start alt")
+
+    def test_local_saves_invalidate_and_bump_the_version(self):
+        version = ConfigVersion.current(ConfigVersion.GATE_REGISTRY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.start_gate.debounce_ms = 1234
+            self.start_gate.save()
+        self.assertEqual(registry.get("start").debounce_ms, 1234)
+        self.assertGreater(ConfigVersion.current(ConfigVersion.GATE_REGISTRY), version)
+
+    def test_newest_running_session_of_a_stage_is_routed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            later = Session.objects.create(
+                stage=self.stage,
+                name="Lauf 2",
+                status=Session.Status.RUNNING,
+                start_time=self.session.created_at,
+            )
+            self.session.status = Session.Status.FINISHED
+            self.session.save()
+        self.assertEqual(registry.get("finish").session_id, later.pk)
+        self.assertEqual(registry.get("finish").session_name, "Lauf 2")
+
+    def test_invalidation_wakes_waiting_long_polls(self):
+        woken = threading.Event()
+
+        def wait():
+            registry.wait_for_change(timeout=10)
+            woken.set()
+
+        thread = threading.Thread(target=wait)
+        thread.start()
+        time.sleep(0.05)
+        registry.invalidate()
+        thread.join(timeout=5)
+        self.assertTrue(woken.is_set())
@@ -0,0 +1,128 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import get_resolver
+
+from .. import start_list, timing
+from ..background import worker
+from ..models import Driver, Passage, Run
+from .base import RallyFixtureMixin
+
+
+class ConcurrentIngestTests(RallyFixtureMixin, TransactionTestCase):
+    """Gates and the background worker write to the database at the same time."""
+
+    settings_overrides = {
+        **RallyFixtureMixin.settings_overrides,
+        "RALLYCONTROL_BACKGROUND_EAGER": False,
+    }
+    runs = 30
+
+    def setUp(self):
+        super().setUp()
+        for number in range(len(self.drivers) + 1, self.runs + 1):
+            Driver.objects.create(
+                first_name=f"Fahrer{number}", last_name="Test", default_start_number=number
+            )
+        start_list.create_start_list(self.session)
+        worker.join()
+
+    def test_start_and_finish_passages_are_all_stored_and_matched(self):
+        base_ms = 1_750_000_000_000
+        started = [threading.Event() for _ in range(self.runs)]
+        statuses = []
+
+        def gate(gate_uid, offset_ms, wait_for=None, mark=None):
+            client = Client()
+            try:
+                for index in range(self.runs):
+                    if wait_for is not None:
+                        wait_for[index].wait(timeout=30)
+                    response = self.post_passage(
+                        gate_uid, base_ms + offset_ms + index * 1000, client=client
+                    )
+                    statuses.append(response.status_code)
+                    if mark is not None:
+                        mark[index].set()
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=gate, args=("start", 0), kwargs={"mark": started}),
+            threading.Thread(
+                target=gate, args=("finish", 60_000), kwargs={"wait_for": started}
+            ),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        worker.join()
+
+        self.assertEqual(statuses, [201] * (2 * self.runs))
+        self.assertEqual(Passage.objects.filter(run__isnull=True).count(), 0)
+        self.assertEqual(
+            Run.objects.filter(session=self.session, status=Run.Status.FINISHED).count(),
+            self.runs,
+        )
+        self.assertEqual(
+            set(Run.objects.values_list("final_time_ms", flat=True)), {60_000}
+        )
+
+
+class FinishMatchingTests(RallyFixtureMixin, TestCase):
+    def test_running_run_without_start_time_is_skipped(self):
+        Run.objects.create(
+            session=self.session, driver=self.drivers[0], status=Run.Status.RUNNING
+        )
+        run = Run.objects.create(
+            session=self.session,
+            driver=self.drivers[1],
+            status=Run.Status.RUNNING,
+            started_at=timing.ms_to_datetime(1_750_000_000_000),
+        )
+        response = self.post_passage("finish", 1_750_000_042_000)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Passage.objects.get(pk=response.json()["passage_id"]).run_id, run.pk)
+        run.refresh_from_db()
+        self.assertEqual(run.final_time_ms, 42_000)
+
+
+@override_settings(ROOT_URLCONF="rallycontrol.ingest_urls")
+class IngestProcessTests(RallyFixtureMixin, TestCase):
+    def test_urlconf_serves_only_the_gate_api(self):
+        routes = [str(pattern.pattern) for pattern in get_resolver().url_patterns]
+        self.assertTrue(routes)
+        self.assertTrue(all(route.startswith("api/gates/") for route in routes), routes)
+        self.assertEqual(self.post_passage("start", 1_750_000_000_000).status_code, 201)
+        self.assertEqual(self.client.get("/api/gates/start/config/").status_code, 200)
+        for url in ("/admin/", "/", "/gate-health/", f"/kiosk/sessions/{self.session.pk}/"):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_startup_only_boots_and_exits(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": "rallycontrol.ingest_settings",
+                # An empty database: the registry then loads on first use.
+                "RALLYCONTROL_DB": os.path.join(directory, "db.sqlite3"),
+                "RALLYCONTROL_KIOSK_DB": os.path.join(directory, "kiosk.sqlite3"),
+            }
+            result = subprocess.run(
+                [sys.executable, "-m", "rallycontrol.ingest_server", "--startup-only"],
+                cwd=settings.BASE_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+                timeout=60,
+            )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertRegex(result.stderr, r"Ingest ready in \d+ ms \(\d+ modules\)")
+        self.assertNotIn("Listening", result.stderr)
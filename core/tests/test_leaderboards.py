@@ -0,0 +1,140 @@
+import datetime
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import leaderboards
+from ..models import Driver, Leaderboard, RaceClass, Run, Session, Vehicle
+from .base import RallyFixtureMixin
+
+T0 = datetime.datetime(2026, 6, 1, 10, 0, tzinfo=datetime.timezone.utc)
+
+
+class BuildBoardsTests(RallyFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.two_wd = RaceClass.objects.create(name="2WD")
+        self.empty = RaceClass.objects.create(name="Historisch")
+        self.guest = Driver.objects.create(
+            first_name="Gast", last_name="Test", race_class=self.two_wd, default_start_number=9
+        )
+        # The vehicle's class wins over the driver's class.
+        vehicle = Vehicle.objects.create(
+            driver=self.drivers[0], name="Golf", race_class=self.two_wd
+        )
+        self.runs = {}
+        for key, driver, final_ms, status in (
+            ("vehicle", self.drivers[0], 52_000, Run.Status.FINISHED),
+            ("best", self.drivers[1], 50_000, Run.Status.FINISHED),
+            ("slower", self.drivers[1], 55_000, Run.Status.FINISHED),
+            ("second", self.drivers[2], 51_000, Run.Status.FINISHED),
+            ("dnf", self.drivers[3], None, Run.Status.DNF),
+            ("guest", self.guest, 53_000, Run.Status.FINISHED),
+        ):
+            self.runs[key] = Run.objects.create(
+                session=self.session,
+                driver=driver,
+                vehicle=vehicle if key == "vehicle" else None,
+                status=status,
+                total_time_ms=final_ms,
+                final_time_ms=final_ms,
+            )
+
+    def positions(self, board: dict) -> list[tuple]:
+        return [(entry["position"], entry["run_id"]) for entry in board["entries"]]
+
+    def test_one_scan_builds_every_class_board(self):
+        classes = [self.race_class, self.two_wd, self.empty]
+        session = Session.objects.select_related("stage__event").get(pk=self.session.pk)
+        with self.assertNumQueries(2):
+            boards = leaderboards.build_boards(session, classes)
+        runs = {key: run.pk for key, run in self.runs.items()}
+        self.assertEqual(set(boards), {None, self.race_class.pk, self.two_wd.pk, self.empty.pk})
+        self.assertEqual(
+            self.positions(boards[None]),
+            [
+                (1, runs["best"]),
+                (2, runs["second"]),
+                (3, runs["vehicle"]),
+                (4, runs["guest"]),
+                (None, runs["dnf"]),
+            ],
+        )
+        self.assertEqual(
+            self.positions(boards[self.race_class.pk]),
+            [(1, runs["best"]), (2, runs["second"]), (None, runs["dnf"])],
+        )
+        self.assertEqual(
+            self.positions(boards[self.two_wd.pk]), [(1, runs["vehicle"]), (2, runs["guest"])]
+        )
+        self.assertEqual(boards[self.empty.pk]["entries"], [])
+        self.assertEqual(boards[self.two_wd.pk]["race_class_id"], self.two_wd.pk)
+        self.assertEqual(
+            leaderboards.build_board(self.session, self.two_wd), boards[self.two_wd.pk]
+        )
+
+    def test_only_changed_boards_are_stored(self):
+        boards = leaderboards.build_boards(self.session, [self.race_class, self.two_wd])
+        stored = leaderboards.store_snapshots(self.session, boards)
+        self.assertEqual(len(stored), 3)
+        self.assertTrue(all(board.is_checkpoint for board in stored))
+        self.assertEqual(leaderboards.store_snapshots(self.session, boards), [])
+
+        Run.objects.filter(pk=self.runs["guest"].pk).update(final_time_ms=49_000)
+        boards = leaderboards.build_boards(self.session, [self.race_class, self.two_wd])
+        stored = leaderboards.store_snapshots(self.session, boards)
+        self.assertEqual({board.race_class_id for board in stored}, {None, self.two_wd.pk})
+        self.assertEqual(stored[0].data_json["entries"][0]["run_id"], self.runs["guest"].pk)
+        # Within the checkpoint interval the new boards are not checkpoints.
+        self.assertFalse(any(board.is_checkpoint for board in stored))
+
+
+@override_settings(RALLYCONTROL_LEADERBOARD_CHECKPOINT_SECONDS=60)
+class RetentionTests(RallyFixtureMixin, TestCase):
+    def store(self, seconds: int, value: int) -> list[Leaderboard]:
+        # The class board stays the same; only the overall board changes.
+        boards = {None: {"value": value}, self.race_class.pk: {"value": 0}}
+        with mock.patch.object(timezone, "now", return_value=T0 + self.at(seconds)):
+            with self.captureOnCommitCallbacks(execute=True):
+                return leaderboards.store_snapshots(self.session, boards)
+
+    @staticmethod
+    def at(seconds: int) -> datetime.timedelta:
+        return datetime.timedelta(seconds=seconds)
+
+    def retained(self, race_class=None) -> list[tuple[int, bool]]:
+        return [
+            (int((board.generated_at - T0).total_seconds()), board.is_checkpoint)
+            for board in Leaderboard.objects.filter(
+                session=self.session, race_class=race_class
+            ).order_by("generated_at")
+        ]
+
+    def test_latest_board_and_one_checkpoint_per_interval_are_kept(self):
+        for seconds in (0, 10, 20, 70, 80, 90):
+            self.store(seconds, seconds)
+        self.assertEqual(self.retained(), [(0, True), (70, True), (90, False)])
+        # The class board never changed; its first board is also the latest.
+        self.assertEqual(self.retained(self.race_class), [(0, True)])
+
+    def test_leaderboard_at_returns_the_nearest_retained_board(self):
+        for seconds in (0, 10, 20, 70, 80):
+            self.store(seconds, seconds)
+        for seconds, expected in ((15, 0), (69, 0), (75, 70), (80, 80), (3600, 80)):
+            with self.subTest(seconds=seconds):
+                board = leaderboards.leaderboard_at(self.session, None, T0 + self.at(seconds))
+                self.assertEqual(board.data_json, {"value": expected})
+        self.assertIsNone(leaderboards.leaderboard_at(self.session, None, T0 - self.at(1)))
+        board = leaderboards.leaderboard_at(self.session.pk, self.race_class, T0 + self.at(75))
+        self.assertEqual(board.data_json, {"value": 0})
+
+    def test_finished_session_keeps_its_final_boards(self):
+        for seconds in (0, 10):
+            self.store(seconds, seconds)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(leaderboards.finalize_session_boards(self.session.pk), 2)
+        self.session.status = Session.Status.FINISHED
+        self.session.save()
+        self.store(20, 20)
+        self.assertEqual(self.retained(), [(0, True), (10, True), (20, True)])
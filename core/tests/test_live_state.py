@@ -0,0 +1,108 @@
+from django.test import SimpleTestCase, TestCase
+
+from .. import timing
+from ..live_state import (
+    EMPTY_COLUMN_BYTES,
+    QUEUED,
+    LiveRun,
+    LiveSession,
+    live_sessions,
+    live_state_key,
+)
+from ..models import ConfigVersion, Gate, KioskRunState, Passage, Run
+from ..routers import KIOSK_DB
+from .base import RallyFixtureMixin
+
+BASE_MS = 1_750_000_000_000
+
+
+class LiveStateMatchingTests(RallyFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.run = Run.objects.create(
+            session=self.session,
+            driver=self.drivers[0],
+            status=Run.Status.QUEUED,
+            start_position=1,
+        )
+
+    def test_finish_matches_a_run_started_by_another_process(self):
+        live_sessions.get(self.session.pk)
+        # Another ingest process starts the run: no signal reaches this one.
+        Run.objects.filter(pk=self.run.pk).update(
+            status=Run.Status.RUNNING, started_at=timing.ms_to_datetime(BASE_MS)
+        )
+        Passage.objects.create(
+            session=self.session, gate=self.start_gate, run=self.run, timestamp_ms=BASE_MS
+        )
+
+        response = self.post_passage("finish", BASE_MS + 42_000)
+
+        self.assertEqual(Passage.objects.get(pk=response.json()["passage_id"]).run_id, self.run.pk)
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.final_time_ms, 42_000)
+
+    def test_checkpoint_splits_are_published_from_the_live_state(self):
+        checkpoint = Gate.objects.create(
+            gate_uid="split1",
+            name="Kehre",
+            stage=self.stage,
+            gate_type=Gate.GateType.CHECKPOINT,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_passage("start", BASE_MS)
+            self.post_passage("split1", BASE_MS + 20_000)
+            # Second trigger of the same checkpoint: the run has already passed it.
+            self.post_passage("split1", BASE_MS + 25_000)
+
+        passages = Passage.objects.filter(gate=checkpoint).order_by("timestamp_ms")
+        self.assertEqual([passage.run_id for passage in passages], [self.run.pk, None])
+        state = KioskRunState.objects.using(KIOSK_DB).get(run_id=self.run.pk)
+        self.assertEqual(state.splits, [{"gate": "Kehre", "timestamp_ms": BASE_MS + 20_000}])
+
+    def test_only_live_fields_bump_the_session_version(self):
+        key = live_state_key(self.session.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run.comment = "Reifenwechsel"
+            self.run.save()
+        self.assertEqual(ConfigVersion.current(key), 0)
+        self.assertEqual(ConfigVersion.current(ConfigVersion.LIVE_STATE), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run.penalty_ms = 5_000
+            self.run.save()
+        self.assertEqual(ConfigVersion.current(key), 1)
+        self.assertEqual(ConfigVersion.current(ConfigVersion.LIVE_STATE), 0)
+
+
+class MemoryUsageTests(SimpleTestCase):
+    # Documented in the README: 16 to 18 bytes per passage in the columns.
+    max_bytes_per_passage = 18
+
+    def session(self, passages: int) -> LiveSession:
+        session = LiveSession(1)
+        for index in range(100):
+            session.add_run(LiveRun(index, index, index + 1, QUEUED, None, None, 0))
+        for index in range(passages):
+            run = session.runs[index % 100] if index % 10 else None
+            session.add_passage(index % 4, BASE_MS + index * 250, run)
+        return session
+
+    def test_large_session_stays_within_the_documented_bound(self):
+        for passages in (20_000, 50_000, 100_000):
+            with self.subTest(passages=passages):
+                usage = self.session(passages).memory_usage()
+                self.assertEqual(usage["passages"], passages)
+                self.assertGreaterEqual(usage["bytes_per_passage"], 16)
+                self.assertLessEqual(usage["bytes_per_passage"], self.max_bytes_per_passage)
+
+    def test_fixed_costs_are_reported_separately(self):
+        empty = LiveSession(1).memory_usage()
+        self.assertEqual(empty["passage_bytes"], EMPTY_COLUMN_BYTES)
+        self.assertEqual(empty["passage_fixed_bytes"], EMPTY_COLUMN_BYTES)
+        self.assertEqual(empty["bytes_per_passage"], 0.0)
+        usage = self.session(10).memory_usage()
+        self.assertEqual(
+            usage["passage_bytes"],
+            usage["passage_fixed_bytes"] + round(usage["bytes_per_passage"] * 10),
+        )
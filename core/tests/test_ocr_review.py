@@ -0,0 +1,162 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import ocr_review
+from ..models import Capture, OCRResult, Passage, Run, Session
+from .base import RallyFixtureMixin
+
+T0 = timezone.now().replace(microsecond=0)
+
+
+class ReviewFixtureMixin(RallyFixtureMixin):
+    def add_result(self, session=None, run=None, status=OCRResult.Status.LOW_CONFIDENCE, **fields):
+        session = session or self.session
+        passage = Passage.objects.create(
+            session=session, gate=self.finish_gate, run=run, timestamp_ms=1_750_000_000_000
+        )
+        capture = Capture.objects.create(passage=passage, image_path="finish.jpg")
+        return OCRResult.objects.create(
+            capture=capture, confidence=0.4, engine="test", status=status, **fields
+        )
+
+
+class ReviewQueueTests(ReviewFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = Session.objects.create(
+            stage=self.stage, name="Lauf 2", status=Session.Status.RUNNING
+        )
+        finished = Session.objects.create(
+            stage=self.stage, name="Lauf 0", status=Session.Status.FINISHED
+        )
+        self.expected = []
+        for index in range(9):
+            result = self.add_result(
+                session=self.other if index % 3 == 0 else self.session,
+                status=OCRResult.Status.FAILED if index % 2 else OCRResult.Status.LOW_CONFIDENCE,
+            )
+            # Five results share a timestamp; the pk breaks the tie.
+            created_at = T0 if index < 5 else T0 - datetime.timedelta(seconds=index)
+            OCRResult.objects.filter(pk=result.pk).update(created_at=created_at)
+            self.expected.append((created_at, result.pk))
+        self.expected.sort(reverse=True)
+        # Not in the queue: confident, already reviewed, or not running.
+        self.add_result(status=OCRResult.Status.OK)
+        self.add_result(reviewed_at=timezone.now())
+        self.add_result(session=finished)
+
+    def test_keyset_pages_cover_the_queue_once(self):
+        pages, cursor = [], None
+        while True:
+            rows, cursor = ocr_review.review_page(cursor, limit=2)
+            pages.append([(row.created_at, row.pk) for row in rows])
+            if cursor is None:
+                break
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 2, 1])
+        self.assertEqual([row for page in pages for row in page], self.expected)
+
+    def test_cursor_round_trip(self):
+        rows, cursor = ocr_review.review_page(limit=3)
+        self.assertEqual(ocr_review.decode_cursor(cursor), self.expected[2])
+        self.assertEqual(cursor, ocr_review.encode_cursor(rows[-1]))
+        with self.assertRaises(ocr_review.ReviewError):
+            ocr_review.decode_cursor("gestern")
+
+    def test_queue_reads_the_index_without_a_join(self):
+        queryset = ocr_review.open_results(
+            OCRResult.Status.FAILED, "default", [self.session.pk]
+        ).order_by("-created_at", "-pk")
+        self.assertNotIn("JOIN", str(queryset.query))
+        self.assertIn("ocr_review_queue_idx", queryset.explain())
+
+    def test_results_carry_the_session_of_their_passage(self):
+        pairs = OCRResult.objects.values_list("session_id", "capture__passage__session_id")
+        self.assertEqual(len(pairs), 12)
+        self.assertTrue(all(copied == session_id for copied, session_id in pairs))
+
+
+class AssignTests(ReviewFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_superuser(
+            "leitung", "leitung@example.org", "geheim"
+        )
+        self.seven = Run.objects.create(
+            session=self.session, driver=self.drivers[0], start_number_used=7
+        )
+        self.twelve = Run.objects.create(
+            session=self.session, driver=self.drivers[1], start_number_used=12
+        )
+        self.result = self.add_result(run=self.seven, detected_number=7)
+        self.second = OCRResult.objects.create(
+            capture=self.result.capture,
+            confidence=0.2,
+            engine="other",
+            status=OCRResult.Status.FAILED,
+        )
+        regeneration = mock.patch.object(ocr_review, "schedule_regeneration")
+        self.regenerate = regeneration.start()
+        self.addCleanup(regeneration.stop)
+
+    def assign(self, start_number, **kwargs):
+        return ocr_review.assign(self.result, start_number, user=self.user, **kwargs)
+
+    def test_passage_moves_to_the_run_with_the_number(self):
+        run = self.assign(12)
+        self.assertEqual(run, self.twelve)
+        passage = Passage.objects.get(captures=self.result.capture_id)
+        self.assertEqual(passage.run_id, self.twelve.pk)
+        self.twelve.refresh_from_db()
+        self.assertEqual(self.twelve.start_number_source, Run.StartNumberSource.MANUAL_OVERRIDE)
+        self.assertEqual(self.twelve.version, 1)
+        self.regenerate.assert_called_once_with(self.session.pk)
+        # Every open result of the capture is resolved.
+        self.assertEqual(
+            set(
+                OCRResult.objects.filter(capture=self.result.capture_id).values_list(
+                    "corrected_number", "reviewed_by"
+                )
+            ),
+            {(12, self.user.pk)},
+        )
+        self.assertFalse(ocr_review.open_results(session_ids=[self.session.pk]).exists())
+
+    def test_wrong_number_of_the_linked_run_is_corrected(self):
+        run = self.assign(33)
+        self.assertEqual(run, self.seven)
+        self.seven.refresh_from_db()
+        self.assertEqual(self.seven.start_number_used, 33)
+        self.assertEqual(self.seven.start_number_source, Run.StartNumberSource.MANUAL_OVERRIDE)
+        passage = Passage.objects.get(captures=self.result.capture_id)
+        self.assertEqual(passage.run_id, self.seven.pk)
+
+    def test_explicit_run_must_belong_to_the_session(self):
+        other = Session.objects.create(stage=self.stage, name="Lauf 2")
+        foreign = Run.objects.create(session=other, driver=self.drivers[2], start_number_used=12)
+        with self.assertRaises(ocr_review.ReviewError):
+            self.assign(12, run_id=foreign.pk)
+        self.assertEqual(self.assign(12, run_id=self.twelve.pk), self.twelve)
+
+    def test_unknown_number_without_a_linked_run_is_refused(self):
+        self.result = self.add_result(detected_number=99)
+        with self.assertRaises(ocr_review.ReviewError):
+            self.assign(99)
+        self.assertIsNone(OCRResult.objects.get(pk=self.result.pk).reviewed_at)
+
+    def test_dismiss_resolves_the_capture_without_changes(self):
+        self.assertEqual(ocr_review.dismiss(self.result, user=self.user), 2)
+        self.assertEqual(
+            set(
+                OCRResult.objects.filter(capture=self.result.capture_id).values_list(
+                    "corrected_number", "reviewed_by"
+                )
+            ),
+            {(None, self.user.pk)},
+        )
+        self.seven.refresh_from_db()
+        self.assertEqual(self.seven.version, 0)
+        self.regenerate.assert_not_called()
@@ -0,0 +1,107 @@
+import tempfile
+from pathlib import Path
+
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TransactionTestCase
+
+from .. import start_list
+from ..compression import payload_cache
+from ..kiosk_snapshot import publish_session
+from ..models import KioskSession, Passage
+from ..routers import KIOSK_READ_DB
+from .base import RallyFixtureMixin
+
+PUBLIC_URLS = (
+    "/kiosk/sessions/{pk}/",
+    "/overlay/sessions/{pk}/",
+    "/overlay/sessions/{pk}/live/",
+    "/overlay/sessions/{pk}/feed/",
+    "/api/sessions/{pk}/status/",
+)
+
+
+class PublicViewsBeforeFirstPublishTests(RallyFixtureMixin, TransactionTestCase):
+    # The publisher and the read-only views use separate connections, so the
+    # snapshot must be committed to be visible.
+
+    def assert_all(self, status_code, session_id=None):
+        for url in PUBLIC_URLS:
+            with self.subTest(url=url):
+                response = self.client.get(url.format(pk=session_id or self.session.pk))
+                self.assertEqual(response.status_code, status_code)
+
+    def test_missing_snapshot_file_is_unavailable(self):
+        # A fresh installation: the publisher has not created the file yet.
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        missing = Path(directory.name) / "kiosk_snapshot.sqlite3"
+        reader = connections[KIOSK_READ_DB]
+        missing_reader = DatabaseWrapper(
+            {**reader.settings_dict, "NAME": f"file:{missing}?mode=ro"}, KIOSK_READ_DB
+        )
+        connections[KIOSK_READ_DB] = missing_reader
+        self.addCleanup(connections.__setitem__, KIOSK_READ_DB, reader)
+        self.addCleanup(missing_reader.close)
+        self.assert_all(503)
+        response = self.client.get(f"/overlay/sessions/{self.session.pk}/live/")
+        self.assertEqual(response["Retry-After"], "5")
+        self.assertFalse(missing.exists())
+
+    def test_unpublished_session_is_not_found(self):
+        self.assert_all(404, session_id=self.session.pk + 1)
+
+    def test_published_session_is_served(self):
+        publish_session(self.session.pk)
+        self.assert_all(200)
+
+    def test_live_feed_is_in_server_time(self):
+        start_list.create_start_list(self.session)
+        response = self.post_passage("start", 1_750_000_000_000)
+        passage = Passage.objects.get(pk=response.json()["passage_id"])
+        publish_session(self.session.pk)
+
+        feed = self.client.get(f"/overlay/sessions/{self.session.pk}/live/").json()
+        self.assertEqual(set(feed["clock"]), {"server_ms"})
+        started = [run["started_ms"] for run in feed["runs"] if run["status"] == "running"]
+        self.assertEqual(started, [passage.timestamp_ms])
+
+
+class PublicCacheVersionTests(RallyFixtureMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        payload_cache.clear()
+        self.addCleanup(payload_cache.clear)
+        publish_session(self.session.pk)
+
+    def etags(self) -> tuple[str, str]:
+        kiosk = self.client.get(f"/kiosk/sessions/{self.session.pk}/")
+        status = self.client.get(f"/api/sessions/{self.session.pk}/status/")
+        return kiosk["ETag"], status["ETag"]
+
+    def test_republishing_unchanged_boards_keeps_the_kiosk_page(self):
+        kiosk, status = self.etags()
+        publish_session(self.session.pk)
+        republished_kiosk, republished_status = self.etags()
+        self.assertEqual(republished_kiosk, kiosk)
+        self.assertNotEqual(republished_status, status)
+        response = self.client.get(
+            f"/kiosk/sessions/{self.session.pk}/", headers={"If-None-Match": kiosk}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_changed_start_list_moves_the_board_version(self):
+        kiosk, _status = self.etags()
+        start_list.create_start_list(self.session)
+        publish_session(self.session.pk)
+        board_version = KioskSession.objects.get(session_id=self.session.pk).board_version
+        self.assertEqual(self.etags()[0], f'W/"kiosk-{self.session.pk}-{board_version}"')
+        self.assertNotEqual(self.etags()[0], kiosk)
+        self.assertContains(self.client.get(f"/kiosk/sessions/{self.session.pk}/"), "Startliste")
+
+    def test_renamed_session_moves_the_board_version(self):
+        kiosk, _status = self.etags()
+        self.session.name = "Finale"
+        self.session.save()
+        publish_session(self.session.pk)
+        self.assertNotEqual(self.etags()[0], kiosk)
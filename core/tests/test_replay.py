@@ -0,0 +1,107 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from .. import corrections, start_list
+from ..clock_sync import clocks
+from ..gate_registry import registry
+from ..models import Run, Session
+from ..recorder import log_path, read_log, recorder
+from ..replay import EventSnapshot, Replayer, replay
+from .base import RallyFixtureMixin
+
+START_MS = 1_750_000_000_000
+
+
+class RecordingMixin(RallyFixtureMixin):
+    def setUp(self):
+        super().setUp()
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        overrides = override_settings(
+            RALLYCONTROL_RECORD_GATE_MESSAGES=True, RALLYCONTROL_RECORD_DIR=self.directory
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(recorder.close)
+
+    def heartbeat(self, t1: int, offset_ms: int, gate_uid: str = "finish"):
+        payload = {
+            "t1": t1 + 2000,
+            "previous": {
+                "t1": t1,
+                "t2": t1 + 5 + offset_ms,
+                "t3": t1 + 6 + offset_ms,
+                "t4": t1 + 11,
+            },
+        }
+        response = self.client.post(
+            f"/api/gates/{gate_uid}/heartbeat/",
+            json.dumps(payload),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class RecordedHeartbeatTests(RecordingMixin, TestCase):
+    def test_replayed_heartbeats_normalise_like_ingest(self):
+        for index in range(16):
+            self.heartbeat(START_MS + index * 2000, 250)
+        entry = registry.get("finish")
+        live = clocks.normalize(entry, START_MS + 60_000)
+
+        messages = read_log(log_path(self.event.pk))
+        self.assertEqual([message["kind"] for message in messages], ["heartbeat"] * 16)
+        clocks.reset()
+        report = Replayer(EventSnapshot(self.event.pk), speed=None).run(messages)
+        self.assertEqual(report.heartbeats, 16)
+        self.assertEqual(report.skipped, 0)
+        self.assertEqual(clocks.normalize(entry, START_MS + 60_000), live)
+
+
+class ReplayedDayTests(RecordingMixin, TransactionTestCase):
+    """A small recorded race day replayed into a fresh database."""
+
+    def record_day(self):
+        start_list.create_start_list(self.session)
+        for gate_uid in ("start", "finish"):
+            self.heartbeat(START_MS - 10_000, 0, gate_uid)
+        for index in range(4):
+            response = self.post_passage("start", START_MS + index * 10_000)
+            self.assertEqual(response.status_code, 201)
+        # A bounce of the start light barrier is suppressed by debounce.
+        self.post_passage("start", START_MS + 30_020)
+        for index, duration_ms in enumerate((61_000, 59_500, 63_250)):
+            self.post_passage("finish", START_MS + index * 10_000 + duration_ms)
+        runs = list(Run.objects.filter(session=self.session).order_by("start_position"))
+        corrections.set_status([runs[1].pk], Run.Status.DSQ, session=self.session)
+        corrections.dnf_running_runs(self.session)
+        self.session.status = Session.Status.FINISHED
+        self.session.save()
+        return runs
+
+    def test_replay_reproduces_the_results(self):
+        runs = self.record_day()
+        self.assertEqual(
+            [Run.objects.get(pk=run.pk).status for run in runs],
+            [Run.Status.FINISHED, Run.Status.DSQ, Run.Status.FINISHED, Run.Status.DNF],
+        )
+        messages = read_log(log_path(self.event.pk))
+        self.assertEqual(len(messages), 10)
+
+        report = replay(messages, self.event.pk, self.directory / "replay", speed=None)
+        self.assertEqual(report.diffs, [])
+        self.assertEqual(report.messages, 10)
+        self.assertEqual(report.heartbeats, 2)
+        self.assertEqual(report.accepted, 7)
+        self.assertEqual(report.suppressed, 1)
+        self.assertEqual(report.skipped, 0)
+        self.assertEqual(report.rejected, {})
+        self.assertEqual(len(report.latencies_ms), 8)
+        self.assertGreater(report.throughput, 0)
+        # The source database is untouched by the replay.
+        self.assertEqual(Run.objects.get(pk=runs[0].pk).final_time_ms, 61_000)
+        self.assertTrue((self.directory / "replay" / "replay.sqlite3").exists())
@@ -0,0 +1,155 @@
+import datetime
+
+from django.test import TestCase, override_settings
+
+from .. import corrections, replication, start_list
+from ..models import (
+    ChangeLogEntry,
+    Passage,
+    ReplicatedObject,
+    ReplicationCursor,
+    Run,
+    Session,
+)
+from .base import RallyFixtureMixin
+
+STAGE_NODE = {
+    "RALLYCONTROL_NODE_ID": "stage1",
+    "RALLYCONTROL_CENTRAL_URL": "http://central.invalid",
+}
+
+
+class ReplicationMixin(RallyFixtureMixin):
+    """Stage node and central node share one test database here.
+
+    Central copies are new rows; ``ReplicatedObject`` tells them apart from
+    the stage rows they were copied from.
+    """
+
+    def setUp(self):
+        super().setUp()
+        start_list.create_start_list(self.session)
+
+    def ship(self) -> int:
+        """Push the stage's change log and apply it as the central node."""
+        with override_settings(**STAGE_NODE):
+            batch = replication.outbound_batch(replication.pending_entries(1000))
+        acked = replication.apply_batch(batch["node_id"], batch["entries"])
+        ReplicationCursor.objects.filter(node_id=replication.OUTBOUND_CURSOR).update(
+            last_seq=acked
+        )
+        return acked
+
+    def central_id(self, model: str, remote_id: int) -> int:
+        return ReplicatedObject.objects.get(
+            node_id="stage1", model=model, remote_id=remote_id
+        ).local_id
+
+
+class ReplicationRoundTripTests(ReplicationMixin, TestCase):
+    def test_start_and_finish_passages_keep_their_run(self):
+        with override_settings(**STAGE_NODE):
+            for index in range(2):
+                self.post_passage("start", 1_750_000_000_000 + index * 10_000)
+            for index in range(2):
+                self.post_passage("finish", 1_750_000_050_000 + index * 10_000)
+        stage_passages = list(Passage.objects.order_by("pk"))
+        self.assertTrue(all(passage.run_id for passage in stage_passages))
+        self.assertGreater(self.ship(), 0)
+
+        for passage in stage_passages:
+            copy = Passage.objects.get(pk=self.central_id("passage", passage.pk))
+            self.assertEqual(copy.run_id, self.central_id("run", passage.run_id))
+            self.assertEqual(copy.timestamp_ms, passage.timestamp_ms)
+        for run_id in {passage.run_id for passage in stage_passages}:
+            copy = Run.objects.get(pk=self.central_id("run", run_id))
+            self.assertEqual(copy.status, Run.Status.FINISHED)
+            self.assertEqual(copy.final_time_ms, 50_000)
+
+    def test_run_change_is_logged_before_the_start_passage(self):
+        with override_settings(**STAGE_NODE):
+            self.post_passage("start", 1_750_000_000_000)
+        self.assertEqual(
+            list(ChangeLogEntry.objects.values_list("model", flat=True)), ["run", "passage"]
+        )
+
+
+class RunConflictRuleTests(ReplicationMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        with override_settings(**STAGE_NODE):
+            self.post_passage("start", 1_750_000_000_000)
+            self.post_passage("finish", 1_750_000_050_000)
+        self.stage_run_id = Passage.objects.get(gate=self.finish_gate).run_id
+        self.ship()
+        self.central_run_id = self.central_id("run", self.stage_run_id)
+        self.stage_session_id = self.session.pk
+        self.central_session_id = self.central_run().session_id
+
+    def central_run(self) -> Run:
+        return Run.objects.get(pk=self.central_run_id)
+
+    def test_stage_penalty_keeps_status_corrected_on_central(self):
+        corrections.set_status(
+            [self.central_run_id], Run.Status.DSQ, session=self.central_session_id
+        )
+        with override_settings(**STAGE_NODE):
+            corrections.add_penalty([self.stage_run_id], 5000, session=self.stage_session_id)
+        self.assertEqual(
+            ChangeLogEntry.objects.latest("pk").manual_fields, ["penalty_ms", "final_time_ms"]
+        )
+        self.ship()
+        run = self.central_run()
+        self.assertEqual(run.status, Run.Status.DSQ)
+        self.assertEqual(run.penalty_ms, 5000)
+        self.assertEqual(run.final_time_ms, 55_000)
+
+    def test_later_manual_change_of_the_same_field_wins(self):
+        corrections.set_status(
+            [self.central_run_id], Run.Status.DSQ, session=self.central_session_id
+        )
+        with override_settings(**STAGE_NODE):
+            corrections.set_status(
+                [self.stage_run_id], Run.Status.DNF, session=self.stage_session_id
+            )
+        self.ship()
+        self.assertEqual(self.central_run().status, Run.Status.DNF)
+
+    def test_automatic_change_keeps_manual_corrections(self):
+        corrections.add_penalty(
+            [self.central_run_id], 10_000, session=self.central_session_id
+        )
+        with override_settings(**STAGE_NODE):
+            Run.objects.filter(pk=self.stage_run_id).update(comment="Gate")
+            replication.record_bulk_changes(Run, [self.stage_run_id])
+        self.ship()
+        run = self.central_run()
+        self.assertEqual(run.comment, "Gate")
+        self.assertEqual(run.penalty_ms, 10_000)
+        self.assertEqual(run.final_time_ms, 60_000)
+
+
+class StartListReplicationTests(ReplicationMixin, TestCase):
+    def test_bulk_start_list_changes_are_shipped(self):
+        runs = list(start_list.start_list(self.session))
+        with override_settings(**STAGE_NODE):
+            start_list.reorder_start_list(self.session, [runs[-1].pk])
+            start_list.predict_start_times(
+                self.session, datetime.datetime(2026, 6, 1, 10, tzinfo=datetime.timezone.utc)
+            )
+            added = start_list.create_start_list(self.session, order_by="last_name")
+        self.assertEqual(added, [])
+        self.assertEqual(ChangeLogEntry.objects.filter(model="run").count(), 2 * len(runs))
+        self.ship()
+        copy = Run.objects.get(pk=self.central_id("run", runs[-1].pk))
+        self.assertEqual(copy.start_position, 1)
+        self.assertEqual(copy.planned_start_at.hour, 10)
+
+    def test_created_runs_are_logged(self):
+        session = Session.objects.create(stage=self.stage, name="Lauf 2")
+        with override_settings(**STAGE_NODE):
+            created = start_list.create_start_list(session)
+        self.assertEqual(
+            set(ChangeLogEntry.objects.values_list("object_id", flat=True)),
+            {run.pk for run in created},
+        )
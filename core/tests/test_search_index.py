@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from ..background import worker
+from ..models import ConfigVersion, Driver, Vehicle
+from ..search_index import DRIVER, VEHICLE, search_index
+from .base import RallyFixtureMixin
+
+
+class SearchIndexTests(RallyFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.mueller = Driver.objects.create(
+            first_name="Jürgen",
+            last_name="Müller",
+            team="Racing Wolfsberg",
+            default_start_number=17,
+            transponder_id="TX-4711",
+        )
+        self.muellner = Driver.objects.create(
+            first_name="Anna", last_name="Müllner", is_active=False
+        )
+        self.schmidt = Driver.objects.create(
+            first_name="Peter", last_name="Schmidt", team="Müller Motorsport"
+        )
+        self.berg = Driver.objects.create(first_name="Tom", last_name="Berg")
+        self.berger = Driver.objects.create(first_name="Lena", last_name="Berger")
+        self.subaru = Vehicle.objects.create(
+            driver=self.mueller, name="Subaru Impreza", default_start_number=17
+        )
+
+    def labels(self, query: str) -> list[str]:
+        return [entry.label for entry in search_index.search(query, kinds=(DRIVER,))]
+
+    def test_prefix_match(self):
+        self.assertEqual(self.labels("schm"), ["Peter Schmidt"])
+        self.assertEqual(self.labels("TX"), ["Jürgen Müller"])
+        self.assertEqual(self.labels("4711"), ["Jürgen Müller"])
+        self.assertEqual(self.labels("xyz"), [])
+
+    def test_trigram_match_inside_a_token(self):
+        self.assertEqual(self.labels("mpre"), [])
+        vehicles = [entry.label for entry in search_index.search("mpre")]
+        self.assertEqual(vehicles, ["Subaru Impreza"])
+        self.assertEqual(self.labels("olfsb"), ["Jürgen Müller"])
+
+    def test_accents_and_case_are_folded(self):
+        for query in ("mul", "Mül", "MULLER", "müller"):
+            with self.subTest(query=query):
+                self.assertIn("Jürgen Müller", self.labels(query))
+        self.assertEqual(self.labels("ller"), ["Jürgen Müller", "Peter Schmidt"])
+        self.assertEqual(self.labels("jurg"), ["Jürgen Müller"])
+
+    def test_every_term_has_to_match(self):
+        self.assertEqual(self.labels("mül jür"), ["Jürgen Müller"])
+        self.assertEqual(self.labels("müller peter"), ["Peter Schmidt"])
+        self.assertEqual(self.labels("mül tom"), [])
+        self.assertEqual(self.labels(" , "), [])
+
+    def test_ranking(self):
+        # Whole token before prefix before infix match.
+        self.assertEqual(self.labels("berg"), ["Tom Berg", "Lena Berger", "Jürgen Müller"])
+        # Inactive drivers come after active ones with the same kind of match.
+        self.assertEqual(self.labels("müll"), ["Jürgen Müller", "Peter Schmidt", "Anna Müllner"])
+        # A start number hit comes first, drivers before vehicles.
+        results = search_index.search("17")
+        self.assertEqual(
+            [(entry.kind, entry.pk) for entry in results],
+            [(DRIVER, self.mueller.pk), (VEHICLE, self.subaru.pk)],
+        )
+        self.assertEqual(results[1].driver_id, self.mueller.pk)
+        self.assertEqual(len(search_index.search("mül", limit=2)), 2)
+
+    def test_save_rebuilds_the_index_in_the_background(self):
+        self.assertEqual(self.labels("zürch"), [])
+        with mock.patch.object(worker, "submit") as submit:
+            with self.captureOnCommitCallbacks() as callbacks:
+                Driver.objects.create(first_name="Zoë", last_name="Zürcher")
+            # The stale index keeps answering until the rebuild ran.
+            self.assertEqual(self.labels("zurch"), [])
+        submit.assert_called_with(search_index.rebuild, key=("search_index_rebuild",))
+        version = ConfigVersion.current(ConfigVersion.SEARCH_INDEX)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(ConfigVersion.current(ConfigVersion.SEARCH_INDEX), version + 1)
+        self.assertEqual(self.labels("zurch"), ["Zoë Zürcher"])
+
+    def test_other_processes_are_noticed_after_the_check_interval(self):
+        self.assertEqual(self.labels("zurch"), [])
+        # Another process adds a driver; this one only sees the version bump.
+        Driver.objects.bulk_create([Driver(first_name="Zoë", last_name="Zürcher")])
+        ConfigVersion.bump(ConfigVersion.SEARCH_INDEX)
+        with override_settings(RALLYCONTROL_SEARCH_INDEX_CHECK_SECONDS=3600):
+            self.assertEqual(self.labels("zurch"), [])
+        with override_settings(RALLYCONTROL_SEARCH_INDEX_CHECK_SECONDS=0):
+            self.assertEqual(self.labels("zurch"), ["Zoë Zürcher"])
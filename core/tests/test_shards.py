@@ -0,0 +1,43 @@
+import datetime
+
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from .. import shards
+from ..models import ConfigVersion, Driver, User
+from .base import RallyFixtureMixin, ShardedEventsMixin
+
+
+class ShardMirrorTests(ShardedEventsMixin, RallyFixtureMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enable_shards()
+        self.user = User.objects.create_user(
+            "leitung", email="leitung@example.org", password="geheim"
+        )
+        event, self.alias = self.create_sharded_event("Talrennen", datetime.date(2026, 7, 1))
+        self.event_id = event.pk
+
+    def test_users_are_mirrored_without_credentials(self):
+        self.assertTrue(shards.is_shard_alias(self.alias))
+        mirrored = User.objects.using(self.alias).get(pk=self.user.pk)
+        self.assertEqual(mirrored.username, "leitung")
+        self.assertEqual(mirrored.password, "")
+        self.assertIsNone(mirrored.email)
+
+    def test_login_leaves_the_mirror_alone(self):
+        version = ConfigVersion.current(shards.master_key(User))
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=["last_login"])
+        self.assertEqual(ConfigVersion.current(shards.master_key(User)), version)
+        self.assertFalse(shards.shards._stale.get(self.alias))
+
+    def test_changed_and_new_rows_are_mirrored(self):
+        driver = self.drivers[0]
+        driver.first_name = "Neu"
+        driver.save()
+        self.assertEqual(Driver.objects.using(self.alias).get(pk=driver.pk).first_name, "Neu")
+
+        added = Driver.objects.create(first_name="Fahrer5", last_name="Test")
+        self.assertEqual(shards.alias_for_event(self.event_id), self.alias)
+        self.assertTrue(Driver.objects.using(self.alias).filter(pk=added.pk).exists())
@@ -0,0 +1,113 @@
+import hashlib
+import io
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+
+from .. import uploads
+from ..gate_registry import registry
+from ..models import Capture, CaptureUpload
+from .base import RallyFixtureMixin
+
+IMAGE = bytes(range(256)) * 40
+
+
+class ChunkedUploadTests(RallyFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        overrides = override_settings(
+            RALLYCONTROL_UPLOAD_DIR=directory / "uploads",
+            RALLYCONTROL_CAPTURE_DIR=directory / "captures",
+            RALLYCONTROL_UPLOAD_CHUNK_MAX_BYTES=4096,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        passage_id = self.post_passage("start", 1_750_000_000_000).json()["passage_id"]
+        self.upload_id = self.start(passage_id, hashlib.sha256(IMAGE).hexdigest())
+
+    def start(self, passage_id: int, sha256: str) -> str:
+        response = self.client.post(
+            "/api/gates/start/captures/",
+            json.dumps({"passage_id": passage_id, "size": len(IMAGE), "sha256": sha256}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.passage_id = passage_id
+        return response.json()["upload_id"]
+
+    def send(self, offset: int, chunk: bytes):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f"/api/gates/start/captures/{self.upload_id}/",
+                chunk,
+                content_type="application/octet-stream",
+                HTTP_UPLOAD_OFFSET=str(offset),
+            )
+
+    def upload(self) -> CaptureUpload:
+        return CaptureUpload.objects.get(upload_id=self.upload_id)
+
+    def test_upload_resumes_at_the_server_offset(self):
+        self.assertEqual(self.send(0, IMAGE[:4096]).json()["offset"], 4096)
+        # The gate reconnects and registers the same image again.
+        self.assertEqual(self.start(self.passage_id, self.upload().sha256), self.upload_id)
+        state = self.client.get(f"/api/gates/start/captures/{self.upload_id}/").json()
+        self.assertEqual(state["offset"], 4096)
+        for offset in range(4096, len(IMAGE), 4096):
+            response = self.send(offset, IMAGE[offset : offset + 4096])
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], CaptureUpload.Status.COMPLETE)
+
+        upload = self.upload()
+        self.assertEqual(upload.status, CaptureUpload.Status.DONE)
+        capture = Capture.objects.get(pk=upload.capture_id)
+        self.assertEqual((uploads.capture_dir() / capture.image_path).read_bytes(), IMAGE)
+        self.assertFalse(uploads.part_path(upload).exists())
+
+    def test_chunk_at_the_wrong_offset_is_refused(self):
+        self.send(0, IMAGE[:4096])
+        response = self.send(2048, IMAGE[2048:6144])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 4096)
+        self.assertEqual(uploads.part_path(self.upload()).read_bytes(), IMAGE[:4096])
+
+    def test_chunk_racing_a_claimed_offset_leaves_the_part_file_alone(self):
+        self.send(0, IMAGE[:4096])
+        CaptureUpload.objects.filter(upload_id=self.upload_id).update(
+            status=CaptureUpload.Status.WRITING
+        )
+        response = self.send(4096, b"x" * 100)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(uploads.part_path(self.upload()).read_bytes(), IMAGE[:4096])
+
+    def test_short_chunk_releases_the_claim(self):
+        entry = registry.get("start")
+        with self.assertRaises(uploads.IngestError):
+            uploads.append_chunk(entry, self.upload_id, 0, io.BytesIO(IMAGE[:100]), 4096)
+        upload = self.upload()
+        self.assertEqual(upload.status, CaptureUpload.Status.RECEIVING)
+        self.assertEqual(upload.received_bytes, 0)
+        self.assertEqual(self.send(0, IMAGE[:4096]).status_code, 200)
+
+    def test_oversize_chunks_are_refused(self):
+        self.assertEqual(self.send(0, IMAGE[:4097]).status_code, 400)
+        self.send(0, IMAGE[:4096])
+        last = len(IMAGE) - 1024
+        CaptureUpload.objects.filter(upload_id=self.upload_id).update(received_bytes=last)
+        self.assertEqual(self.send(last, IMAGE[last:] + b"x").status_code, 400)
+        self.assertEqual(self.upload().received_bytes, last)
+
+    def test_hash_mismatch_fails_the_upload(self):
+        self.upload_id = self.start(self.passage_id, "0" * 64)
+        for offset in range(0, len(IMAGE), 4096):
+            self.send(offset, IMAGE[offset : offset + 4096])
+        upload = self.upload()
+        self.assertEqual(upload.status, CaptureUpload.Status.FAILED)
+        self.assertIn("SHA-256 mismatch", upload.error)
+        self.assertFalse(Capture.objects.exists())
+        self.assertFalse(uploads.part_path(upload).exists())
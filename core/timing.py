@@ -0,0 +1,144 @@
+"""
+Live run matching for start and finish passages.
+
+Start passages bind to the next armed run of the session's start list
+(``core.start_list.start_queues``); finish passages complete the run that
+has been on course the longest. Both transitions are single conditional
+``UPDATE`` statements that bump ``Run.version`` and schedule one coalesced
+board regeneration. Checkpoint passages (splits) are attributed to the
+longest running run that has not passed the checkpoint yet; they leave the
+run unchanged and only republish the live state for overlays. Runs on
+course are looked up in the in-memory live state (``core.live_state``),
+not in the database.
+
+``transitions`` serializes the automatic transitions of a session: ingest
+matches and stores the passages of one session strictly one after another
+in this process, while other sessions proceed in parallel. Conflicts with
+other processes or with race control are settled by the conditional
+updates, never by holding a lock or a long transaction.
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Callable
+
+from django.db.models import F
+from django.utils import timezone
+
+from . import career, replication
+from .gate_registry import GateEntry
+from .kiosk_snapshot import schedule_publish
+from .leaderboards import schedule_regeneration
+from .live_state import live_sessions
+from .models import Gate, Run
+from .start_list import start_queues
+
+
+class SessionSerializer:
+    """Executes the tasks of one session one at a time, sessions in parallel."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._locks: dict[int, threading.RLock] = {}
+
+    def _session_lock(self, session_id: int) -> threading.RLock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            with self._lock:
+                lock = self._locks.setdefault(session_id, threading.RLock())
+        return lock
+
+    def run(self, session_id: int, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._session_lock(session_id):
+            return func(*args, **kwargs)
+
+    def forget(self, session_id: int) -> None:
+        with self._lock:
+            self._locks.pop(session_id, None)
+
+
+transitions = SessionSerializer()
+
+
+def ms_to_datetime(timestamp_ms: int) -> datetime:
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=dt_timezone.utc)
+
+
+def bind_start(session_id: int, timestamp_ms: int) -> int | None:
+    """Start the next armed run; return its id or ``None`` if none is queued."""
+    while True:
+        armed = start_queues.take(session_id)
+        if armed is None:
+            return None
+        started = Run.objects.filter(pk=armed.run_id, status=Run.Status.QUEUED).update(
+            status=Run.Status.RUNNING,
+            started_at=ms_to_datetime(timestamp_ms),
+            version=F("version") + 1,
+            updated_at=timezone.now(),
+        )
+        if started:
+            return armed.run_id
+
+
+def bind_finish(session_id: int, timestamp_ms: int) -> int | None:
+    """Finish the run that has been on course the longest.
+
+    Running runs without a start time (set by hand) have no time to finish.
+    If the live state offers no run that can still be finished, it is
+    brought up to date once and the match retried.
+    """
+    for fresh in (False, True):
+        for run_id, started_ms in live_sessions.on_course(session_id, 5, fresh=fresh):
+            total_ms = timestamp_ms - started_ms
+            finished = Run.objects.filter(pk=run_id, status=Run.Status.RUNNING).update(
+                status=Run.Status.FINISHED,
+                finished_at=ms_to_datetime(timestamp_ms),
+                total_time_ms=total_ms,
+                final_time_ms=total_ms + F("penalty_ms"),
+                version=F("version") + 1,
+                updated_at=timezone.now(),
+            )
+            if finished:
+                return run_id
+    return None
+
+
+def bind_checkpoint(session_id: int, gate_id: int, timestamp_ms: int) -> int | None:
+    """Run a split passage belongs to: on course longest, checkpoint not yet passed."""
+    return live_sessions.checkpoint_run(session_id, gate_id, timestamp_ms)
+
+
+def match_passage(entry: GateEntry, timestamp_ms: int) -> int | None:
+    """Apply the run transition for a passage and return the matched run id.
+
+    The changed run is logged for replication right away, before the
+    passage that references it, so the central node can resolve the link.
+    """
+    if entry.gate_type == Gate.GateType.START:
+        run_id = bind_start(entry.session_id, timestamp_ms)
+    elif entry.gate_type == Gate.GateType.FINISH:
+        run_id = bind_finish(entry.session_id, timestamp_ms)
+    elif entry.gate_type == Gate.GateType.CHECKPOINT:
+        return bind_checkpoint(entry.session_id, entry.gate_id, timestamp_ms)
+    else:
+        return None
+    if run_id is not None:
+        replication.record_bulk_changes(Run, [run_id])
+    return run_id
+
+
+def after_match(entry: GateEntry, run_id: int | None) -> None:
+    """Follow-up work once the passage is stored."""
+    if entry.gate_type == Gate.GateType.START:
+        start_queues.refill(entry.session_id)
+    if run_id is None:
+        return
+    if entry.gate_type == Gate.GateType.CHECKPOINT:
+        # A split changes no board, only the live state of the run.
+        schedule_publish(entry.session_id)
+        return
+    schedule_regeneration(entry.session_id)
+    if entry.gate_type == Gate.GateType.FINISH:
+        career.schedule_record_finish(entry.session_id, run_id)
@@ -0,0 +1,304 @@
+"""
+Resumable chunked upload of capture images.
+
+Camera images are large compared to the gate WLAN, so a gate uploads them
+in chunks that can be resumed after a dropped connection:
+
+1. ``start_upload`` registers the image (passage, size, SHA-256) and
+   returns an upload id. Registering the same image again resumes the
+   existing upload; an image whose hash is already stored is not sent
+   again.
+2. ``append_chunk`` claims the current offset with a conditional
+   ``UPDATE`` (status ``writing``), writes the chunk to a part file and
+   then advances the offset. A chunk at the wrong offset, or one racing a
+   chunk that is still being written, is rejected with the offset the
+   server has.
+3. Once all bytes arrived, ``finalize_upload`` runs on the background
+   worker: it checks the SHA-256, moves the file into the capture store,
+   creates the ``Capture`` row and queues OCR.
+
+The request thread therefore only streams bytes to disk; hashing, file
+moves and database work for the capture never block timing traffic.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import shards
+from .background import worker
+from .gate_registry import GateEntry
+from .ingest import IngestError
+from .models import Capture, CaptureUpload, Passage
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_EXTENSIONS = ("jpg", "jpeg", "png")
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+COPY_BLOCK_BYTES = 64 * 1024
+# A claim older than this belongs to a request that died while writing.
+WRITE_CLAIM_TIMEOUT = timedelta(minutes=2)
+
+
+class UploadNotFound(IngestError):
+    status_code = 404
+
+
+class UploadOffsetMismatch(IngestError):
+    """Chunk does not start at the server's offset; the gate must resume there."""
+
+    status_code = 409
+
+    def __init__(self, offset: int) -> None:
+        super().__init__(f"Upload continues at offset {offset}.")
+        self.offset = offset
+
+
+def upload_dir() -> Path:
+    return Path(getattr(settings, "RALLYCONTROL_UPLOAD_DIR", settings.BASE_DIR / "uploads"))
+
+
+def capture_dir() -> Path:
+    return Path(getattr(settings, "RALLYCONTROL_CAPTURE_DIR", settings.BASE_DIR / "captures"))
+
+
+def part_path(upload: CaptureUpload) -> Path:
+    return upload_dir() / f"{upload.upload_id}.part"
+
+
+def _optional_int(payload: dict[str, Any], key: str) -> int | None:
+    value = payload.get(key)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError) as exc:
+        raise IngestError(f"{key} must be an integer.") from exc
+
+
+def start_upload(entry: GateEntry, payload: dict[str, Any]) -> CaptureUpload:
+    """Register (or resume) the upload of one image of ``entry``'s passage."""
+    passage_id = _optional_int(payload, "passage_id")
+    size = _optional_int(payload, "size")
+    sha256 = str(payload.get("sha256") or "").lower()
+    extension = str(payload.get("extension") or "jpg").lower().lstrip(".")
+    if passage_id is None:
+        raise IngestError("passage_id is required.")
+    max_bytes = getattr(settings, "RALLYCONTROL_UPLOAD_MAX_BYTES", 20 * 1024 * 1024)
+    if size is None or not 0 < size <= max_bytes:
+        raise IngestError(f"size must be between 1 and {max_bytes} bytes.")
+    if not SHA256_RE.match(sha256):
+        raise IngestError("sha256 must be a hex encoded SHA-256 digest.")
+    if extension not in ALLOWED_EXTENSIONS:
+        raise IngestError(f"extension must be one of {', '.join(ALLOWED_EXTENSIONS)}.")
+    if not Passage.objects.filter(pk=passage_id, gate_id=entry.gate_id).exists():
+        raise IngestError(f"Passage {passage_id} does not belong to this gate.")
+
+    resumable = (
+        CaptureUpload.objects.filter(gate_id=entry.gate_id, sha256=sha256, size=size)
+        .exclude(status=CaptureUpload.Status.FAILED)
+        .order_by("-pk")
+        .first()
+    )
+    if resumable is not None:
+        return resumable
+
+    upload = CaptureUpload(
+        gate_id=entry.gate_id,
+        passage_id=passage_id,
+        size=size,
+        sha256=sha256,
+        extension=extension,
+        captured_at_ms=_optional_int(payload, "captured_at_ms"),
+        width=_optional_int(payload, "width"),
+        height=_optional_int(payload, "height"),
+    )
+    existing = Capture.objects.filter(sha256=sha256).first()
+    if existing is not None:
+        # Already stored (e.g. sent by a previous upload): skip the transfer.
+        upload.capture = existing
+        upload.received_bytes = size
+        upload.status = CaptureUpload.Status.DONE
+    upload.save()
+    return upload
+
+
+def get_upload(entry: GateEntry, upload_id) -> CaptureUpload:
+    upload = CaptureUpload.objects.filter(upload_id=upload_id, gate_id=entry.gate_id).first()
+    if upload is None:
+        raise UploadNotFound(f"Unknown upload {upload_id}.")
+    return upload
+
+
+def append_chunk(
+    entry: GateEntry, upload_id, offset: int, stream: BinaryIO, length: int
+) -> CaptureUpload:
+    """Write ``length`` bytes from ``stream`` at ``offset`` of the upload."""
+    upload = get_upload(entry, upload_id)
+    if upload.status not in (CaptureUpload.Status.RECEIVING, CaptureUpload.Status.WRITING):
+        raise UploadOffsetMismatch(upload.received_bytes)
+    if offset != upload.received_bytes:
+        raise UploadOffsetMismatch(upload.received_bytes)
+    chunk_max = getattr(settings, "RALLYCONTROL_UPLOAD_CHUNK_MAX_BYTES", 1024 * 1024)
+    if not 0 < length <= chunk_max:
+        raise IngestError(f"Chunks must be between 1 and {chunk_max} bytes.")
+    if offset + length > upload.size:
+        raise IngestError("Chunk exceeds the announced size.")
+
+    # Claim the offset before touching the part file, so a second request
+    # for the same offset can neither interleave its bytes nor truncate ours.
+    claimable = Q(status=CaptureUpload.Status.RECEIVING) | Q(
+        status=CaptureUpload.Status.WRITING,
+        updated_at__lt=timezone.now() - WRITE_CLAIM_TIMEOUT,
+    )
+    claimed = (
+        CaptureUpload.objects.filter(claimable, pk=upload.pk, received_bytes=offset)
+        .update(status=CaptureUpload.Status.WRITING, updated_at=timezone.now())
+    )
+    if not claimed:
+        upload.refresh_from_db(fields=["received_bytes", "status"])
+        raise UploadOffsetMismatch(upload.received_bytes)
+
+    claim = CaptureUpload.objects.filter(pk=upload.pk, status=CaptureUpload.Status.WRITING)
+    try:
+        written = _write_chunk(part_path(upload), offset, stream, length)
+        if written != length:
+            raise IngestError(f"Expected {length} bytes, received {written}.")
+    except BaseException:
+        claim.update(status=CaptureUpload.Status.RECEIVING, updated_at=timezone.now())
+        raise
+
+    received = offset + length
+    complete = received == upload.size
+    status = CaptureUpload.Status.COMPLETE if complete else CaptureUpload.Status.RECEIVING
+    claim.update(received_bytes=received, status=status, updated_at=timezone.now())
+    upload.received_bytes = received
+    upload.status = status
+    if complete:
+        schedule_finalize(upload.pk)
+    return upload
+
+
+def _write_chunk(path: Path, offset: int, stream: BinaryIO, length: int) -> int:
+    """Copy up to ``length`` bytes to ``path`` at ``offset``; returns the count."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "r+b" if path.exists() else "wb") as part:
+        part.seek(offset)
+        written = 0
+        while written < length:
+            block = stream.read(min(COPY_BLOCK_BYTES, length - written))
+            if not block:
+                break
+            part.write(block)
+            written += len(block)
+        # Drop the rest of an earlier, aborted attempt at this offset.
+        part.truncate(offset + written)
+    return written
+
+
+def schedule_finalize(upload_pk: int) -> None:
+    shards.on_commit(
+        lambda: worker.submit(finalize_upload, upload_pk, key=("finalize_upload", upload_pk))
+    )
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(COPY_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fail(upload: CaptureUpload, error: str) -> None:
+    part_path(upload).unlink(missing_ok=True)
+    upload.status = CaptureUpload.Status.FAILED
+    upload.error = error
+    upload.save(update_fields=["status", "error", "updated_at"])
+
+
+def finalize_upload(upload_pk: int) -> Capture | None:
+    """Verify a complete upload and turn it into a ``Capture`` (background)."""
+    upload = CaptureUpload.objects.filter(
+        pk=upload_pk, status=CaptureUpload.Status.COMPLETE
+    ).first()
+    if upload is None:
+        return None
+    path = part_path(upload)
+    if not path.exists():
+        _fail(upload, "Part file is missing.")
+        return None
+    digest = _file_sha256(path)
+    if digest != upload.sha256:
+        _fail(upload, f"SHA-256 mismatch: received {digest}.")
+        return None
+
+    relative = Path(upload.sha256[:2]) / f"{upload.sha256}.{upload.extension}"
+    target = capture_dir() / relative
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(path, target)
+    with shards.atomic():
+        capture, created = Capture.objects.get_or_create(
+            sha256=upload.sha256,
+            defaults={
+                "passage_id": upload.passage_id,
+                "image_path": relative.as_posix(),
+                "captured_at_ms": upload.captured_at_ms,
+                "width": upload.width,
+                "height": upload.height,
+            },
+        )
+        upload.capture = capture
+        upload.status = CaptureUpload.Status.DONE
+        upload.save(update_fields=["capture", "status", "updated_at"])
+        if created:
+            shards.on_commit(lambda: enqueue_ocr(capture.pk))
+    return capture
+
+
+def enqueue_ocr(capture_id: int) -> bool:
+    """Queue the configured OCR handler for a capture."""
+    handler = getattr(settings, "RALLYCONTROL_OCR_HANDLER", "")
+    if not handler:
+        return False
+    return worker.submit(import_string(handler), capture_id, key=("ocr", capture_id))
+
+
+def finalize_pending() -> int:
+    """Finalise complete uploads whose background task was lost (restart)."""
+    pending = CaptureUpload.objects.filter(status=CaptureUpload.Status.COMPLETE)
+    count = 0
+    for upload_pk in pending.values_list("pk", flat=True):
+        if finalize_upload(upload_pk) is not None:
+            count += 1
+    return count
+
+
+def prune_stale_uploads(max_age: timedelta) -> int:
+    """Delete unfinished or failed uploads untouched for ``max_age``."""
+    cutoff = timezone.now() - max_age
+    stale = CaptureUpload.objects.filter(
+        status__in=[
+            CaptureUpload.Status.RECEIVING,
+            CaptureUpload.Status.WRITING,
+            CaptureUpload.Status.FAILED,
+        ],
+        updated_at__lt=cutoff,
+    )
+    count = 0
+    for upload in stale:
+        part_path(upload).unlink(missing_ok=True)
+        upload.delete()
+        count += 1
+    return count
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import gate_api, node_api, public_views, views
 
 app_name = "core"
 
@@ -27,4 +27,94 @@ urlpatterns = [
     path("vehicles/", views.VehicleListView.as_view(), name="vehicle_list"),
     path("vehicles/new/", views.VehicleCreateView.as_view(), name="vehicle_create"),
     path("vehicles/<int:pk>/edit/", views.VehicleUpdateView.as_view(), name="vehicle_update"),
+    path("ocr-review/", views.OCRReviewView.as_view(), name="ocr_review"),
+    path("gate-health/", views.GateHealthView.as_view(), name="gate_health"),
+    path(
+        "sessions/<int:session_pk>/captures/<int:pk>/thumb/",
+        views.DerivativeImageView.as_view(),
+        {"variant": "thumb"},
+        name="capture_thumb",
+    ),
+    path(
+        "sessions/<int:session_pk>/captures/<int:pk>/preview/",
+        views.DerivativeImageView.as_view(),
+        {"variant": "preview"},
+        name="capture_preview",
+    ),
+    path(
+        "sessions/<int:session_pk>/ocr-results/<int:pk>/crop/",
+        views.DerivativeImageView.as_view(),
+        {"variant": "crop"},
+        name="ocr_crop",
+    ),
+    path(
+        "api/gates/debounce-stats/",
+        views.DebounceStatsView.as_view(),
+        name="gate_debounce_stats",
+    ),
+    path("api/typeahead/", views.TypeaheadView.as_view(), name="typeahead"),
+    path("api/drivers/<int:pk>/bests/", views.DriverBestsView.as_view(), name="driver_bests"),
+    path(
+        "api/live-sessions/memory/",
+        views.LiveStateMemoryView.as_view(),
+        name="live_state_memory",
+    ),
+    path(
+        "api/gates/<str:gate_uid>/captures/",
+        gate_api.CaptureUploadStartView.as_view(),
+        name="gate_capture_upload_start",
+    ),
+    path(
+        "api/gates/<str:gate_uid>/captures/<uuid:upload_id>/",
+        gate_api.CaptureUploadChunkView.as_view(),
+        name="gate_capture_upload_chunk",
+    ),
+    path(
+        "api/gates/<str:gate_uid>/config/",
+        gate_api.GateConfigView.as_view(),
+        name="gate_config",
+    ),
+    path(
+        "api/gates/<str:gate_uid>/heartbeat/",
+        gate_api.GateHeartbeatView.as_view(),
+        name="gate_heartbeat",
+    ),
+    path(
+        "api/gates/<str:gate_uid>/passages/",
+        gate_api.GatePassageView.as_view(),
+        name="gate_passage",
+    ),
+    path("kiosk/sessions/<int:pk>/", public_views.KioskBoardView.as_view(), name="kiosk_board"),
+    path("overlay/sessions/<int:pk>/", public_views.OverlayView.as_view(), name="overlay"),
+    path(
+        "overlay/sessions/<int:pk>/live/",
+        public_views.OverlayLiveView.as_view(),
+        name="overlay_live",
+    ),
+    path(
+        "overlay/sessions/<int:pk>/feed/",
+        public_views.OverlayFeedView.as_view(),
+        name="overlay_feed",
+    ),
+    path(
+        "api/sessions/<int:pk>/status/",
+        public_views.SessionStatusView.as_view(),
+        name="session_status",
+    ),
+    path(
+        "api/sessions/<int:pk>/start-list/",
+        views.StartListView.as_view(),
+        name="session_start_list",
+    ),
+    path(
+        "api/sessions/<int:pk>/runs/<int:run_pk>/bests/",
+        views.RunBestsView.as_view(),
+        name="run_bests",
+    ),
+    path("api/corrections/", views.RunCorrectionView.as_view(), name="run_corrections"),
+    path(
+        "api/replication/push/",
+        node_api.ReplicationPushView.as_view(),
+        name="replication_push",
+    ),
 ]
@@ -1,9 +1,36 @@
+import json
+from functools import partial
+from urllib.parse import urlencode
+
 from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import FileResponse, Http404, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
+from django.views import View
 from django.views.generic import CreateView, ListView, TemplateView, UpdateView
 
-from . import forms
-from .models import Driver, Event, Gate, RaceClass, Session, Stage, Vehicle
+from . import career, corrections, derivatives, forms, ocr_review, shards, start_list, timing
+from .debounce import debounce
+from .gate_health import gate_health_summary
+from .gate_registry import registry
+from .leaderboards import effective_class_id
+from .live_state import live_sessions
+from .search_index import KINDS, search_index
+from .models import (
+    Capture,
+    Driver,
+    DriverBest,
+    Event,
+    Gate,
+    OCRResult,
+    RaceClass,
+    Run,
+    Session,
+    Stage,
+    User,
+    Vehicle,
+)
 
 
 NAV_ITEMS = [
@@ -15,6 +42,8 @@ NAV_ITEMS = [
     {"label": "Stages", "url_name": "core:stage_list"},
     {"label": "Sessions", "url_name": "core:session_list"},
     {"label": "Gates", "url_name": "core:gate_list"},
+    {"label": "OCR-Prüfung", "url_name": "core:ocr_review"},
+    {"label": "Gate-Zustand", "url_name": "core:gate_health"},
 ]
 
 
@@ -208,7 +237,7 @@ class StageUpdateView(MasterDataUpdateView):
 
 class SessionListView(MasterDataListView):
     model = Session
-    list_display = ["stage", "name", "session_type", "status", "start_time"]
+    list_display = ["stage", "name", "session_type", "status", "start_time", "start_interval_s"]
     page_title = "Sessions"
 
 
@@ -226,7 +255,15 @@ class SessionUpdateView(MasterDataUpdateView):
 
 class GateListView(MasterDataListView):
     model = Gate
-    list_display = ["name", "gate_uid", "gate_type", "stage", "is_enabled", "last_seen_at"]
+    list_display = [
+        "name",
+        "gate_uid",
+        "gate_type",
+        "stage",
+        "is_enabled",
+        "debounce_ms",
+        "last_seen_at",
+    ]
     page_title = "Gates"
 
 
@@ -258,3 +295,325 @@ class VehicleUpdateView(MasterDataUpdateView):
     model = Vehicle
     form_class = forms.VehicleForm
     page_title = "Fahrzeug bearbeiten"
+
+
+class RaceControlRequiredMixin(LoginRequiredMixin):
+    """Restricts a view to admins and operators."""
+
+    allowed_roles = (User.Role.ADMIN, User.Role.OPERATOR)
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not (
+            request.user.is_superuser or request.user.role in self.allowed_roles
+        ):
+            return JsonResponse({"error": "Keine Berechtigung."}, status=403)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class RunCorrectionView(RaceControlRequiredMixin, View):
+    """JSON API for single and bulk run corrections.
+
+    Body: ``{"action": "add_penalty" | "set_penalty" | "set_status" |
+    "dnf_running" | "recompute", "run_ids": [...], "session_id": ...,
+    "penalty_ms": ..., "status": ..., "reason": ...}``. ``session_id`` is
+    required for every action; run ids are resolved in its event database.
+    """
+
+    http_method_names = ["post"]
+
+    def post(self, request):
+        try:
+            body = json.loads(request.body or b"{}")
+            correction = self.apply(body)
+        except (ValueError, TypeError, KeyError, corrections.CorrectionError) as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+        if correction is None:
+            return JsonResponse({"correction_id": None, "run_ids": []})
+        return JsonResponse(
+            {
+                "correction_id": correction.pk,
+                "run_ids": correction.run_ids,
+                "session_ids": correction.session_ids,
+            }
+        )
+
+    def apply(self, body: dict):
+        action = body["action"]
+        session_id = int(body["session_id"])
+        options = {"user": self.request.user, "reason": body.get("reason")}
+        if action == "dnf_running":
+            return corrections.dnf_running_runs(session_id, **options)
+        if action == "recompute":
+            return corrections.recompute_final_times(session_id, **options)
+        options["session"] = session_id
+        run_ids = [int(pk) for pk in body["run_ids"]]
+        if action == "add_penalty":
+            return corrections.add_penalty(run_ids, int(body["penalty_ms"]), **options)
+        if action == "set_penalty":
+            return corrections.set_penalty(run_ids, int(body["penalty_ms"]), **options)
+        if action == "set_status":
+            return corrections.set_status(run_ids, body["status"], **options)
+        raise corrections.CorrectionError(f"Unbekannte Aktion {action!r}.")
+
+
+class StartListView(RaceControlRequiredMixin, View):
+    """JSON start list of a session.
+
+    ``GET`` returns the queued runs in start order. ``POST`` accepts
+    ``{"action": "create", "race_class_id": ...}``,
+    ``{"action": "reorder", "run_ids": [...]}`` or
+    ``{"action": "predict", "first_start_ms": ...}``.
+    """
+
+    http_method_names = ["get", "post"]
+
+    def get(self, request, pk):
+        session = get_object_or_404(Session, pk=pk)
+        runs = start_list.start_list(session).select_related("driver")
+        return JsonResponse(
+            {
+                "session_id": session.pk,
+                "start_interval_s": session.start_interval_s,
+                "runs": [
+                    {
+                        "run_id": run.pk,
+                        "position": run.start_position,
+                        "driver": str(run.driver),
+                        "start_number": run.start_number_used,
+                        "planned_start_at": run.planned_start_at,
+                    }
+                    for run in runs
+                ],
+            }
+        )
+
+    def post(self, request, pk):
+        session = get_object_or_404(Session, pk=pk)
+        try:
+            body = json.loads(request.body or b"{}")
+            action = body["action"]
+            if action == "create":
+                race_class = None
+                if body.get("race_class_id"):
+                    race_class = get_object_or_404(RaceClass, pk=body["race_class_id"])
+                start_list.create_start_list(session, race_class)
+            elif action == "reorder":
+                start_list.reorder_start_list(session, [int(pk) for pk in body["run_ids"]])
+            elif action == "predict":
+                first_start = None
+                if body.get("first_start_ms"):
+                    first_start = timing.ms_to_datetime(int(body["first_start_ms"]))
+                start_list.predict_start_times(session, first_start)
+            else:
+                return JsonResponse({"error": f"Unbekannte Aktion {action!r}."}, status=400)
+        except (ValueError, TypeError, KeyError) as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+        return self.get(request, pk)
+
+
+class DebounceStatsView(RaceControlRequiredMixin, View):
+    """Bounce suppression counters of this process, per gate."""
+
+    http_method_names = ["get"]
+
+    def get(self, request):
+        stats = debounce.stats()
+        gates = []
+        for entry in registry.entries():
+            gate_stats = stats.get(
+                entry.gate_id, {"accepted": 0, "suppressed": 0, "suppression_rate": 0.0}
+            )
+            gates.append(
+                {
+                    "gate_uid": entry.gate_uid,
+                    "name": entry.name,
+                    "gate_type": entry.gate_type,
+                    "debounce_ms": entry.debounce_ms,
+                    **gate_stats,
+                }
+            )
+        return JsonResponse({"gates": gates})
+
+
+class GateHealthView(RaceControlRequiredMixin, NavContextMixin, TemplateView):
+    """Per-gate trigger, signal and latency totals of the last minutes."""
+
+    template_name = "core/gate_health.html"
+    page_title = "Gate-Zustand"
+    minute_choices = (5, 10, 30, 60)
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        try:
+            minutes = int(self.request.GET.get("minutes", 10))
+        except ValueError:
+            minutes = 10
+        if minutes not in self.minute_choices:
+            minutes = 10
+        ctx["minutes"] = minutes
+        ctx["minute_choices"] = self.minute_choices
+        ctx["gates"] = gate_health_summary(minutes)
+        return ctx
+
+
+class LiveStateMemoryView(RaceControlRequiredMixin, View):
+    """Memory footprint of the live state of all running sessions in this process."""
+
+    http_method_names = ["get"]
+
+    def get(self, request):
+        for session_id in Session.objects.filter(status=Session.Status.RUNNING).values_list(
+            "pk", flat=True
+        ):
+            live_sessions.get(session_id)
+        return JsonResponse(live_sessions.memory_usage())
+
+
+class TypeaheadView(RaceControlRequiredMixin, View):
+    """Driver/vehicle lookup per keystroke, answered from the in-memory index."""
+
+    http_method_names = ["get"]
+    max_limit = 25
+
+    def get(self, request):
+        query = request.GET.get("q", "")
+        kinds = request.GET.getlist("type") or KINDS
+        try:
+            limit = min(max(int(request.GET.get("limit", 10)), 1), self.max_limit)
+        except ValueError:
+            limit = 10
+        results = search_index.search(query, kinds=kinds, limit=limit)
+        return JsonResponse({"query": query, "results": [entry.as_dict() for entry in results]})
+
+
+class DriverBestsView(RaceControlRequiredMixin, View):
+    """Career index of a driver: bests and statistics per stage, course and season."""
+
+    http_method_names = ["get"]
+
+    def get(self, request, pk):
+        driver = get_object_or_404(Driver, pk=pk)
+        scope = request.GET.get("scope")
+        if scope is not None and scope not in DriverBest.Scope.values:
+            return JsonResponse({"error": f"Unbekannter Bereich {scope!r}."}, status=400)
+        return JsonResponse(
+            {"driver_id": driver.pk, "driver": str(driver), "bests": career.driver_bests(pk, scope)}
+        )
+
+
+class RunBestsView(RaceControlRequiredMixin, View):
+    """Stage best, course best and season best of a run's driver with the run's deltas."""
+
+    http_method_names = ["get"]
+
+    def get(self, request, pk, run_pk):
+        session = get_object_or_404(Session.objects.select_related("stage__event"), pk=pk)
+        with shards.using_session(session.pk):
+            run = get_object_or_404(
+                Run.objects.select_related("driver", "vehicle"), pk=run_pk, session=session
+            )
+        return JsonResponse(career.run_bests(run, session.stage, effective_class_id(run)))
+
+
+class DerivativeImageView(RaceControlRequiredMixin, View):
+    """Cached thumbnail, preview or number crop of a capture.
+
+    Thumbnails and previews of a capture never change. The crop URL of an
+    OCR result shows whatever box the result has now, so it is revalidated
+    against an ETag naming that box. The URL names the session, as capture
+    and OCR result pks are only unique within an event's database.
+    """
+
+    http_method_names = ["get"]
+    cache_control = "private, max-age=31536000, immutable"
+    crop_cache_control = "private, no-cache"
+
+    def get(self, request, session_pk, pk, variant):
+        using = shards.alias_for_session(session_pk)
+        if variant == "crop":
+            result = get_object_or_404(
+                OCRResult.objects.using(using).select_related("capture"),
+                pk=pk,
+                session_id=session_pk,
+            )
+            etag = f'"{derivatives.crop_name(result).removesuffix(".jpg")}"'
+            render = partial(derivatives.crop_for, result)
+            cache_control = self.crop_cache_control
+        else:
+            capture = get_object_or_404(
+                Capture.objects.using(using), pk=pk, passage__session_id=session_pk
+            )
+            etag = f'"{derivatives.cache_key(capture)}-{variant}"'
+            render = partial(derivatives.derivative_for, capture, variant)
+            cache_control = self.cache_control
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            try:
+                image = self.open(render)
+            except derivatives.DerivativeError as exc:
+                raise Http404(str(exc)) from exc
+            response = FileResponse(image, content_type="image/jpeg")
+        response["ETag"] = etag
+        response["Cache-Control"] = cache_control
+        return response
+
+    @staticmethod
+    def open(render):
+        try:
+            return open(render(), "rb")
+        except FileNotFoundError:
+            # Evicted by another request between lookup and open: render again.
+            return open(render(), "rb")
+
+
+class OCRReviewView(RaceControlRequiredMixin, NavContextMixin, TemplateView):
+    """Work list of unresolved low-confidence OCR results of running sessions."""
+
+    template_name = "core/ocr_review.html"
+    page_title = "OCR-Prüfung"
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        cursor = self.request.GET.get("cursor")
+        try:
+            results, next_cursor = ocr_review.review_page(cursor)
+        except ocr_review.ReviewError:
+            results, next_cursor = ocr_review.review_page()
+        ctx["results"] = results
+        ctx["cursor"] = cursor
+        ctx["next_cursor"] = next_cursor
+        return ctx
+
+    def post(self, request):
+        try:
+            session_id = int(request.POST.get("session_id", ""))
+        except ValueError:
+            raise Http404("Unbekannte Session.")
+        result = get_object_or_404(
+            OCRResult.objects.using(shards.alias_for_session(session_id)),
+            pk=request.POST.get("result_id"),
+            session_id=session_id,
+        )
+        try:
+            if "dismiss" in request.POST:
+                ocr_review.dismiss(result, user=request.user)
+                messages.info(request, "Erfassung ohne Änderung abgeschlossen.")
+            else:
+                run = ocr_review.assign(
+                    result,
+                    int(request.POST["start_number"]),
+                    user=request.user,
+                    run_id=int(request.POST["run_id"]) if request.POST.get("run_id") else None,
+                )
+                messages.success(
+                    request, f"Startnummer {run.start_number_used} Lauf {run.pk} zugeordnet."
+                )
+        except (KeyError, ValueError):
+            messages.error(request, "Bitte eine gültige Startnummer angeben.")
+        except ocr_review.ReviewError as exc:
+            messages.error(request, str(exc))
+        url = reverse("core:ocr_review")
+        if request.POST.get("cursor"):
+            url += "?" + urlencode({"cursor": request.POST["cursor"]})
+        return redirect(url)
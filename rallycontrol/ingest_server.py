@@ -0,0 +1,42 @@
+"""
+Run the gate-ingest process: ``python -m rallycontrol.ingest_server``.
+
+Serves ``rallycontrol.ingest_wsgi`` with Django's threaded development
+server core, without the autoreloader and system checks of
+``runserver``, so a crashed ingest process is back within a fraction of a
+second. Put it behind a supervisor (systemd ``Restart=always``) on the
+stage server; the full site keeps running separately.
+"""
+
+import argparse
+import sys
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="RallyControl gate ingest server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument(
+        "--startup-only",
+        action="store_true",
+        help="Boot, report the startup time and exit.",
+    )
+    args = parser.parse_args(argv)
+
+    from rallycontrol import ingest_wsgi
+
+    sys.stderr.write(
+        f"Ingest ready in {ingest_wsgi.startup_seconds * 1000:.0f} ms "
+        f"({ingest_wsgi.loaded_modules} modules).\n"
+    )
+    if args.startup_only:
+        return
+
+    from django.core.servers.basehttp import run
+
+    sys.stderr.write(f"Listening on http://{args.host}:{args.port}/\n")
+    run(args.host, args.port, ingest_wsgi.application, threading=True)
+
+
+if __name__ == "__main__":
+    main()
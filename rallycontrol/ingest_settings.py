@@ -0,0 +1,31 @@
+"""
+Settings for the dedicated gate-ingest process.
+
+Same databases and RallyControl options as ``rallycontrol.settings``, but
+only the apps the models need and no admin, templates, static files,
+sessions, messages or CSRF. Start it with
+``DJANGO_SETTINGS_MODULE=rallycontrol.ingest_settings`` and the WSGI
+application ``rallycontrol.ingest_wsgi:application`` (or
+``python -m rallycontrol.ingest_server``).
+"""
+
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "core",
+]
+
+# Gates authenticate by their uid and post JSON: nothing else is needed.
+MIDDLEWARE = [
+    "django.middleware.common.CommonMiddleware",
+]
+
+ROOT_URLCONF = "rallycontrol.ingest_urls"
+
+TEMPLATES: list[dict] = []
+
+WSGI_APPLICATION = "rallycontrol.ingest_wsgi.application"
+
+RALLYCONTROL_INGEST_ONLY = True
@@ -0,0 +1,33 @@
+"""URL configuration of the gate-ingest process (gate API only)."""
+
+from django.urls import path
+
+from core import gate_api
+
+urlpatterns = [
+    path(
+        "api/gates/<str:gate_uid>/captures/",
+        gate_api.CaptureUploadStartView.as_view(),
+        name="gate_capture_upload_start",
+    ),
+    path(
+        "api/gates/<str:gate_uid>/captures/<uuid:upload_id>/",
+        gate_api.CaptureUploadChunkView.as_view(),
+        name="gate_capture_upload_chunk",
+    ),
+    path(
+        "api/gates/<str:gate_uid>/config/",
+        gate_api.GateConfigView.as_view(),
+        name="gate_config",
+    ),
+    path(
+        "api/gates/<str:gate_uid>/heartbeat/",
+        gate_api.GateHeartbeatView.as_view(),
+        name="gate_heartbeat",
+    ),
+    path(
+        "api/gates/<str:gate_uid>/passages/",
+        gate_api.GatePassageView.as_view(),
+        name="gate_passage",
+    ),
+]
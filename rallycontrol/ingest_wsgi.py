@@ -0,0 +1,33 @@
+"""
+WSGI config of the dedicated gate-ingest process.
+
+Boots Django with ``rallycontrol.ingest_settings`` (gate API only) and
+warms the gate registry before the first passage arrives. The time from
+the first import to a ready application is kept in ``startup_seconds``
+and logged, so slow restarts on the stage servers are noticed.
+"""
+
+import time
+
+_started = time.perf_counter()
+
+import logging  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
+
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "rallycontrol.ingest_settings")
+
+application = get_wsgi_application()
+
+from core.gate_registry import registry  # noqa: E402
+
+registry.warm()
+
+startup_seconds = time.perf_counter() - _started
+loaded_modules = len(sys.modules)
+
+logging.getLogger(__name__).info(
+    "Ingest ready in %.0f ms (%d modules).", startup_seconds * 1000, loaded_modules
+)
@@ -58,13 +58,41 @@ TEMPLATES = [
 WSGI_APPLICATION = "rallycontrol.wsgi.application"
 ASGI_APPLICATION = "rallycontrol.asgi.application"
 
+KIOSK_DB_PATH = Path(os.getenv("RALLYCONTROL_KIOSK_DB", BASE_DIR / "kiosk_snapshot.sqlite3"))
+
 DATABASES = {
+    # Ingest and the background worker write concurrently: take the write
+    # lock when a transaction begins instead of failing to upgrade a read
+    # lock later, and wait for it rather than answering "database is locked".
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+        "NAME": os.getenv("RALLYCONTROL_DB", BASE_DIR / "db.sqlite3"),
+        "OPTIONS": {
+            "init_command": "PRAGMA journal_mode=WAL",
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
+        # A file, so tests can exercise concurrent writers across threads.
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+    },
+    # Public snapshot for kiosk/overlay views, written by the publisher only.
+    "kiosk": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": KIOSK_DB_PATH,
+        "OPTIONS": {"init_command": "PRAGMA journal_mode=WAL"},
+    },
+    "kiosk_ro": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": f"file:{KIOSK_DB_PATH}?mode=ro",
+        "TEST": {"MIRROR": "kiosk"},
+    },
 }
 
+DATABASE_ROUTERS = [
+    "core.routers.KioskSnapshotRouter",
+    "core.routers.EventShardRouter",
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -81,6 +109,121 @@ STATIC_URL = "static/"
 STATICFILES_DIRS = [BASE_DIR / "core" / "static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# collectstatic writes content-hashed names plus .gz/.br variants; with
+# RALLYCONTROL_SERVE_STATIC (and DEBUG off) Django serves them itself with
+# immutable cache headers (see core/staticfiles.py).
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "core.staticfiles.PrecompressedManifestStaticFilesStorage"},
+}
+RALLYCONTROL_SERVE_STATIC = os.getenv("RALLYCONTROL_SERVE_STATIC", "True") == "True"
+
+# Compressed kiosk/overlay payloads kept in memory per process (one per
+# session and view, replaced when the snapshot is republished).
+RALLYCONTROL_PUBLIC_CACHE_ENTRIES = int(os.getenv("RALLYCONTROL_PUBLIC_CACHE_ENTRIES", "256"))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "core.User"
+
+# Seconds between checks of the shared gate registry version. Within this
+# interval gate lookups are served from process memory without queries.
+RALLYCONTROL_GATE_REGISTRY_CHECK_SECONDS = float(
+    os.getenv("RALLYCONTROL_GATE_REGISTRY_CHECK_SECONDS", "1.0")
+)
+
+# Seconds between checks of the shared typeahead index version; another
+# process's edits show up in searches after at most this long.
+RALLYCONTROL_SEARCH_INDEX_CHECK_SECONDS = float(
+    os.getenv("RALLYCONTROL_SEARCH_INDEX_CHECK_SECONDS", "1.0")
+)
+
+# Longest time a gate configuration long-poll (``/api/gates/<uid>/config/``)
+# is held open before it is answered with 304 Not Modified.
+RALLYCONTROL_GATE_CONFIG_WAIT_SECONDS = float(
+    os.getenv("RALLYCONTROL_GATE_CONFIG_WAIT_SECONDS", "25")
+)
+
+# Longest time an overlay live feed request (``?wait=``) waits for news.
+RALLYCONTROL_OVERLAY_WAIT_SECONDS = float(os.getenv("RALLYCONTROL_OVERLAY_WAIT_SECONDS", "15"))
+
+# Leaderboard retention: besides the latest board per session/class, keep at
+# most one checkpoint per interval while a session is running.
+RALLYCONTROL_LEADERBOARD_CHECKPOINT_SECONDS = int(
+    os.getenv("RALLYCONTROL_LEADERBOARD_CHECKPOINT_SECONDS", "60")
+)
+
+# Run background tasks inline (useful for scripts and debugging).
+RALLYCONTROL_BACKGROUND_EAGER = os.getenv("RALLYCONTROL_BACKGROUND_EAGER", "False") == "True"
+
+# Multi-node operation: a stage node sets RALLYCONTROL_CENTRAL_URL and
+# replicates its passages, captures and runs there. Both sides share
+# RALLYCONTROL_REPLICATION_TOKEN; an empty token disables the endpoint.
+RALLYCONTROL_NODE_ID = os.getenv("RALLYCONTROL_NODE_ID", "central")
+RALLYCONTROL_CENTRAL_URL = os.getenv("RALLYCONTROL_CENTRAL_URL", "")
+RALLYCONTROL_REPLICATION_TOKEN = os.getenv("RALLYCONTROL_REPLICATION_TOKEN", "")
+
+# Number of queued runs per running session kept armed in memory for
+# instant start matching.
+RALLYCONTROL_START_QUEUE_ARMED = int(os.getenv("RALLYCONTROL_START_QUEUE_ARMED", "8"))
+
+# Light barrier debounce: only the first trigger per gate within this
+# window (ms) counts. Gate.debounce_ms overrides the per-type default.
+# Mode "drop" discards bounces before the DB, "mark" stores them with
+# is_valid=False.
+RALLYCONTROL_DEBOUNCE_MS = {
+    "start": int(os.getenv("RALLYCONTROL_DEBOUNCE_START_MS", "500")),
+    "finish": int(os.getenv("RALLYCONTROL_DEBOUNCE_FINISH_MS", "500")),
+    "checkpoint": int(os.getenv("RALLYCONTROL_DEBOUNCE_CHECKPOINT_MS", "300")),
+}
+RALLYCONTROL_DEBOUNCE_MODE = os.getenv("RALLYCONTROL_DEBOUNCE_MODE", "drop")
+
+# Capture images: gates upload them in resumable chunks into
+# RALLYCONTROL_UPLOAD_DIR; a background task verifies the SHA-256 and moves
+# finished images to RALLYCONTROL_CAPTURE_DIR. RALLYCONTROL_OCR_HANDLER is an
+# optional dotted path to a callable(capture_id) queued for each new capture.
+RALLYCONTROL_UPLOAD_DIR = Path(os.getenv("RALLYCONTROL_UPLOAD_DIR", BASE_DIR / "uploads"))
+RALLYCONTROL_CAPTURE_DIR = Path(os.getenv("RALLYCONTROL_CAPTURE_DIR", BASE_DIR / "captures"))
+RALLYCONTROL_UPLOAD_MAX_BYTES = int(
+    os.getenv("RALLYCONTROL_UPLOAD_MAX_BYTES", str(20 * 1024 * 1024))
+)
+RALLYCONTROL_UPLOAD_CHUNK_MAX_BYTES = int(
+    os.getenv("RALLYCONTROL_UPLOAD_CHUNK_MAX_BYTES", str(1024 * 1024))
+)
+RALLYCONTROL_OCR_HANDLER = os.getenv("RALLYCONTROL_OCR_HANDLER", "")
+
+# On-demand image derivatives (thumbnails, number crops) for capture review.
+# Least recently used files are evicted once the cache exceeds the budget.
+RALLYCONTROL_DERIVATIVE_DIR = Path(
+    os.getenv("RALLYCONTROL_DERIVATIVE_DIR", BASE_DIR / "derivatives")
+)
+RALLYCONTROL_DERIVATIVE_BUDGET_MB = int(os.getenv("RALLYCONTROL_DERIVATIVE_BUDGET_MB", "512"))
+
+# Per-event shards: new events keep their timing data in
+# RALLYCONTROL_SHARD_DIR/event_<id>.sqlite3, master data stays in the
+# default database and is mirrored into each shard.
+RALLYCONTROL_EVENT_SHARDS = os.getenv("RALLYCONTROL_EVENT_SHARDS", "False") == "True"
+RALLYCONTROL_SHARD_DIR = Path(os.getenv("RALLYCONTROL_SHARD_DIR", BASE_DIR / "shards"))
+
+# Season standings: points by position on the final class boards of
+# finished race-mode sessions.
+RALLYCONTROL_SEASON_POINTS = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
+
+# Append-only log of inbound gate messages per event (input of
+# ``manage.py replay_event``).
+RALLYCONTROL_RECORD_GATE_MESSAGES = (
+    os.getenv("RALLYCONTROL_RECORD_GATE_MESSAGES", "True") == "True"
+)
+RALLYCONTROL_RECORD_DIR = Path(os.getenv("RALLYCONTROL_RECORD_DIR", BASE_DIR / "recordings"))
+
+# Gate health rollups: kept for this many hours; gates with at least this
+# share of invalid/debounced triggers or poor signal are highlighted.
+RALLYCONTROL_GATE_HEALTH_RETENTION_HOURS = int(
+    os.getenv("RALLYCONTROL_GATE_HEALTH_RETENTION_HOURS", "48")
+)
+RALLYCONTROL_GATE_HEALTH_WARN_SHARE = 0.2
+
+# Gate clock sync (heartbeats): passages are flagged unstable unless the
+# gate's clock estimate is younger and its jitter smaller than these.
+RALLYCONTROL_CLOCK_MAX_AGE_SECONDS = int(os.getenv("RALLYCONTROL_CLOCK_MAX_AGE_SECONDS", "120"))
+RALLYCONTROL_CLOCK_MAX_JITTER_MS = float(os.getenv("RALLYCONTROL_CLOCK_MAX_JITTER_MS", "5"))
@@ -1,8 +1,17 @@
 """rallycontrol URL Configuration."""
+from django.conf import settings
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.staticfiles import serve_static
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("core.urls")),
 ]
+
+if not settings.DEBUG and settings.RALLYCONTROL_SERVE_STATIC:
+    # Under DEBUG, runserver serves the unhashed files from the app directories.
+    urlpatterns.append(
+        re_path(rf"^{settings.STATIC_URL.strip('/')}/(?P<path>.*)$", serve_static)
+    )
@@ -10,3 +10,7 @@ import os
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "rallycontrol.settings")
 
 application = get_wsgi_application()
+
+from core.gate_registry import registry  # noqa: E402
+
+registry.warm()